@@ -0,0 +1,581 @@
+"""Merkle-batched blockchain anchoring of passport contents
+
+A passport's `blockchain_hash` is the sha256 of its canonical content (the
+CONTENT_FIELDS as sorted, compact JSON), so anyone holding the passport data
+can recompute it. Instead of one transaction per passport, new passports are
+queued in passport_anchors and sealed in batches: the content hashes of a
+batch are the leaves of a Merkle tree, every passport gets its inclusion
+proof (the sibling hashes up to the root) and only the root goes on-chain,
+as the data of one zero-value transaction. A batch is sealed when
+ANCHOR_BATCH_SIZE passports are waiting or the oldest one has waited
+ANCHOR_MAX_WAIT_SECONDS.
+
+    write paths         generate-nft, passport_batch   add_pending
+    content changes     text_repair                    requeue (old proof -> passport_anchor_history)
+    lifespan task       schedule                       enqueues anchor_passports when a batch is due
+    job                 anchor_passports               next_batch, Web3Chain.anchor, mark_anchored
+    API                 GET /api/passport/{id}/proof   proof_for (+ on-chain root check)
+
+Leaves and inner nodes are hashed with different prefixes (0x00 / 0x01) so
+an inner node can't be passed off as a leaf; an odd node at the end of a
+level moves up unpaired. Proofs are verified locally with `verify_proof`,
+the chain is only asked whether the transaction carries the root.
+
+Anchored content is not edited in place: a path that rewrites CONTENT_FIELDS
+calls `requeue`, which recomputes blockchain_hash and queues the passport
+again; a proof it already had moves to passport_anchor_history, so the old
+content stays provable against its (possibly on-chain) root.
+
+The chain is reached through web3 at ANCHOR_RPC_URL with ANCHOR_PRIVATE_KEY.
+ANCHOR_CHAIN=local runs the same code against LocalChainProvider instead, an
+in-process stand-in that mines every raw transaction into its own block (for
+tests and development only: it forgets everything when the process exits).
+With neither set, batches are still sealed (proofs verify locally) but stay
+"sealed" until a chain is configured; nothing is marked anchored.
+
+Passports created before anchoring are queued on first start, or:
+
+    python anchoring.py backfill
+    python anchoring.py anchor
+    python anchoring.py verify <passport id>
+"""
+import asyncio
+import hashlib
+import json
+import os
+import sys
+import threading
+from collections import defaultdict, namedtuple
+from datetime import datetime, timedelta
+from typing import Iterable, List, Mapping, Optional
+
+import rlp
+from eth_account import Account
+from eth_utils import keccak
+from sqlalchemy import exists, func, insert, select, update
+from sqlalchemy.orm import Session
+from web3 import Web3
+from web3.providers.base import BaseProvider
+
+import jobs
+from database import AsyncSessionLocal, write_guard
+from models import AnchorBatch, Job, NFTPassport, PassportAnchor, PassportAnchorHistory
+
+ANCHOR_BATCH_SIZE = int(os.getenv("ANCHOR_BATCH_SIZE", "1024"))
+ANCHOR_MAX_WAIT = int(os.getenv("ANCHOR_MAX_WAIT_SECONDS", "600"))
+ANCHOR_CHECK_INTERVAL = float(os.getenv("ANCHOR_CHECK_INTERVAL", "30"))  # 0 disables the lifespan task
+ANCHOR_RPC_URL = os.getenv("ANCHOR_RPC_URL", "")
+ANCHOR_CHAIN = os.getenv("ANCHOR_CHAIN", "")  # "local": in-process stand-in instead of ANCHOR_RPC_URL
+ANCHOR_PRIVATE_KEY = os.getenv("ANCHOR_PRIVATE_KEY", "")
+ANCHOR_RECEIPT_TIMEOUT = int(os.getenv("ANCHOR_RECEIPT_TIMEOUT", "180"))
+BACKFILL_CHUNK_SIZE = 5000
+
+# Transaction data: tag + 32-byte root, so anchors are recognisable on a shared chain
+ANCHOR_DATA_PREFIX = b"DPP1"
+
+CONTENT_FIELDS = (
+    "id", "style_id", "product_code", "name", "collection_name", "materials", "production_location",
+    "carbon_footprint", "certificates", "supplier", "additional_info",
+)
+CONTENT_COLUMNS = [getattr(NFTPassport, field) for field in CONTENT_FIELDS]
+
+Receipt = namedtuple("Receipt", ["tx_hash", "block_number", "chain_id"])
+Batch = namedtuple("Batch", ["id", "merkle_root", "leaf_count"])
+
+
+def canonical_content(passport: Mapping) -> bytes:
+    """The anchored fields of a passport row as sorted, compact UTF-8 JSON"""
+    content = {field: passport.get(field) for field in CONTENT_FIELDS}
+    if content["carbon_footprint"] is not None:
+        content["carbon_footprint"] = float(content["carbon_footprint"])  # 0 and 0.0 read back alike
+    return json.dumps(content, sort_keys=True, separators=(",", ":"), ensure_ascii=False).encode("utf-8")
+
+
+def content_hash(passport: Mapping) -> str:
+    return hashlib.sha256(canonical_content(passport)).hexdigest()
+
+
+def leaf_hash(content_hash: str) -> bytes:
+    return hashlib.sha256(b"\x00" + bytes.fromhex(content_hash)).digest()
+
+
+def node_hash(left: bytes, right: bytes) -> bytes:
+    return hashlib.sha256(b"\x01" + left + right).digest()
+
+
+def merkle_levels(leaves: List[bytes]) -> List[List[bytes]]:
+    """Every level of the tree, leaves first and the root last"""
+    levels = [leaves]
+    while len(levels[-1]) > 1:
+        level = levels[-1]
+        parents = [node_hash(level[i], level[i + 1]) for i in range(0, len(level) - 1, 2)]
+        if len(level) % 2:
+            parents.append(level[-1])
+        levels.append(parents)
+    return levels
+
+
+def merkle_proof(levels: List[List[bytes]], index: int) -> List[List[str]]:
+    """Sibling hashes from the leaf up, each with the side it is on ("L" or "R")"""
+    proof = []
+    for level in levels[:-1]:
+        sibling = index ^ 1
+        if sibling < len(level):
+            proof.append(["L" if sibling < index else "R", level[sibling].hex()])
+        index //= 2
+    return proof
+
+
+def verify_proof(content_hash: str, proof: Iterable[List[str]], merkle_root: str) -> bool:
+    node = leaf_hash(content_hash)
+    for side, sibling in proof:
+        sibling = bytes.fromhex(sibling)
+        node = node_hash(sibling, node) if side == "L" else node_hash(node, sibling)
+    return node.hex() == merkle_root
+
+
+def add_pending(db: Session, passports: List[dict]):
+    """Queue freshly written passports (blockchain_hash already set) for the next batch"""
+    if not passports:
+        return
+    now = datetime.utcnow()
+    db.execute(insert(PassportAnchor.__table__), [
+        {"passport_id": passport["id"], "content_hash": passport["blockchain_hash"], "created_at": now}
+        for passport in passports
+    ])
+
+
+def requeue(db: Session, passport_ids: List[str]):
+    """Rehash passports whose content was rewritten and queue them again (caller commits)
+
+    A proof from a sealed batch is kept in passport_anchor_history; a passport
+    still pending just gets its new hash.
+    """
+    if not passport_ids:
+        return
+    rows = db.execute(select(*CONTENT_COLUMNS).where(NFTPassport.id.in_(passport_ids))).all()
+    passports = [dict(row._mapping) for row in rows]
+    for passport in passports:
+        passport["blockchain_hash"] = content_hash(passport)
+    anchors = {
+        anchor.passport_id: anchor
+        for anchor in db.execute(
+            select(*PassportAnchor.__table__.c).where(PassportAnchor.passport_id.in_(passport_ids))
+        )
+    }
+    changed = [p for p in passports if p["id"] not in anchors or anchors[p["id"]].content_hash != p["blockchain_hash"]]
+    if not changed:
+        return
+    now = datetime.utcnow()
+    db.execute(update(NFTPassport), [{"id": p["id"], "blockchain_hash": p["blockchain_hash"]} for p in changed])
+    sealed = [anchors[p["id"]] for p in changed if p["id"] in anchors and anchors[p["id"]].batch_id is not None]
+    if sealed:
+        db.execute(insert(PassportAnchorHistory.__table__), [
+            {"passport_id": anchor.passport_id, "content_hash": anchor.content_hash, "batch_id": anchor.batch_id,
+             "leaf_index": anchor.leaf_index, "proof": anchor.proof, "created_at": anchor.created_at,
+             "superseded_at": now}
+            for anchor in sealed
+        ])
+    requeued = [p for p in changed if p["id"] in anchors]
+    if requeued:
+        db.execute(update(PassportAnchor), [
+            {"passport_id": p["id"], "content_hash": p["blockchain_hash"], "batch_id": None, "leaf_index": None,
+             "proof": None, "created_at": now}
+            for p in requeued
+        ])
+    add_pending(db, [p for p in changed if p["id"] not in anchors])
+
+
+def needs_backfill(db: Session) -> bool:
+    return db.execute(
+        select(NFTPassport.id).where(~exists().where(PassportAnchor.passport_id == NFTPassport.id)).limit(1)
+    ).first() is not None
+
+
+def backfill(db: Session, chunk_size: int = BACKFILL_CHUNK_SIZE) -> int:
+    """Hash and queue passports created before anchoring, replacing their old blockchain_hash (caller commits)"""
+    queued = 0
+    while True:
+        rows = db.execute(
+            select(*CONTENT_COLUMNS)
+            .where(~exists().where(PassportAnchor.passport_id == NFTPassport.id))
+            .order_by(NFTPassport.id)
+            .limit(chunk_size)
+        ).all()
+        if not rows:
+            return queued
+        passports = [dict(row._mapping) for row in rows]
+        for passport in passports:
+            passport["blockchain_hash"] = content_hash(passport)
+        db.execute(update(NFTPassport), [
+            {"id": passport["id"], "blockchain_hash": passport["blockchain_hash"]} for passport in passports
+        ])
+        add_pending(db, passports)
+        queued += len(passports)
+
+
+def is_due(db: Session, now: Optional[datetime] = None) -> bool:
+    """A full batch is waiting, or the oldest pending passport has waited ANCHOR_MAX_WAIT seconds"""
+    pending = PassportAnchor.batch_id.is_(None)
+    oldest = db.execute(select(func.min(PassportAnchor.created_at)).where(pending)).scalar()
+    if oldest is None:
+        return False
+    if oldest <= (now or datetime.utcnow()) - timedelta(seconds=ANCHOR_MAX_WAIT):
+        return True
+    waiting = db.execute(
+        select(func.count()).select_from(
+            select(PassportAnchor.passport_id).where(pending).limit(ANCHOR_BATCH_SIZE).subquery()
+        )
+    ).scalar()
+    return waiting >= ANCHOR_BATCH_SIZE
+
+
+def seal_batch(db: Session, limit: int = ANCHOR_BATCH_SIZE) -> Optional[Batch]:
+    """Build the tree over the oldest pending passports and store each one's proof (caller commits)"""
+    pending = db.execute(
+        select(PassportAnchor.passport_id, PassportAnchor.content_hash)
+        .where(PassportAnchor.batch_id.is_(None))
+        .order_by(PassportAnchor.created_at, PassportAnchor.passport_id)
+        .limit(limit)
+        .with_for_update(skip_locked=True)  # PostgreSQL: concurrent sealers take disjoint passports
+    ).all()
+    if not pending:
+        return None
+    levels = merkle_levels([leaf_hash(digest) for _, digest in pending])
+    batch = AnchorBatch(merkle_root=levels[-1][0].hex(), leaf_count=len(pending), status="sealed")
+    db.add(batch)
+    db.flush()
+    db.execute(update(PassportAnchor), [
+        {"passport_id": passport_id, "batch_id": batch.id, "leaf_index": index, "proof": merkle_proof(levels, index)}
+        for index, (passport_id, _) in enumerate(pending)
+    ])
+    return Batch(batch.id, batch.merkle_root, batch.leaf_count)
+
+
+def seal_due(db: Session, force: bool = False) -> Optional[Batch]:
+    """A newly sealed batch if one is due (or forced)"""
+    if force or is_due(db):
+        return seal_batch(db)
+    return None
+
+
+def next_batch(db: Session, force: bool = False) -> Optional[Batch]:
+    """A sealed batch still waiting for its transaction, else a newly sealed one if due (or forced)"""
+    sealed = db.execute(
+        select(AnchorBatch.id, AnchorBatch.merkle_root, AnchorBatch.leaf_count)
+        .where(AnchorBatch.status == "sealed")
+        .order_by(AnchorBatch.id)
+        .limit(1)
+    ).first()
+    if sealed is not None:
+        return Batch(*sealed)
+    return seal_due(db, force)
+
+
+def mark_anchored(db: Session, batch_id: int, receipt: Receipt):
+    db.execute(
+        update(AnchorBatch)
+        .where(AnchorBatch.id == batch_id)
+        .values(status="anchored", tx_hash=receipt.tx_hash, block_number=receipt.block_number,
+                chain_id=receipt.chain_id, anchored_at=datetime.utcnow())
+    )
+
+
+def batch_to_dict(batch: AnchorBatch) -> dict:
+    return {
+        "id": batch.id,
+        "merkle_root": batch.merkle_root,
+        "leaf_count": batch.leaf_count,
+        "status": batch.status,
+        "chain_id": batch.chain_id,
+        "tx_hash": batch.tx_hash,
+        "block_number": batch.block_number,
+        "anchored_at": batch.anchored_at.isoformat() if batch.anchored_at else None,
+    }
+
+
+def proof_for(db: Session, passport_id: str) -> Optional[dict]:
+    """Inclusion proof of a passport, checked locally against its batch root and its current content
+
+    `history` lists the proofs of its earlier contents, oldest first.
+    """
+    anchor = db.get(PassportAnchor, passport_id)
+    if anchor is None:
+        return None
+    current = db.execute(select(*CONTENT_COLUMNS).where(NFTPassport.id == passport_id)).first()
+    current_hash = content_hash(current._mapping) if current else None
+    batch = db.get(AnchorBatch, anchor.batch_id) if anchor.batch_id is not None else None
+    history = []
+    for old in db.execute(
+        select(PassportAnchorHistory, AnchorBatch)
+        .join(AnchorBatch, AnchorBatch.id == PassportAnchorHistory.batch_id)
+        .where(PassportAnchorHistory.passport_id == passport_id)
+        .order_by(PassportAnchorHistory.id)
+    ):
+        entry, old_batch = old
+        history.append({
+            "content_hash": entry.content_hash,
+            "superseded_at": entry.superseded_at.isoformat() if entry.superseded_at else None,
+            "batch": batch_to_dict(old_batch),
+            "leaf_index": entry.leaf_index,
+            "proof": entry.proof,
+            "proof_valid": verify_proof(entry.content_hash, entry.proof, old_batch.merkle_root),
+        })
+    return {
+        "passport_id": passport_id,
+        "content_hash": anchor.content_hash,
+        "content_unchanged": current_hash == anchor.content_hash,
+        "status": batch.status if batch else "pending",
+        "batch": batch_to_dict(batch) if batch else None,
+        "leaf_index": anchor.leaf_index,
+        "proof": anchor.proof,
+        "proof_valid": batch is not None and verify_proof(anchor.content_hash, anchor.proof, batch.merkle_root),
+        "history": history,
+    }
+
+
+class LocalChainProvider(BaseProvider):
+    """In-process chain stand-in for the JSON-RPC calls Web3Chain makes
+
+    Raw transactions are checked (signature, nonce) and mined right away, one
+    block each, so the web3 signing and sending path runs unchanged in tests.
+    """
+    CHAIN_ID = 1337
+    GAS_PRICE = 10 ** 9
+
+    def __init__(self):
+        super().__init__()
+        self.block_number = 0
+        self.nonces = defaultdict(int)
+        self.transactions = {}
+        self._lock = threading.Lock()
+
+    def make_request(self, method, params):
+        rpc = getattr(self, "rpc_" + method, None)
+        if rpc is None:
+            return {"jsonrpc": "2.0", "id": 0, "error": {"code": -32601, "message": f"method not found: {method}"}}
+        try:
+            with self._lock:
+                return {"jsonrpc": "2.0", "id": 0, "result": rpc(*params)}
+        except ValueError as e:
+            return {"jsonrpc": "2.0", "id": 0, "error": {"code": -32000, "message": str(e)}}
+
+    def rpc_web3_clientVersion(self):
+        return "mango-dpp/local-chain"
+
+    def rpc_eth_chainId(self):
+        return hex(self.CHAIN_ID)
+
+    def rpc_eth_blockNumber(self):
+        return hex(self.block_number)
+
+    def rpc_eth_gasPrice(self):
+        return hex(self.GAS_PRICE)
+
+    def rpc_eth_getTransactionCount(self, address, block="latest"):
+        return hex(self.nonces[address.lower()])
+
+    def rpc_eth_estimateGas(self, tx, block="latest"):
+        data = bytes.fromhex((tx.get("data") or tx.get("input") or "0x")[2:])
+        return hex(21000 + sum(16 if byte else 4 for byte in data))
+
+    def rpc_eth_sendRawTransaction(self, raw_hex):
+        raw = bytes.fromhex(raw_hex[2:])
+        sender = Account.recover_transaction(raw).lower()
+        if raw[0] >= 0xc0:
+            nonce, gas_price, gas, to, value, data = rlp.decode(raw)[:6]
+        else:  # typed (EIP-2718) transaction: chain id, nonce, fees, gas, to, value, data, ...
+            fields = rlp.decode(raw[1:])
+            nonce, gas, to, value, data = fields[1], fields[-8], fields[-7], fields[-6], fields[-5]
+            gas_price = fields[-9]
+        nonce = int.from_bytes(nonce, "big")
+        if nonce != self.nonces[sender]:
+            raise ValueError(f"nonce {nonce} != expected {self.nonces[sender]}")
+        self.nonces[sender] += 1
+        self.block_number += 1
+        tx_hash = "0x" + keccak(raw).hex()
+        self.transactions[tx_hash] = {
+            "hash": tx_hash,
+            "blockNumber": hex(self.block_number),
+            "blockHash": "0x" + keccak(self.block_number.to_bytes(32, "big")).hex(),
+            "transactionIndex": "0x0",
+            "from": sender,
+            "to": "0x" + to.hex() if to else None,
+            "value": hex(int.from_bytes(value, "big")),
+            "gas": hex(int.from_bytes(gas, "big")),
+            "gasPrice": hex(int.from_bytes(gas_price, "big")),
+            "nonce": hex(nonce),
+            "input": "0x" + data.hex(),
+        }
+        return tx_hash
+
+    def rpc_eth_getTransactionByHash(self, tx_hash):
+        return self.transactions.get(tx_hash.lower())
+
+    def rpc_eth_getTransactionReceipt(self, tx_hash):
+        tx = self.transactions.get(tx_hash.lower())
+        if tx is None:
+            return None
+        return {
+            "transactionHash": tx["hash"],
+            "transactionIndex": "0x0",
+            "blockNumber": tx["blockNumber"],
+            "blockHash": tx["blockHash"],
+            "from": tx["from"],
+            "to": tx["to"],
+            "gasUsed": self.rpc_eth_estimateGas(tx),
+            "cumulativeGasUsed": self.rpc_eth_estimateGas(tx),
+            "effectiveGasPrice": tx["gasPrice"],
+            "contractAddress": None,
+            "logs": [],
+            "logsBloom": "0x" + "00" * 256,
+            "status": "0x1",
+        }
+
+
+class Web3Chain:
+    """Anchors a root as the data of a zero-value transaction from the anchoring account to itself"""
+
+    def __init__(self, w3: Web3, private_key):
+        self.w3 = w3
+        self.account = Account.from_key(private_key)
+
+    def anchor(self, merkle_root: bytes) -> Receipt:
+        w3 = self.w3
+        address = self.account.address
+        tx = {
+            "from": address,
+            "to": address,
+            "value": 0,
+            "data": ANCHOR_DATA_PREFIX + merkle_root,
+            "nonce": w3.eth.get_transaction_count(address, "pending"),
+            "chainId": w3.eth.chain_id,
+            "gasPrice": w3.eth.gas_price,
+        }
+        tx["gas"] = w3.eth.estimate_gas(tx)
+        del tx["from"]
+        signed = self.account.sign_transaction(tx)
+        tx_hash = w3.eth.send_raw_transaction(signed.raw_transaction)
+        receipt = w3.eth.wait_for_transaction_receipt(tx_hash, timeout=ANCHOR_RECEIPT_TIMEOUT)
+        if receipt["status"] != 1:
+            raise RuntimeError(f"Anchor transaction {Web3.to_hex(tx_hash)} reverted")
+        return Receipt(Web3.to_hex(tx_hash), receipt["blockNumber"], tx["chainId"])
+
+    def root_of(self, tx_hash: str) -> Optional[str]:
+        """The Merkle root a transaction anchored (hex), or None if it isn't an anchor"""
+        try:
+            data = bytes(self.w3.eth.get_transaction(tx_hash)["input"])
+        except Exception:
+            return None
+        if not data.startswith(ANCHOR_DATA_PREFIX):
+            return None
+        return data[len(ANCHOR_DATA_PREFIX):].hex()
+
+
+_chain: Optional[Web3Chain] = None
+
+
+def chain() -> Optional[Web3Chain]:
+    """The configured chain (ANCHOR_CHAIN=local: the in-process stand-in), None when there is none"""
+    global _chain
+    if _chain is None:
+        if ANCHOR_CHAIN not in ("", "local"):
+            raise RuntimeError(f"Unknown ANCHOR_CHAIN {ANCHOR_CHAIN!r} (use local or set ANCHOR_RPC_URL)")
+        if ANCHOR_CHAIN == "local":
+            print("ANCHOR_CHAIN=local: anchoring to the in-process local chain")
+            _chain = Web3Chain(Web3(LocalChainProvider()), ANCHOR_PRIVATE_KEY or Account.create().key)
+        elif ANCHOR_RPC_URL:
+            if not ANCHOR_PRIVATE_KEY:
+                raise RuntimeError("ANCHOR_PRIVATE_KEY is required with ANCHOR_RPC_URL")
+            _chain = Web3Chain(Web3(Web3.HTTPProvider(ANCHOR_RPC_URL)), ANCHOR_PRIVATE_KEY)
+    return _chain
+
+
+def verify_on_chain(batch: dict) -> Optional[bool]:
+    """Whether the batch's transaction carries its root; None while it isn't anchored or without a chain"""
+    if not batch or not batch["tx_hash"]:
+        return None
+    anchor_chain = chain()
+    if anchor_chain is None:
+        return None
+    return anchor_chain.root_of(batch["tx_hash"]) == batch["merkle_root"]
+
+
+def needs_job(db: Session) -> bool:
+    """A batch is due (or sealed but not anchored, with a chain) and no anchor_passports job is queued or running"""
+    active = db.execute(
+        select(exists().where(Job.kind == "anchor_passports", Job.status.in_(("queued", "running"))))
+    ).scalar()
+    if active:
+        return False
+    if chain() is not None and db.execute(select(exists().where(AnchorBatch.status == "sealed"))).scalar():
+        return True
+    return is_due(db)
+
+
+async def schedule(interval: float = ANCHOR_CHECK_INTERVAL):
+    """Lifespan task: enqueue an anchor_passports job whenever a batch is due"""
+    if interval <= 0:
+        return
+    while True:
+        await asyncio.sleep(interval)
+        try:
+            async with AsyncSessionLocal() as db:
+                if not await db.run_sync(needs_job):
+                    continue
+                async with write_guard():
+                    db.add(jobs.new_job("anchor_passports", {"force": False}))
+                    await db.commit()
+            jobs.pool.notify()
+        except Exception as e:
+            print(f"Anchoring zamanlama hatası: {e}")
+
+
+def anchor_all(db: Session, force: bool = True) -> List[dict]:
+    """Seal and anchor batches until none is due, committing after each step (CLI; the app uses the job)
+
+    Without a chain the batches are only sealed and none is returned.
+    """
+    anchor_chain = chain()
+    anchored = []
+    while True:
+        batch = next_batch(db, force) if anchor_chain else seal_due(db, force)
+        db.commit()
+        if batch is None:
+            return anchored
+        if anchor_chain is None:
+            continue
+        receipt = anchor_chain.anchor(bytes.fromhex(batch.merkle_root))
+        mark_anchored(db, batch.id, receipt)
+        db.commit()
+        anchored.append({"batch_id": batch.id, "leaf_count": batch.leaf_count, "tx_hash": receipt.tx_hash})
+
+
+if __name__ == "__main__":
+    from database import SessionLocal, init_db
+
+    if not (sys.argv[1:] in (["backfill"], ["anchor"]) or (len(sys.argv) == 3 and sys.argv[1] == "verify")):
+        print("Usage: python anchoring.py backfill|anchor|verify <passport id>")
+        sys.exit(1)
+
+    init_db()
+    db = SessionLocal()
+    try:
+        if sys.argv[1] == "anchor" and chain() is None:
+            print("ANCHOR_RPC_URL not set (or ANCHOR_CHAIN=local): batches are sealed but not anchored")
+        if sys.argv[1] == "backfill":
+            queued = backfill(db)
+            db.commit()
+            print(f"anchoring backfill: {queued} passports queued")
+        elif sys.argv[1] == "anchor":
+            for batch in anchor_all(db):
+                print(f"batch {batch['batch_id']}: {batch['leaf_count']} passports, tx {batch['tx_hash']}")
+        else:
+            proof = proof_for(db, sys.argv[2])
+            if proof is None:
+                print("passport is not queued for anchoring")
+                sys.exit(1)
+            proof["on_chain"] = verify_on_chain(proof["batch"])
+            print(json.dumps(proof, indent=2))
+    finally:
+        db.close()
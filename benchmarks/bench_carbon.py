@@ -0,0 +1,98 @@
+"""Carbon engine benchmark: scalar per-style path vs. vectorized NumPy batch
+
+Usage:
+    python benchmarks/bench_carbon.py --sizes 10000 100000 500000
+    python benchmarks/bench_carbon.py --sizes 100000 --recompute
+
+Scores synthetic catalogs with carbon_engine.footprint (one call per style,
+what style creation does) and carbon_engine.footprints (whole arrays), and
+checks both agree. --recompute also times a full `recompute` against a
+seeded throwaway SQLite database.
+"""
+import argparse
+import os
+import random
+import sys
+import tempfile
+import time
+import uuid
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import numpy as np
+from sqlalchemy import create_engine, insert
+from sqlalchemy.orm import sessionmaker
+
+import carbon_engine
+import rollups
+import style_materials
+from models import Base, Style
+
+MATERIAL_CHOICES = list(carbon_engine.MATERIAL_FACTORS) + ["Pamuk", "elastan", "viskon"]
+LOCATION_CHOICES = ["Türkiye", "Çin", "Vietnam", "Hindistan", "Bangladeş", "Portekiz", None]
+
+
+def catalog(n: int, rng: random.Random):
+    materials = [rng.sample(MATERIAL_CHOICES, rng.randint(1, 4)) for _ in range(n)]
+    locations = [rng.choice(LOCATION_CHOICES) for _ in range(n)]
+    return materials, locations
+
+
+def best_of(fn, repeat: int) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        started = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - started)
+    return best * 1000
+
+
+def bench_recompute(n: int, materials, locations):
+    with tempfile.TemporaryDirectory() as tmp:
+        engine = create_engine(f"sqlite:///{tmp}/carbon.db")
+        Base.metadata.create_all(engine)
+        with engine.begin() as conn:
+            conn.execute(insert(Style), [
+                {"id": str(uuid.uuid4()), "name": f"Style {i}", "category": "Elbise",
+                 "materials": materials[i], "production_location": locations[i], "carbon_footprint": 0.0}
+                for i in range(n)
+            ])
+        db = sessionmaker(bind=engine)()
+        style_materials.backfill(db)
+        rollups.rebuild(db)
+        db.commit()
+        started = time.perf_counter()
+        result = carbon_engine.recompute(db)
+        elapsed = time.perf_counter() - started
+        db.close()
+        engine.dispose()
+    print(f"recompute {n} styles: {elapsed * 1000:.0f} ms ({result['changed'] / elapsed:,.0f} styles/s)")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10000, 100000, 500000])
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--recompute", action="store_true", help="Also time a database recompute per size")
+    args = parser.parse_args()
+
+    rng = random.Random(42)
+    print(f"{'styles':>10} {'scalar (ms)':>12} {'numpy (ms)':>11} {'speedup':>8}")
+    for size in args.sizes:
+        materials, locations = catalog(size, rng)
+
+        scalar = [carbon_engine.footprint(m, l) for m, l in zip(materials, locations)]
+        batch = carbon_engine.footprints(materials, locations)
+        mismatches = int(np.count_nonzero(np.abs(batch - np.array(scalar)) > 1e-9))
+
+        scalar_ms = best_of(lambda: [carbon_engine.footprint(m, l) for m, l in zip(materials, locations)], args.repeat)
+        numpy_ms = best_of(lambda: carbon_engine.footprints(materials, locations), args.repeat)
+        print(f"{size:>10} {scalar_ms:>12.1f} {numpy_ms:>11.1f} {scalar_ms / numpy_ms:>7.1f}x"
+              + (f"  ({mismatches} mismatches)" if mismatches else ""))
+
+        if args.recompute:
+            bench_recompute(size, materials, locations)
+
+
+if __name__ == "__main__":
+    main()
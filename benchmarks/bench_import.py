@@ -0,0 +1,94 @@
+"""Bulk style import benchmark (style_import.import_stream)
+
+Usage:
+    python benchmarks/bench_import.py --rows 100000
+    python benchmarks/bench_import.py --rows 100000 --format jsonl --chunk-size 10000
+
+Writes a synthetic supplier file, imports it into a throwaway migrated SQLite
+database and reports styles/s. Exits non-zero below --target (default 10k/s).
+"""
+import argparse
+import csv
+import json
+import os
+import random
+import sys
+import tempfile
+import time
+import uuid
+
+REPO_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, REPO_DIR)
+
+MATERIALS = ["pamuk", "polyester", "yün", "ipek", "keten", "organik_pamuk", "elastan", "viskon"]
+LOCATIONS = ["Türkiye", "Çin", "Vietnam", "Hindistan", "Bangladeş", "Portekiz"]
+CATEGORIES = ["Üst Giyim", "Alt Giyim", "Elbise", "Dış Giyim", "Aksesuar"]
+
+
+def synthetic_rows(n: int, rng: random.Random):
+    for i in range(n):
+        yield {
+            "name": f"Stil {i}",
+            "category": rng.choice(CATEGORIES),
+            "materials": rng.sample(MATERIALS, rng.randint(1, 3)),
+            "target_price": round(rng.uniform(9.9, 199.9), 2),
+            "production_location": rng.choice(LOCATIONS),
+            "supplier": f"Tedarikçi {i % 40}",
+        }
+
+
+def write_file(path: str, fmt: str, n: int):
+    rng = random.Random(42)
+    with open(path, "w", encoding="utf-8", newline="") as f:
+        if fmt == "csv":
+            writer = csv.DictWriter(f, fieldnames=["name", "category", "materials", "target_price",
+                                                   "production_location", "supplier"])
+            writer.writeheader()
+            for row in synthetic_rows(n, rng):
+                writer.writerow({**row, "materials": ",".join(row["materials"])})
+        else:
+            for row in synthetic_rows(n, rng):
+                f.write(json.dumps(row, ensure_ascii=False) + "\n")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rows", type=int, default=100000)
+    parser.add_argument("--format", choices=["csv", "jsonl"], default="csv")
+    parser.add_argument("--chunk-size", type=int, default=5000)
+    parser.add_argument("--target", type=float, default=10000, help="Minimum styles/s")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        os.environ["DATABASE_URL"] = f"sqlite:///{tmp}/import.db"
+        os.environ.pop("ASYNC_DATABASE_URL", None)
+
+        import style_import
+        from database import SessionLocal, engine, init_db
+        from models import Collection
+
+        init_db()
+        db = SessionLocal()
+        collection = Collection(id=str(uuid.uuid4()), name="Benchmark", season="İlkbahar/Yaz", year=2025, description="bench")
+        db.add(collection)
+        db.commit()
+
+        path = os.path.join(tmp, f"styles.{args.format}")
+        started = time.perf_counter()
+        write_file(path, args.format, args.rows)
+        print(f"wrote {args.rows} rows in {time.perf_counter() - started:.1f}s")
+
+        with open(path, "rb") as f:
+            result = style_import.import_stream(db, f, args.format, collection.id, args.chunk_size)
+        db.close()
+        engine.dispose()
+
+    rate = result["styles_per_second"]
+    print(f"imported {result['imported']} ({result['rejected']} rejected) in {result['seconds']}s: {rate:,} styles/s")
+    if rate < args.target:
+        print(f"below target of {args.target:,.0f} styles/s")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,50 @@
+"""QR rendering benchmark: serial vs. the passport_batch process pool
+
+Usage:
+    python benchmarks/bench_qr_batch.py --count 2000 --processes 1 2 4 8
+
+Renders --count passport QR codes on one core, then through
+passport_batch.render_qr_codes with each pool size, and prints codes/s.
+"""
+import argparse
+import asyncio
+import os
+import sys
+import time
+import uuid
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import passport_batch
+import qr_store
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--count", type=int, default=2000)
+    parser.add_argument("--processes", type=int, nargs="+", default=[1, 2, os.cpu_count() or 1])
+    args = parser.parse_args()
+
+    urls = [f"https://mangodpp.com/passport/{uuid.uuid4()}" for _ in range(args.count)]
+
+    started = time.perf_counter()
+    for url in urls:
+        qr_store.render_png(url)
+    serial = time.perf_counter() - started
+    print(f"{'serial':<12} {serial * 1000:>10.0f} ms {args.count / serial:>10.0f} codes/s")
+
+    for processes in sorted(set(args.processes)):
+        passport_batch.QR_PROCESSES = processes
+        passport_batch.shutdown()
+        asyncio.run(passport_batch.render_qr_codes(urls[:processes]))  # warm up the pool
+        started = time.perf_counter()
+        pngs = asyncio.run(passport_batch.render_qr_codes(urls))
+        elapsed = time.perf_counter() - started
+        assert len(pngs) == args.count
+        print(f"{f'{processes} procs':<12} {elapsed * 1000:>10.0f} ms {args.count / elapsed:>10.0f} codes/s "
+              f"({serial / elapsed:.1f}x)")
+    passport_batch.shutdown()
+
+
+if __name__ == "__main__":
+    main()
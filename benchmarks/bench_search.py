@@ -0,0 +1,111 @@
+"""Search latency benchmark: /api/search queries against a large catalog
+
+Usage:
+    python benchmarks/synthetic.py --db /tmp/catalog.db --styles 1000000
+    python benchmarks/bench_search.py --db /tmp/catalog.db [--repeat 20] [--max-ms 50]
+    python benchmarks/bench_search.py --styles 100000     # seed a throwaway catalog first
+
+Migrates the database, builds the search index if it is empty (timed), then
+runs selective and broad queries, a kind filter and a walk over several
+cursor pages through search.search, the function behind GET /api/search.
+Reports the median and worst time per query; with --max-ms exits 1 when a
+median is slower than that.
+"""
+import argparse
+import os
+import statistics
+import sys
+import tempfile
+import time
+
+REPO_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, REPO_DIR)
+
+from benchmarks import synthetic
+
+
+def queries(db) -> list:
+    """(label, query, kind, pages)"""
+    from sqlalchemy import select
+    from models import NFTPassport, Style
+
+    style_name = db.execute(select(Style.name).order_by(Style.id).limit(1)).scalar()
+    product_code = db.execute(select(NFTPassport.product_code).order_by(NFTPassport.id).limit(1)).scalar()
+    return [
+        ("exact style name", style_name, None, 1),
+        ("style number", style_name.split()[-1], None, 1),
+        ("product code prefix", product_code[:7] if product_code else "mng", "passport", 1),
+        ("two rare words", "saigon ipek", None, 1),
+        ("turkish folding", "DIŞ GİYİM BANGLADEŞ", None, 1),
+        ("broad word", "pamuk", None, 1),
+        ("broad prefix", "gi", None, 1),
+        ("broad, passports only", "turkiye", "passport", 1),
+        ("broad, 5 pages deep", "polyester", None, 5),
+    ]
+
+
+def run(db, query: str, kind, pages: int) -> int:
+    import search
+
+    cursor, hits = None, 0
+    for _ in range(pages):
+        page = search.search(db, query, kind, cursor, 24)
+        hits += len(page.items)
+        cursor = page.next_cursor
+        if not cursor:
+            break
+    return hits
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--db", help="Existing SQLite catalog (e.g. from benchmarks/synthetic.py)")
+    parser.add_argument("--styles", type=int, default=100000, help="Seed a throwaway catalog of this size")
+    parser.add_argument("--repeat", type=int, default=20)
+    parser.add_argument("--max-ms", type=float, default=0, help="Exit non-zero if a median is above this")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        db_path = args.db
+        if not db_path:
+            db_path = os.path.join(tmp, "search.db")
+            synthetic.generate(db_path, n_styles=args.styles, passport_ratio=0.5)
+        os.environ["DATABASE_URL"] = f"sqlite:///{os.path.abspath(db_path)}"
+        os.environ.pop("ASYNC_DATABASE_URL", None)
+
+        import search
+        from database import SessionLocal, engine, init_db
+
+        init_db()
+        db = SessionLocal()
+        try:
+            if not search.is_built(db):
+                started = time.perf_counter()
+                indexed = search.rebuild(db)
+                db.commit()
+                elapsed = time.perf_counter() - started
+                print(f"indexed {indexed:,} documents in {elapsed:.1f}s ({indexed / elapsed:,.0f}/s)")
+
+            slow = []
+            print(f"{'query':<24} {'text':<26} {'hits':>5} {'median ms':>10} {'max ms':>8}")
+            for label, query, kind, pages in queries(db):
+                times = []
+                for _ in range(args.repeat):
+                    started = time.perf_counter()
+                    hits = run(db, query, kind, pages)
+                    times.append((time.perf_counter() - started) * 1000)
+                median = statistics.median(times)
+                if args.max_ms and median > args.max_ms:
+                    slow.append(label)
+                print(f"{label:<24} {query[:26]:<26} {hits:>5} {median:>10.2f} {max(times):>8.2f}")
+        finally:
+            db.close()
+            engine.dispose()
+
+    if slow:
+        print(f"median above {args.max_ms} ms: {', '.join(slow)}")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
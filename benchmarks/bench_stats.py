@@ -0,0 +1,124 @@
+"""Dashboard stats benchmark: full-table loads vs. SQL aggregates
+
+Usage:
+    python benchmarks/bench_stats.py --sizes 1000 10000 100000
+
+Seeds a throwaway SQLite database per size and times the old
+`get_collections/get_styles/get_nfts` + len() path against stats.py, which
+reads the totals from the rollup tables (rebuilt after seeding) and should
+stay flat as the catalog grows.
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+import uuid
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sqlalchemy import create_engine, insert
+from sqlalchemy.orm import sessionmaker
+
+import rollups
+import stats
+from models import Base, Collection, Style, NFTPassport
+
+QR_PAYLOAD = "data:image/png;base64," + "A" * 4000  # ~ a real QR data URI
+
+
+def seed(engine, n_styles: int):
+    """Insert n_styles styles (and as many passports) spread over collections"""
+    n_collections = max(1, n_styles // 100)
+    now = datetime.utcnow()
+    collection_ids = [str(uuid.uuid4()) for _ in range(n_collections)]
+
+    with engine.begin() as conn:
+        conn.execute(insert(Collection), [
+            {"id": cid, "name": f"Collection {i}", "season": "İlkbahar/Yaz", "year": 2025,
+             "description": "benchmark", "created_at": now - timedelta(minutes=i)}
+            for i, cid in enumerate(collection_ids)
+        ])
+        for start in range(0, n_styles, 10000):
+            styles = []
+            passports = []
+            for i in range(start, min(start + 10000, n_styles)):
+                sid = str(uuid.uuid4())
+                styles.append({
+                    "id": sid, "name": f"Style {i}", "collection_id": collection_ids[i % n_collections],
+                    "category": "Elbise", "materials": ["pamuk", "polyester"], "target_price": 19.9,
+                    "production_location": "Türkiye", "supplier": "ABC Tekstil",
+                    "carbon_footprint": 2.5 + (i % 50) / 10, "status": "design",
+                })
+                passports.append({
+                    "id": str(uuid.uuid4()), "style_id": sid, "product_code": f"MNG-{sid[:8]}",
+                    "name": f"Style {i}", "materials": ["pamuk", "polyester"], "certificates": [],
+                    "qr_code_data": QR_PAYLOAD,
+                })
+            conn.execute(insert(Style), styles)
+            conn.execute(insert(NFTPassport), passports)
+    with sessionmaker(bind=engine)() as db:
+        rollups.rebuild(db)
+        db.commit()
+
+
+def old_path(db):
+    collections = db.query(Collection).all()
+    styles = db.query(Style).all()
+    nfts = db.query(NFTPassport).all()
+    return {
+        "collections": len(collections),
+        "styles": len(styles),
+        "nfts": len(nfts),
+        "total_carbon": sum([s.carbon_footprint or 0 for s in styles]),
+        "recent": collections[:5],
+    }
+
+
+def new_path(db):
+    totals = stats.get_totals(db)
+    totals["recent"] = stats.get_recent_collections(db, limit=5)
+    return totals
+
+
+def timed(fn, session_factory, repeat: int) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        db = session_factory()
+        try:
+            started = time.perf_counter()
+            fn(db)
+            best = min(best, time.perf_counter() - started)
+        finally:
+            db.close()
+    return best * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1000, 10000, 50000])
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--skip-old-above", type=int, default=200000,
+                        help="Skip the full-load path above this many styles")
+    args = parser.parse_args()
+
+    print(f"{'styles':>10} {'old (ms)':>12} {'stats.py (ms)':>14} {'speedup':>9}")
+    for size in args.sizes:
+        with tempfile.TemporaryDirectory() as tmp:
+            engine = create_engine(f"sqlite:///{tmp}/bench.db")
+            Base.metadata.create_all(engine)
+            seed(engine, size)
+            session_factory = sessionmaker(bind=engine)
+
+            new_ms = timed(new_path, session_factory, args.repeat)
+            if size <= args.skip_old_above:
+                old_ms = timed(old_path, session_factory, args.repeat)
+                print(f"{size:>10} {old_ms:>12.1f} {new_ms:>14.2f} {old_ms / new_ms:>8.0f}x")
+            else:
+                print(f"{size:>10} {'-':>12} {new_ms:>14.2f} {'-':>9}")
+            engine.dispose()
+
+
+if __name__ == "__main__":
+    main()
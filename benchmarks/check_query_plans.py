@@ -0,0 +1,189 @@
+"""Query-plan check: the hot queries must use their indexes
+
+Usage:
+    python benchmarks/check_query_plans.py                 # throwaway SQLite, migrated + seeded
+    python benchmarks/check_query_plans.py --url postgresql://...  # an existing, migrated database
+
+Runs the real query code (listings, stats, rollups, materials, passports, jobs), captures
+the SELECT each one sends, EXPLAINs it and asserts the expected index shows
+up in the plan (or, for primary-key lookups, that nothing is fully scanned).
+Nothing is written: with --url everything runs in a rolled-back transaction.
+Exits non-zero when a plan regresses.
+"""
+import argparse
+import os
+import sys
+import tempfile
+import uuid
+from datetime import datetime, timedelta
+
+REPO_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, REPO_DIR)
+
+
+def seed(engine, n_styles: int):
+    from sqlalchemy import insert, text
+
+    import style_materials
+    from models import Collection, Style, NFTPassport
+
+    now = datetime.utcnow()
+    collection_ids = [str(uuid.uuid4()) for _ in range(max(1, n_styles // 100))]
+    with engine.begin() as conn:
+        conn.execute(insert(Collection), [
+            {"id": cid, "name": f"Collection {i}", "season": "İlkbahar/Yaz", "year": 2025,
+             "description": "plan check", "created_at": now - timedelta(minutes=i)}
+            for i, cid in enumerate(collection_ids)
+        ])
+        styles, passports = [], []
+        for i in range(n_styles):
+            sid = str(uuid.uuid4())
+            styles.append({
+                "id": sid, "name": f"Style {i}", "collection_id": collection_ids[i % len(collection_ids)],
+                "category": "Elbise", "materials": ["pamuk", "polyester"], "target_price": 19.9,
+                "production_location": "Türkiye", "supplier": "ABC Tekstil",
+                "carbon_footprint": 2.5 + (i % 50) / 10, "status": "design",
+                "created_at": now - timedelta(seconds=i),
+            })
+            passports.append({
+                "id": str(uuid.uuid4()), "style_id": sid, "product_code": f"MNG-{sid[:8]}",
+                "name": f"Style {i}", "materials": ["pamuk", "polyester"], "certificates": [],
+            })
+        conn.execute(insert(Style), styles)
+        conn.execute(insert(NFTPassport), passports)
+        conn.execute(text(style_materials.BACKFILL_SQL[engine.dialect.name]))
+        if engine.dialect.name == "sqlite":
+            conn.exec_driver_sql("ANALYZE")
+
+
+def checks(db):
+    """(name, expected index or None for "no full scan", function issuing the query)"""
+    from sqlalchemy import select
+
+    import jobs
+    import listings
+    import passports
+    import rollups
+    import stats
+    import style_materials
+    from models import Style, NFTPassport, Job
+
+    style = db.execute(select(Style).limit(1)).scalar_one()
+    passport_id = db.execute(select(NFTPassport.id).limit(1)).scalar_one()
+    cursor = listings.encode_cursor(style.created_at, style.id)
+
+    return [
+        ("styles of a collection", "ix_styles_collection_id_created_at_id",
+         lambda: listings.list_styles(db, {"collection": style.collection_id})),
+        ("styles listing, deep page", "ix_styles_created_at_id",
+         lambda: listings.list_styles(db, {}, cursor)),
+        ("collections listing", "ix_collections_created_at_id",
+         lambda: listings.list_collections(db, {})),
+        ("dashboard style counts", "ix_styles_collection_id_created_at_id",
+         lambda: stats.style_counts_for(db, [style.collection_id])),
+        ("lowest-carbon ranking", "ix_styles_carbon_id",
+         lambda: rollups.refresh_low_carbon_styles(db)),
+        ("styles of a location", "ix_styles_location_created_at_id",
+         lambda: listings.list_styles(db, {"location": style.production_location})),
+        ("location analytics", "ix_styles_location_created_at_id",
+         lambda: stats.location_stats(db)),
+        ("material analytics", "ix_style_materials_material_style_id",
+         lambda: style_materials.grouped(db)),
+        ("passports of a style", "ix_nft_passports_style_id",
+         lambda: db.execute(select(NFTPassport.id).where(NFTPassport.style_id == style.id)).all()),
+        ("passport page", None,
+         lambda: passports.resolve(db, passport_id)),
+        ("job claim", "ix_jobs_status_available_at",
+         lambda: db.execute(
+             select(Job.id).where(jobs._claimable(datetime.utcnow())).order_by(Job.available_at).limit(1)
+         ).all()),
+    ]
+
+
+def capture_select(engine, fn):
+    """First SELECT statement (with its parameters) that fn sends to the database"""
+    from sqlalchemy import event
+
+    captured = []
+
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        if not captured and statement.lstrip().upper().startswith("SELECT"):
+            captured.append((statement, parameters))
+
+    event.listen(engine, "before_cursor_execute", before_cursor_execute)
+    try:
+        fn()
+    finally:
+        event.remove(engine, "before_cursor_execute", before_cursor_execute)
+    return captured[0]
+
+
+def explain(db, statement, parameters) -> str:
+    connection = db.connection()
+    if connection.dialect.name == "sqlite":
+        rows = connection.exec_driver_sql("EXPLAIN QUERY PLAN " + statement, parameters).all()
+        return "\n".join(row[-1] for row in rows)
+    rows = connection.exec_driver_sql("EXPLAIN " + statement, parameters).all()
+    return "\n".join(row[0] for row in rows)
+
+
+def full_scan(plan: str, dialect: str) -> bool:
+    if dialect == "sqlite":
+        return any(line.startswith("SCAN ") and " USING " not in line for line in plan.splitlines())
+    return "Seq Scan" in plan
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--url", help="Check this database instead of a seeded throwaway SQLite file")
+    parser.add_argument("--styles", type=int, default=5000)
+    parser.add_argument("-v", "--verbose", action="store_true", help="Print every plan")
+    args = parser.parse_args()
+
+    tmp = None
+    if args.url:
+        os.environ["DATABASE_URL"] = args.url
+    else:
+        tmp = tempfile.TemporaryDirectory()
+        os.environ["DATABASE_URL"] = f"sqlite:///{tmp.name}/plans.db"
+    os.environ.pop("ASYNC_DATABASE_URL", None)
+
+    from sqlalchemy import text
+    from database import SessionLocal, engine, init_db
+
+    if tmp:
+        init_db()
+        seed(engine, args.styles)
+
+    failures = 0
+    db = SessionLocal()
+    try:
+        if engine.dialect.name == "postgresql":
+            # Small tables make sequential scans look cheaper; we want to know an index *can* be used
+            db.execute(text("SET LOCAL enable_seqscan = off"))
+        for name, index, fn in checks(db):
+            statement, parameters = capture_select(engine, fn)
+            plan = explain(db, statement, parameters)
+            if index:
+                ok = index in plan
+            else:
+                ok = not full_scan(plan, engine.dialect.name)
+            failures += not ok
+            print(f"{'ok  ' if ok else 'FAIL'} {name:<28} {index or 'no full scan'}")
+            if args.verbose or not ok:
+                print("\n".join("       " + line for line in plan.splitlines()))
+    finally:
+        db.rollback()
+        db.close()
+        engine.dispose()
+        if tmp:
+            tmp.cleanup()
+
+    if failures:
+        print(f"{failures} query plan(s) don't use their index")
+        sys.exit(1)
+    print("All hot queries use their indexes")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,345 @@
+"""Concurrent mixed-traffic load test against the real app
+
+Usage:
+    python benchmarks/load_mixed.py --styles 20000 --concurrency 32 --duration 20
+    python benchmarks/load_mixed.py --styles 20000 --rate 50 --duration 20
+    python benchmarks/load_mixed.py --server gunicorn --workers 4 --out new.json --compare old.json
+    python benchmarks/load_mixed.py --server inprocess --duration 10
+    python benchmarks/load_mixed.py --app-dir /tmp/old-checkout --out old.json
+
+Seeds a throwaway SQLite database with benchmarks/synthetic.py (collections,
+styles with realistic material mixes, passports) and drives the app with a
+realistic mix: QR-scan passport reads, dashboard and stats views, the heavy
+materials page, style listing, style creation and NFT generation.
+
+--server picks how the app runs:
+    uvicorn    `uvicorn main:app` from --app-dir (default)
+    gunicorn   `gunicorn -c gunicorn.conf.py main:app` with --workers workers
+    inprocess  this checkout's main.app in this process over an ASGI
+               transport (no sockets, no worker processes; shows the app's
+               own cost)
+
+Point --app-dir at a `git worktree` of another revision to compare. Prints
+requests, throughput and p50/p95/p99 per route; --out saves them as JSON and
+--compare prints the change against a JSON saved by an earlier run.
+"""
+import argparse
+import asyncio
+import json
+import os
+import platform
+import random
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime
+
+REPO_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, REPO_DIR)
+
+import aiohttp
+
+from benchmarks import synthetic
+
+# (route name, weight)
+MIX = [
+    ("passport", 40),
+    ("dashboard", 15),
+    ("api_stats", 8),
+    ("materials", 7),
+    ("api_styles", 10),
+    ("create_style", 15),
+    ("generate_nft", 5),
+]
+
+
+class HTTPClient:
+    """aiohttp against a server listening on base_url"""
+
+    def __init__(self, base_url: str, limit: int):
+        self.base_url = base_url
+        self.session = aiohttp.ClientSession(connector=aiohttp.TCPConnector(limit=limit))
+
+    async def request(self, method: str, path: str, data=None) -> int:
+        async with self.session.request(method, self.base_url + path, data=data) as resp:
+            await resp.read()
+            return resp.status
+
+    async def close(self):
+        await self.session.close()
+
+
+class InProcessClient:
+    """httpx over an ASGI transport straight into main.app"""
+
+    def __init__(self, app):
+        import httpx
+        self.client = httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://loadtest")
+
+    async def request(self, method: str, path: str, data=None) -> int:
+        resp = await self.client.request(method, path, data=data)
+        return resp.status_code
+
+    async def close(self):
+        await self.client.aclose()
+
+
+def build_request(name: str, catalog: synthetic.Catalog, nft_candidates: list):
+    """(method, path, form data) for one request of the mix"""
+    if name == "passport":
+        return "GET", f"/passport/{random.choice(catalog.nft_ids)}", None
+    if name == "dashboard":
+        return "GET", "/", None
+    if name == "api_stats":
+        return "GET", "/api/stats", None
+    if name == "materials":
+        return "GET", "/sustainability/materials", None
+    if name == "api_styles":
+        return "GET", f"/api/styles?collection={random.choice(catalog.collection_ids)}", None
+    if name == "generate_nft":
+        # Styles that have no passport yet; once used up, styles get another one
+        style_id = nft_candidates.pop() if nft_candidates else random.choice(catalog.style_ids)
+        return "POST", "/generate-nft", {"style_id": style_id, "certificates": "GOTS, OEKO-TEX"}
+    materials = random.choices([m for m, _ in synthetic.MATERIAL_MIXES], [w for _, w in synthetic.MATERIAL_MIXES])[0]
+    return "POST", "/styles", {
+        "name": "Load Style", "collection_id": random.choice(catalog.collection_ids),
+        "category": random.choice(synthetic.CATEGORIES), "materials": ", ".join(materials),
+        "target_price": "19.9", "production_location": random.choice(synthetic.LOCATIONS)[0],
+        "supplier": random.choice(synthetic.SUPPLIERS),
+    }
+
+
+def free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+async def wait_ready(base_url: str, timeout: float = 60):
+    deadline = time.monotonic() + timeout
+    async with aiohttp.ClientSession() as session:
+        while time.monotonic() < deadline:
+            try:
+                async with session.get(f"{base_url}/api/stats") as resp:
+                    if resp.status == 200:
+                        return
+            except aiohttp.ClientError:
+                pass
+            await asyncio.sleep(0.25)
+    raise RuntimeError("Server did not become ready")
+
+
+async def run_load(client, catalog: synthetic.Catalog, concurrency: int, duration: float, rate: float = 0):
+    names = [name for name, _ in MIX]
+    weights = [weight for _, weight in MIX]
+    latencies = {name: [] for name in names}
+    errors = {name: 0 for name in names}
+    nft_candidates = list(catalog.styles_without_passport)
+    random.shuffle(nft_candidates)
+    deadline = time.monotonic() + duration
+
+    async def timed(name, started):
+        method, path, data = build_request(name, catalog, nft_candidates)
+        try:
+            if await client.request(method, path, data) >= 400:
+                errors[name] += 1
+        except Exception:
+            errors[name] += 1
+        latencies[name].append((time.perf_counter() - started) * 1000)
+
+    async def worker():
+        while time.monotonic() < deadline:
+            await timed(random.choices(names, weights)[0], time.perf_counter())
+
+    async def open_loop():
+        # Fixed arrival rate; latency counts from the scheduled start so a
+        # stalled server can't hide its queueing delay (coordinated omission)
+        tasks = []
+        first = time.perf_counter()
+        for i in range(int(rate * duration)):
+            scheduled = first + i / rate
+            await asyncio.sleep(max(0, scheduled - time.perf_counter()))
+            tasks.append(asyncio.create_task(timed(random.choices(names, weights)[0], scheduled)))
+        await asyncio.gather(*tasks)
+
+    started = time.perf_counter()
+    if rate:
+        await open_loop()
+    else:
+        await asyncio.gather(*(worker() for _ in range(concurrency)))
+    return latencies, errors, time.perf_counter() - started
+
+
+def percentile(values, pct):
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))]
+
+
+def summarize(latencies, errors, duration):
+    report = {}
+    everything = []
+    for name, values in list(latencies.items()) + [("all", None)]:
+        if values is None:
+            values, failed = everything, sum(errors.values())
+        else:
+            everything.extend(values)
+            failed = errors[name]
+        report[name] = {
+            "requests": len(values), "errors": failed,
+            "rps": round(len(values) / duration, 1),
+            "p50_ms": round(percentile(values, 50), 1),
+            "p95_ms": round(percentile(values, 95), 1),
+            "p99_ms": round(percentile(values, 99), 1),
+        }
+    return report
+
+
+def git_revision(app_dir: str) -> str:
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=app_dir,
+                              capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+
+
+def print_report(report):
+    print(f"{'route':<14} {'reqs':>7} {'err':>5} {'req/s':>8} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9}")
+    for name, row in report.items():
+        print(f"{name:<14} {row['requests']:>7} {row['errors']:>5} {row.get('rps', ''):>8} "
+              f"{row['p50_ms']:>9} {row['p95_ms']:>9} {row['p99_ms']:>9}")
+    print(f"throughput: {report['all']['rps']} req/s")
+
+
+def print_comparison(report, baseline):
+    """Percent change per route against an earlier run (negative latency change is better)"""
+    def change(new, old):
+        if not old:
+            return "n/a"
+        return f"{(new - old) / old * 100:+.0f}%"
+
+    print(f"\nvs {baseline.get('meta', {}).get('revision', 'baseline')}:")
+    print(f"{'route':<14} {'req/s':>8} {'p50':>8} {'p95':>8} {'p99':>8}")
+    for name, row in report.items():
+        old = baseline["report"].get(name)
+        if not old:
+            print(f"{name:<14} {'new':>8}")
+            continue
+        print(f"{name:<14} {change(row.get('rps', 0), old.get('rps')):>8} {change(row['p50_ms'], old['p50_ms']):>8} "
+              f"{change(row['p95_ms'], old['p95_ms']):>8} {change(row['p99_ms'], old['p99_ms']):>8}")
+
+
+def run_server(args, catalog, env):
+    port = free_port()
+    env = dict(env, PORT=str(port), WEB_CONCURRENCY=str(args.workers))
+    if args.server == "gunicorn":
+        command = [sys.executable, "-m", "gunicorn", "main:app", "--log-level", "warning"]
+        if os.path.exists(os.path.join(args.app_dir, "gunicorn.conf.py")):
+            command += ["-c", "gunicorn.conf.py"]
+        else:
+            command += ["-k", "uvicorn.workers.UvicornWorker", "--workers", str(args.workers),
+                        "--bind", f"127.0.0.1:{port}"]
+    else:
+        command = [sys.executable, "-m", "uvicorn", "main:app", "--port", str(port),
+                   "--workers", str(args.workers), "--log-level", "warning"]
+    server = subprocess.Popen(command, cwd=args.app_dir, env=env)
+    try:
+        base_url = f"http://127.0.0.1:{port}"
+        asyncio.run(wait_ready(base_url))
+
+        async def drive():
+            client = HTTPClient(base_url, 0 if args.rate else args.concurrency)
+            try:
+                return await run_load(client, catalog, args.concurrency, args.duration, args.rate)
+            finally:
+                await client.close()
+        return asyncio.run(drive())
+    finally:
+        server.terminate()
+        server.wait(timeout=30)
+
+
+def run_in_process(args, catalog, env):
+    os.environ.update(env)
+    os.chdir(REPO_DIR)
+    import main as app_module
+    from database import async_engine
+
+    async def drive():
+        async with app_module.app.router.lifespan_context(app_module.app):
+            client = InProcessClient(app_module.app)
+            try:
+                return await run_load(client, catalog, args.concurrency, args.duration, args.rate)
+            finally:
+                await client.close()
+                await async_engine.dispose()
+    return asyncio.run(drive())
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--app-dir", default=REPO_DIR)
+    parser.add_argument("--server", choices=["uvicorn", "gunicorn", "inprocess"], default="uvicorn")
+    parser.add_argument("--styles", type=int, default=20000)
+    parser.add_argument("--collections", type=int, default=0, help="Default: one per 100 styles")
+    parser.add_argument("--passport-ratio", type=float, default=0.9)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--concurrency", type=int, default=32)
+    parser.add_argument("--duration", type=float, default=20)
+    parser.add_argument("--rate", type=float, default=0,
+                        help="Open-loop arrival rate in req/s (default: closed loop with --concurrency)")
+    parser.add_argument("--workers", type=int, default=1)
+    parser.add_argument("--out", help="Write the JSON report here")
+    parser.add_argument("--compare", help="JSON report of an earlier run to compare against")
+    args = parser.parse_args()
+    args.app_dir = os.path.abspath(args.app_dir)
+    if args.server == "inprocess" and args.app_dir != REPO_DIR:
+        parser.error("--server inprocess runs this checkout; use uvicorn or gunicorn for --app-dir")
+    random.seed(args.seed)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        db_path = os.path.join(tmp, "load.db")
+        seed_started = time.perf_counter()
+        catalog = synthetic.generate(db_path, args.styles, args.collections, args.passport_ratio, args.seed)
+        print(f"seeded {len(catalog.style_ids)} styles / {len(catalog.nft_ids)} passports "
+              f"in {time.perf_counter() - seed_started:.1f}s")
+        env = {
+            "DATABASE_URL": f"sqlite:///{db_path}",
+            "IMAGE_PROVIDER": "stub",
+            "PROMETHEUS_MULTIPROC_DIR": os.path.join(tmp, "metrics"),
+        }
+        os.makedirs(env["PROMETHEUS_MULTIPROC_DIR"])
+        os.environ.pop("ASYNC_DATABASE_URL", None)
+        if args.server == "inprocess":
+            env.pop("PROMETHEUS_MULTIPROC_DIR")
+            latencies, errors, elapsed = run_in_process(args, catalog, env)
+        else:
+            latencies, errors, elapsed = run_server(args, catalog, dict(os.environ, **env))
+
+    report = summarize(latencies, errors, elapsed)
+    print_report(report)
+
+    if args.out:
+        result = {
+            "meta": {
+                "revision": git_revision(args.app_dir),
+                "started_at": datetime.utcnow().isoformat(timespec="seconds") + "Z",
+                "python": platform.python_version(),
+                "cpus": os.cpu_count(),
+                "mix": dict(MIX),
+            },
+            "args": vars(args),
+            "report": report,
+        }
+        with open(args.out, "w") as f:
+            json.dump(result, f, indent=2)
+    if args.compare:
+        with open(args.compare) as f:
+            print_comparison(report, json.load(f))
+
+
+if __name__ == "__main__":
+    main()
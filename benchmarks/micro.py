@@ -0,0 +1,217 @@
+"""Micro-benchmarks for the hot functions, compared against stored baselines
+
+Usage:
+    python benchmarks/micro.py                      # run all, compare with the baseline
+    python benchmarks/micro.py -k template          # only benchmarks whose name contains "template"
+    python benchmarks/micro.py --save               # store this run as the new baseline
+    python benchmarks/micro.py --max-regression 0.25  # exit 1 if a median got >25% slower
+
+Covers MangoDPP.generate_qr_code, create_nft_passport, calculate_carbon_footprint,
+create_image_prompt, fix_turkish_encoding, get_all_texts and the rendering of
+every template. Template contexts are captured from the real pages of a
+synthetic catalog (benchmarks/synthetic.py), with large collections, a full
+styles page and a passport, so they match what the routes pass.
+
+Each benchmark is calibrated to run for at least --min-time per round, then
+timed over --rounds rounds; the median per call is what gets compared.
+Baselines live in benchmarks/baselines/micro.json and only mean something on
+the machine that recorded them: re-record before comparing elsewhere.
+"""
+import argparse
+import json
+import os
+import platform
+import statistics
+import sys
+import tempfile
+import time
+from datetime import datetime
+
+REPO_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, REPO_DIR)
+
+from benchmarks import synthetic
+
+BASELINE_PATH = os.path.join(REPO_DIR, "benchmarks", "baselines", "micro.json")
+
+BROKEN_TEXT = "Ä°lkbahar koleksiyonu: Ã¶zel Ã¼retim, %100 pamuk ve Ã§evre dostu boyalar. " * 4
+TURKISH_TEXT = "İlkbahar koleksiyonu: özel üretim, %100 pamuk ve çevre dostu boyalar. " * 4
+ASCII_TEXT = "Spring collection: limited production, 100% cotton and eco friendly dyes. " * 4
+
+
+def load_app(tmp: str):
+    """Import main against a seeded throwaway database"""
+    db_path = os.path.join(tmp, "micro.db")
+    catalog = synthetic.generate(db_path, n_styles=3000, n_collections=3, passport_ratio=0.9)
+    os.environ["DATABASE_URL"] = f"sqlite:///{db_path}"
+    os.environ.pop("ASYNC_DATABASE_URL", None)
+    os.environ.setdefault("IMAGE_PROVIDER", "stub")
+    os.chdir(REPO_DIR)
+    import main
+    return main, catalog
+
+
+def capture_contexts(main, catalog) -> dict:
+    """Template name -> the context its page renders it with"""
+    from fastapi.testclient import TestClient
+    import metrics
+
+    captured = {}
+
+    class CapturingTemplate(metrics.TimedTemplate):
+        def render(self, *args, **kwargs):
+            captured.setdefault(self.name, dict(*args, **kwargs))
+            return super().render(*args, **kwargs)
+
+    env = main.templates.env
+    env.template_class = CapturingTemplate
+    env.cache.clear()
+    collection_id = catalog.collection_ids[0]
+    pages = [
+        "/", "/collections?limit=100", f"/collections/{collection_id}", f"/collections/{collection_id}/edit",
+        "/styles?limit=100", f"/passport/{catalog.nft_ids[0]}", "/sustainability", "/sustainability/materials",
+        "/sustainability/production", "/sustainability/carbon-followup", "/collections/missing",
+    ]
+    try:
+        with TestClient(main.app) as client:
+            for page in pages:
+                client.get(page)
+    finally:
+        env.template_class = metrics.TimedTemplate
+        env.cache.clear()
+    captured.pop(None, None)
+    return captured
+
+
+def build_benchmarks(main, contexts: dict) -> dict:
+    import translations
+    from turkish_text import fix_turkish_encoding
+
+    dpp = main.mango_dpp
+    product = {
+        "code": "MNG-1a2b3c4d", "name": "Keten Gömlek", "collection": "İlkbahar 2025",
+        "materials": ["keten", "pamuk"], "production_location": "Türkiye", "carbon_footprint": 3.15,
+        "certificates": ["GOTS", "OEKO-TEX"], "supplier": "Ege Konfeksiyon", "additional_info": "",
+    }
+    style = {"name": "Keten Gömlek", "category": "Üst Giyim", "materials": ["keten", "pamuk"]}
+
+    benchmarks = {
+        "generate_qr_code": lambda: dpp.generate_qr_code("https://mango-dpp.example/passport/1a2b3c4d-0000"),
+        "create_nft_passport": lambda: dpp.create_nft_passport(product),
+        "create_nft_passport[no_qr]": lambda: dpp.create_nft_passport(product, render_qr=False),
+        "calculate_carbon_footprint": lambda: dpp.calculate_carbon_footprint(
+            ["pamuk", "polyester", "elastan"], "Bangladeş", "deniz"),
+        "create_image_prompt": lambda: dpp.create_image_prompt(style),
+        "fix_turkish_encoding[ascii]": lambda: fix_turkish_encoding(ASCII_TEXT),
+        "fix_turkish_encoding[turkish]": lambda: fix_turkish_encoding(TURKISH_TEXT),
+        "fix_turkish_encoding[broken]": lambda: fix_turkish_encoding(BROKEN_TEXT),
+        "get_all_texts[tr]": lambda: translations.get_all_texts("tr"),
+        "get_all_texts[en]": lambda: translations.get_all_texts("en"),
+    }
+    env = main.templates.env
+    # Partials are pre-rendered by fragments.py, so no page render captures them
+    for name in env.list_templates(filter_func=lambda name: name.startswith("partials/")):
+        contexts.setdefault(name, {"lang": "tr", "t": translations.get_all_texts("tr")})
+    for name, context in sorted(contexts.items()):
+        template = env.get_template(name)
+        benchmarks[f"template[{name}]"] = lambda template=template, context=context: template.render(context)
+    return benchmarks
+
+
+def measure(fn, rounds: int, min_time: float) -> dict:
+    fn()  # warm up caches and lazy imports
+    iterations = 1
+    while True:
+        started = time.perf_counter()
+        for _ in range(iterations):
+            fn()
+        elapsed = time.perf_counter() - started
+        if elapsed >= min_time:
+            break
+        iterations *= 2 if elapsed < min_time / 4 else 1 + int(min_time / max(elapsed, 1e-9))
+
+    per_call = []
+    for _ in range(rounds):
+        started = time.perf_counter()
+        for _ in range(iterations):
+            fn()
+        per_call.append((time.perf_counter() - started) / iterations * 1e6)
+    return {
+        "median_us": round(statistics.median(per_call), 3),
+        "min_us": round(min(per_call), 3),
+        "stdev_us": round(statistics.stdev(per_call), 3) if rounds > 1 else 0.0,
+        "iterations": iterations,
+        "rounds": rounds,
+    }
+
+
+def change(new: float, old: float) -> float:
+    return (new - old) / old if old else 0.0
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("-k", dest="keyword", help="Only benchmarks whose name contains this")
+    parser.add_argument("--rounds", type=int, default=7)
+    parser.add_argument("--min-time", type=float, default=0.05, help="Seconds per round")
+    parser.add_argument("--baseline", default=BASELINE_PATH)
+    parser.add_argument("--save", action="store_true", help="Write the results as the new baseline")
+    parser.add_argument("--max-regression", type=float, default=0,
+                        help="Exit non-zero if a median is slower than the baseline by more than this fraction")
+    parser.add_argument("--out", help="Also write the results as JSON here")
+    args = parser.parse_args()
+
+    baseline = {}
+    if os.path.exists(args.baseline):
+        with open(args.baseline) as f:
+            baseline = json.load(f)["results"]
+
+    with tempfile.TemporaryDirectory() as tmp:
+        app_module, catalog = load_app(tmp)
+        benchmarks = build_benchmarks(app_module, capture_contexts(app_module, catalog))
+        if args.keyword:
+            benchmarks = {name: fn for name, fn in benchmarks.items() if args.keyword in name}
+
+        results, regressions = {}, []
+        print(f"{'benchmark':<42} {'median us':>11} {'min us':>11} {'stdev':>9} {'baseline':>11} {'change':>8}")
+        for name, fn in benchmarks.items():
+            row = results[name] = measure(fn, args.rounds, args.min_time)
+            old = baseline.get(name, {}).get("median_us")
+            delta = change(row["median_us"], old) if old else None
+            if delta is not None and args.max_regression and delta > args.max_regression:
+                regressions.append(name)
+            print(f"{name:<42} {row['median_us']:>11} {row['min_us']:>11} {row['stdev_us']:>9} "
+                  f"{old if old else '-':>11} {f'{delta:+.0%}' if delta is not None else '-':>8}")
+
+        from database import async_engine, engine
+        import asyncio
+        asyncio.run(async_engine.dispose())
+        engine.dispose()
+
+    payload = {
+        "meta": {
+            "recorded_at": datetime.utcnow().isoformat(timespec="seconds") + "Z",
+            "python": platform.python_version(),
+            "machine": platform.machine(),
+            "cpus": os.cpu_count(),
+        },
+        "results": results,
+    }
+    if args.save:
+        if args.keyword:
+            # Keep the baselines of the benchmarks that didn't run
+            payload["results"] = {**baseline, **results}
+        os.makedirs(os.path.dirname(args.baseline), exist_ok=True)
+        with open(args.baseline, "w") as f:
+            json.dump(payload, f, indent=2, ensure_ascii=False)
+        print(f"baseline saved: {args.baseline}")
+    if args.out:
+        with open(args.out, "w") as f:
+            json.dump(payload, f, indent=2, ensure_ascii=False)
+    if regressions:
+        print(f"slower than baseline by more than {args.max_regression:.0%}: {', '.join(regressions)}")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
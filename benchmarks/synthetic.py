@@ -0,0 +1,154 @@
+"""Synthetic catalog generator for benchmarks and load tests
+
+Usage:
+    python benchmarks/synthetic.py --db /tmp/catalog.db --styles 20000 [--collections 200]
+                                   [--passport-ratio 0.9] [--seed 42]
+
+Creates collections, styles and passports in a SQLite database. Styles get
+weighted material mixes and production locations that look like a real
+catalog (cotton and blends dominate, some unknown materials such as elastan
+fall back to the default carbon factor). Footprints are computed with
+carbon_engine, so the seeded figures match what the app would store. All
+passports share one real QR image, as identical codes do in qr_store.
+
+Styles without a passport (1 - passport ratio) are left for load tests that
+exercise NFT generation.
+"""
+import argparse
+import os
+import random
+import sys
+import time
+import uuid
+from collections import namedtuple
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sqlalchemy import create_engine, insert
+from sqlalchemy.orm import Session
+
+import carbon_engine
+import qr_store
+import style_materials
+from models import Base, Collection, NFTPassport, Style
+
+BATCH_SIZE = 10000
+
+# (materials, weight)
+MATERIAL_MIXES = [
+    (["pamuk"], 26),
+    (["pamuk", "polyester"], 18),
+    (["polyester"], 12),
+    (["organik_pamuk"], 8),
+    (["pamuk", "elastan"], 8),
+    (["keten"], 5),
+    (["keten", "pamuk"], 5),
+    (["yün"], 4),
+    (["yün", "polyester"], 4),
+    (["polyester", "elastan"], 4),
+    (["ipek"], 3),
+    (["viskon"], 3),
+]
+LOCATIONS = [("Türkiye", 40), ("Çin", 20), ("Bangladeş", 15), ("Hindistan", 15), ("Vietnam", 10)]
+CATEGORIES = ["Üst Giyim", "Alt Giyim", "Elbise", "Dış Giyim", "Aksesuar"]
+SEASONS = ["İlkbahar/Yaz", "Sonbahar/Kış"]
+SUPPLIERS = ["ABC Tekstil", "Ege Konfeksiyon", "Dhaka Garments", "Saigon Apparel", "Shenzhen Textile"]
+STATUSES = [("design", 50), ("sampling", 25), ("production", 20), ("archived", 5)]
+CERTIFICATES = [[], ["GOTS"], ["OEKO-TEX"], ["GOTS", "OEKO-TEX"]]
+
+Catalog = namedtuple("Catalog", ["collection_ids", "style_ids", "nft_ids", "styles_without_passport"])
+
+
+def _weighted(rng: random.Random, choices):
+    values, weights = zip(*choices)
+    return rng.choices(values, weights)[0]
+
+
+def generate(db_path: str, n_styles: int, n_collections: int = 0, passport_ratio: float = 0.9,
+             seed: int = 42) -> Catalog:
+    """Seed `db_path` (created if missing) and return the generated ids"""
+    rng = random.Random(seed)
+    n_collections = n_collections or max(1, n_styles // 100)
+    now = datetime.utcnow()
+
+    engine = create_engine(f"sqlite:///{db_path}")
+    Base.metadata.create_all(engine)
+
+    collections = [
+        {"id": str(uuid.uuid4()), "name": f"{SEASONS[i % 2].split('/')[0]} {2020 + i % 6} #{i}",
+         "season": SEASONS[i % 2], "year": 2020 + i % 6, "description": "Sentetik koleksiyon",
+         "created_at": now - timedelta(hours=i)}
+        for i in range(n_collections)
+    ]
+    with Session(engine) as db:
+        db.execute(insert(Collection), collections)
+        qr_hash = qr_store.store(db, qr_store.render_png("https://mango-dpp.example/passport/synthetic"))
+        db.commit()
+    collection_names = {c["id"]: c["name"] for c in collections}
+    collection_ids = list(collection_names)
+
+    style_ids, nft_ids, without_passport = [], [], []
+    with engine.begin() as conn:
+        for start in range(0, n_styles, BATCH_SIZE):
+            count = min(BATCH_SIZE, n_styles - start)
+            materials = [list(_weighted(rng, MATERIAL_MIXES)) for _ in range(count)]
+            locations = [_weighted(rng, LOCATIONS) for _ in range(count)]
+            footprints = carbon_engine.round2(carbon_engine.footprints(materials, locations))
+
+            styles, passports = [], []
+            for i in range(count):
+                n = start + i
+                sid = str(uuid.uuid4())
+                collection_id = rng.choice(collection_ids)
+                style = {
+                    "id": sid, "name": f"{rng.choice(CATEGORIES)} {n}", "collection_id": collection_id,
+                    "category": rng.choice(CATEGORIES), "materials": materials[i],
+                    "target_price": round(rng.uniform(9.99, 199.99), 2), "production_location": locations[i],
+                    "supplier": rng.choice(SUPPLIERS), "carbon_footprint": float(footprints[i]),
+                    "status": _weighted(rng, STATUSES), "nft_id": None, "created_at": now - timedelta(seconds=n),
+                }
+                style_ids.append(sid)
+                if rng.random() < passport_ratio:
+                    nid = str(uuid.uuid4())
+                    style["nft_id"] = nid
+                    nft_ids.append(nid)
+                    passports.append({
+                        "id": nid, "style_id": sid, "product_code": f"MNG-{sid[:8]}", "name": style["name"],
+                        "collection_name": collection_names[collection_id], "materials": materials[i],
+                        "production_location": locations[i], "carbon_footprint": style["carbon_footprint"],
+                        "certificates": rng.choice(CERTIFICATES), "supplier": style["supplier"],
+                        "blockchain_hash": uuid.uuid4().hex + uuid.uuid4().hex,
+                        "qr_url": f"https://mango-dpp.example/passport/{nid}", "qr_code_hash": qr_hash,
+                        "created_at": style["created_at"],
+                    })
+                else:
+                    without_passport.append(sid)
+                styles.append(style)
+            conn.execute(insert(Style), styles)
+            if passports:
+                conn.execute(insert(NFTPassport), passports)
+    with Session(engine) as db:
+        style_materials.backfill(db)
+        db.commit()
+    engine.dispose()
+    return Catalog(collection_ids, style_ids, nft_ids, without_passport)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--db", required=True, help="SQLite file to create or extend")
+    parser.add_argument("--styles", type=int, default=20000)
+    parser.add_argument("--collections", type=int, default=0, help="Default: one per 100 styles")
+    parser.add_argument("--passport-ratio", type=float, default=0.9)
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+
+    started = time.perf_counter()
+    catalog = generate(args.db, args.styles, args.collections, args.passport_ratio, args.seed)
+    print(f"{len(catalog.collection_ids)} collections, {len(catalog.style_ids)} styles, "
+          f"{len(catalog.nft_ids)} passports in {time.perf_counter() - started:.1f}s -> {args.db}")
+
+
+if __name__ == "__main__":
+    main()
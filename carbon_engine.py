@@ -0,0 +1,187 @@
+"""Carbon footprint engine
+
+One set of emission factors for both paths:
+
+- `footprint()` scores a single style (used when a style is created).
+- `footprints()` scores whole arrays of styles at once with NumPy: materials
+  and locations are encoded as integer codes into factor tables, so the
+  arithmetic runs vectorized instead of per style in Python.
+
+When the factors below change, recompute the stored `Style.carbon_footprint`
+values (chunked bulk UPDATEs, rollups kept in sync):
+
+    python carbon_engine.py recompute [--chunk-size 20000] [--dry-run]
+"""
+import sys
+from itertools import chain
+from typing import List, Optional, Sequence
+
+import numpy as np
+from sqlalchemy import select, update
+from sqlalchemy.orm import Session
+
+import emissions
+import rollups
+from models import Style
+
+BASE_CARBON = 2.5  # kg CO2
+DEFAULT_FACTOR = 1.0  # Unknown material / location
+
+# Malzeme bazlı katsayılar
+MATERIAL_FACTORS = {
+    "pamuk": 1.2,
+    "polyester": 2.1,
+    "yün": 3.8,
+    "ipek": 2.9,
+    "keten": 0.9,
+    "organik_pamuk": 0.8
+}
+
+# Lokasyon bazlı katsayılar
+LOCATION_FACTORS = {
+    "türkiye": 1.0,
+    "hindistan": 1.8,
+    "çin": 2.2,
+    "bangladeş": 1.9,
+    "vietnam": 1.7
+}
+
+RECOMPUTE_CHUNK_SIZE = 20000
+
+
+def footprint(materials: Sequence[str], production_location: Optional[str]) -> float:
+    """Karbon ayak izi hesapla (basitleştirilmiş)"""
+    material_carbon = sum([
+        MATERIAL_FACTORS.get(mat.lower(), DEFAULT_FACTOR) if isinstance(mat, str) else DEFAULT_FACTOR
+        for mat in materials
+    ])
+    location = production_location.lower() if isinstance(production_location, str) else ""
+    location_carbon = LOCATION_FACTORS.get(location, DEFAULT_FACTOR)
+
+    total_carbon = BASE_CARBON * material_carbon * location_carbon
+    return round(total_carbon, 2)
+
+
+class FactorTable:
+    """Integer codes for the known names; code 0 is "unknown" and gets DEFAULT_FACTOR"""
+
+    def __init__(self, factors: dict):
+        self.codes = {name: code for code, name in enumerate(factors, start=1)}
+        self.values = np.array([DEFAULT_FACTOR] + list(factors.values()), dtype=np.float64)
+
+    def encode(self, names: Sequence[Optional[str]]) -> np.ndarray:
+        # Catalogs repeat a handful of spellings, so normalize each distinct one once
+        try:
+            distinct = dict.fromkeys(names)
+        except TypeError:
+            # An unhashable entry (e.g. an object) in a stored materials list: unknown, like other non-strings
+            names = [name if isinstance(name, str) else None for name in names]
+            distinct = dict.fromkeys(names)
+        lookup = {name: self.codes.get(name.lower(), 0) if isinstance(name, str) else 0 for name in distinct}
+        return np.fromiter(map(lookup.__getitem__, names), dtype=np.int32, count=len(names))
+
+
+MATERIALS = FactorTable(MATERIAL_FACTORS)
+LOCATIONS = FactorTable(LOCATION_FACTORS)
+
+
+def footprints(materials: Sequence[Optional[Sequence[str]]], locations: Sequence[Optional[str]]) -> np.ndarray:
+    """Footprints for many styles at once; same result as footprint() for each pair"""
+    n = len(materials)
+    materials = [m or () for m in materials]
+    counts = np.fromiter(map(len, materials), dtype=np.int64, count=n)
+    flat = list(chain.from_iterable(materials))
+
+    # Sum of material factors per style: scatter-add each material's factor onto its style's slot
+    owner = np.repeat(np.arange(n), counts)
+    material_carbon = np.bincount(owner, weights=MATERIALS.values[MATERIALS.encode(flat)], minlength=n)
+    location_carbon = LOCATIONS.values[LOCATIONS.encode(locations)]
+
+    return round2(BASE_CARBON * material_carbon * location_carbon)
+
+
+def round2(values: np.ndarray) -> np.ndarray:
+    """round(x, 2) for every element, matching Python's round() exactly
+
+    np.round scales by 100 first, which can push values like 9.975 (really
+    9.97499...) across the half-way point. Those near-ties are rare, so
+    they get Python's correctly rounded result; everything else stays
+    vectorized.
+    """
+    scaled = values * 100
+    rounded = np.round(scaled) / 100
+    near_tie = np.flatnonzero(np.abs(scaled - np.floor(scaled) - 0.5) < 1e-6)
+    if len(near_tie):
+        rounded[near_tie] = [round(value, 2) for value in values[near_tie].tolist()]
+    return rounded
+
+
+def recompute(db: Session, chunk_size: int = RECOMPUTE_CHUNK_SIZE, dry_run: bool = False) -> dict:
+    """Recompute every stored style footprint with the current factors
+
+    Walks the styles table in primary-key order, one chunk per transaction.
+    Only rows whose value changes are updated, and the rollups are adjusted
+    in the same transaction so they never disagree with the styles table.
+    """
+    scanned = changed = 0
+    last_id = ""
+    while True:
+        rows = db.execute(
+            select(Style.id, Style.materials, Style.production_location, Style.supplier, Style.carbon_footprint)
+            .where(Style.id > last_id)
+            .order_by(Style.id)
+            .limit(chunk_size)
+        ).all()
+        if not rows:
+            break
+        last_id = rows[-1].id
+        scanned += len(rows)
+
+        new = footprints([row.materials for row in rows], [row.production_location for row in rows])
+        old = np.array([row.carbon_footprint if row.carbon_footprint is not None else np.nan for row in rows])
+        # NaN != anything, so styles that never had a footprint get one
+        dirty = np.flatnonzero(~np.isclose(new, old, rtol=0, atol=1e-9))
+        changed += len(dirty)
+        if dry_run or not len(dirty):
+            continue
+
+        values = [{"id": rows[i].id, "carbon_footprint": float(new[i])} for i in dirty]
+        db.execute(update(Style), values)
+        changes = [
+            (
+                rollups.StyleSnapshot(rows[i].id, rows[i].carbon_footprint or 0, list(rows[i].materials or []),
+                                      rows[i].production_location, rows[i].supplier),
+                rollups.StyleSnapshot(rows[i].id, float(new[i]), list(rows[i].materials or []),
+                                      rows[i].production_location, rows[i].supplier),
+            )
+            for i in dirty
+        ]
+        rollups.apply_style_changes(db, changes)
+        emissions.record_style_changes(db, changes, "recompute")
+        db.commit()
+        print(f"{scanned} stil tarandı, {changed} güncellendi")
+
+    return {"scanned": scanned, "changed": changed, "dry_run": dry_run}
+
+
+def _option(args: List[str], name: str, default: int) -> int:
+    if name in args:
+        return int(args[args.index(name) + 1])
+    return default
+
+
+if __name__ == "__main__":
+    from database import SessionLocal, init_db
+
+    args = sys.argv[1:]
+    if not args or args[0] != "recompute":
+        print("Usage: python carbon_engine.py recompute [--chunk-size N] [--dry-run]")
+        sys.exit(1)
+
+    init_db()
+    db = SessionLocal()
+    try:
+        result = recompute(db, _option(args, "--chunk-size", RECOMPUTE_CHUNK_SIZE), dry_run="--dry-run" in args)
+        print(f"Recompute complete: {result}")
+    finally:
+        db.close()
@@ -1,28 +1,118 @@
+import asyncio
+import hashlib
 import os
-from sqlalchemy import create_engine
+import tempfile
+from contextlib import contextmanager, nullcontext
+import anyio.from_thread
+from sqlalchemy import create_engine, inspect
+from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker, AsyncSession
 from sqlalchemy.orm import sessionmaker
+from sqlalchemy.schema import CreateIndex
 from models import Base
+import db_profile
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+
+# Databases created with create_all before migrations existed are stamped at this revision
+BASELINE_REVISION = "0001"
 
 # Database URL - SQLite for local development, PostgreSQL for production
 DATABASE_URL = os.getenv("DATABASE_URL", "sqlite:///./mango_dpp.db")
 
-# Fix for SQLite URL format with UTF-8 encoding
-if DATABASE_URL.startswith("sqlite:///"):
-    engine = create_engine(
-        DATABASE_URL, 
-        connect_args={
-            "check_same_thread": False
-        }
-    )
-else:
-    # PostgreSQL or other databases  
-    engine = create_engine(DATABASE_URL)
+def to_async_url(url: str) -> str:
+    """Same database through an asyncio driver (aiosqlite / asyncpg)"""
+    if url.startswith("sqlite:///"):
+        return url.replace("sqlite:///", "sqlite+aiosqlite:///", 1)
+    for prefix in ("postgresql+psycopg2://", "postgresql://", "postgres://"):
+        if url.startswith(prefix):
+            return url.replace(prefix, "postgresql+asyncpg://", 1)
+    return url
+
+# Async URL can be overridden, e.g. to point at a pgbouncer in front of PostgreSQL
+ASYNC_DATABASE_URL = os.getenv("ASYNC_DATABASE_URL", to_async_url(DATABASE_URL))
+
+# Pool sizing, timeouts and SQLite pragmas come from the engine profile (db_profile.py)
+engine = create_engine(DATABASE_URL, **db_profile.engine_options(DATABASE_URL, "sync"))
+db_profile.install(engine)
 
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
-def create_tables():
-    """Create all database tables"""
-    Base.metadata.create_all(bind=engine)
+# Async engine used by the request handlers so queries don't block the event loop.
+# The sync engine above stays for startup tasks, CLIs and maintenance scripts.
+async_engine = create_async_engine(ASYNC_DATABASE_URL, **db_profile.engine_options(ASYNC_DATABASE_URL, "async", is_async=True))
+db_profile.install(async_engine)
+AsyncSessionLocal = async_sessionmaker(async_engine, class_=AsyncSession, autoflush=False, expire_on_commit=False)
+
+# SQLite has a single writer. Queue async write transactions inside the process
+# instead of letting them pile up on the database lock until busy_timeout expires.
+_sqlite_write_lock = asyncio.Lock() if ASYNC_DATABASE_URL.startswith("sqlite") else None
+
+def write_guard():
+    """`async with write_guard():` around handler code that writes and commits"""
+    return _sqlite_write_lock if _sqlite_write_lock is not None else nullcontext()
+
+@contextmanager
+def thread_write_guard():
+    """`with thread_write_guard():` around one transaction of code running in the threadpool
+
+    Long jobs run via run_in_threadpool take it per transaction (e.g. per
+    import chunk), so other writers, job claims and lease renewals get in
+    between instead of waiting for the whole job.
+    """
+    if _sqlite_write_lock is None:
+        yield
+        return
+    anyio.from_thread.run(_sqlite_write_lock.acquire)
+    try:
+        yield
+    finally:
+        anyio.from_thread.run_sync(_sqlite_write_lock.release)
+
+def alembic_config():
+    from alembic.config import Config
+    config = Config(os.path.join(BASE_DIR, "alembic.ini"))
+    config.attributes["configure_logger"] = False
+    return config
+
+def alembic_config_for(connection):
+    config = alembic_config()
+    config.attributes["connection"] = connection
+    return config
+
+@contextmanager
+def migration_lock():
+    """Only one process on this host migrates at a time (gunicorn workers all import main)"""
+    if fcntl is None:
+        yield
+        return
+    name = hashlib.sha256(DATABASE_URL.encode()).hexdigest()[:16]
+    with open(os.path.join(tempfile.gettempdir(), f"mango_dpp_migrate_{name}.lock"), "w") as lock_file:
+        fcntl.flock(lock_file, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+def adopt_legacy_schema(connection):
+    """Bring a create_all database up to the baseline revision and stamp it"""
+    from alembic import command
+    import qr_store
+    existing = set(inspect(connection).get_table_names())
+    missing = [table for name, table in Base.metadata.tables.items() if name not in existing]
+    Base.metadata.create_all(bind=connection, tables=missing)
+    qr_store.ensure_schema(connection)
+    # create_all never added indexes to tables that already existed
+    for name in existing & set(Base.metadata.tables):
+        for index in Base.metadata.tables[name].indexes:
+            connection.execute(CreateIndex(index, if_not_exists=True))
+    connection.commit()
+    command.stamp(alembic_config_for(connection), BASELINE_REVISION)
+    print(f"Existing database stamped at migration {BASELINE_REVISION}")
 
 def get_db():
     """Get database session"""
@@ -32,7 +122,18 @@ def get_db():
     finally:
         db.close()
 
+async def get_async_db():
+    """Get async database session (FastAPI dependency)"""
+    async with AsyncSessionLocal() as db:
+        yield db
+
 def init_db():
-    """Initialize database with tables"""
-    create_tables()
-    print("Database tables created successfully!")
\ No newline at end of file
+    """Bring the database schema up to date (alembic upgrade head)"""
+    from alembic import command
+    with migration_lock(), engine.connect() as connection:
+        tables = inspect(connection).get_table_names()
+        connection.commit()
+        if tables and "alembic_version" not in tables:
+            adopt_legacy_schema(connection)
+        command.upgrade(alembic_config_for(connection), "head")
+    print("Database migrations applied successfully!")
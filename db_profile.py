@@ -0,0 +1,200 @@
+"""Database engine profile: connection settings, pool sizing and pool metrics
+
+SQLite (every connection, both engines):
+    journal_mode=WAL, synchronous=NORMAL, busy_timeout, cache_size, mmap_size
+    and temp_store=MEMORY. WAL lets readers run while the single writer
+    commits; NORMAL is durable in WAL mode except for the last transactions
+    on power loss.
+
+PostgreSQL:
+    DB_MAX_CONNECTIONS is the connection budget for the whole app and is split
+    over the WEB_CONCURRENCY gunicorn workers. Each worker gives SYNC_POOL_SIZE
+    connections to the sync engine (startup, imports, CLIs) and the rest to the
+    async engine the handlers use. There is no overflow beyond the budget.
+    Connections are pre-pinged and recycled, and every session gets a
+    statement_timeout.
+
+Every pool records how long checkouts wait (including opening a new
+connection), how many time out and how many connections are in use, so
+worker and pool sizes can be picked from data (GET /api/db-stats).
+
+Settings (environment):
+    WEB_CONCURRENCY=4  DB_MAX_CONNECTIONS=40  SYNC_POOL_SIZE=2
+    DB_POOL_SIZE (async pool, overrides the budget split)  DB_POOL_TIMEOUT=10
+    DB_POOL_RECYCLE=1800  DB_STATEMENT_TIMEOUT_MS=30000 (0 disables, e.g. behind pgbouncer)
+    SQLITE_JOURNAL_MODE=WAL  SQLITE_SYNCHRONOUS=NORMAL  SQLITE_BUSY_TIMEOUT_MS=15000
+    SQLITE_CACHE_SIZE_KB=32768  SQLITE_MMAP_SIZE=268435456
+"""
+import os
+import threading
+import time
+from bisect import bisect_left
+
+from sqlalchemy import event, exc
+from sqlalchemy.pool import AsyncAdaptedQueuePool, QueuePool
+
+WEB_CONCURRENCY = int(os.getenv("WEB_CONCURRENCY", "4"))
+DB_MAX_CONNECTIONS = int(os.getenv("DB_MAX_CONNECTIONS", "40"))
+SYNC_POOL_SIZE = int(os.getenv("SYNC_POOL_SIZE", "2"))
+DB_POOL_SIZE = os.getenv("DB_POOL_SIZE")
+DB_POOL_TIMEOUT = float(os.getenv("DB_POOL_TIMEOUT", "10"))
+DB_POOL_RECYCLE = int(os.getenv("DB_POOL_RECYCLE", "1800"))
+DB_STATEMENT_TIMEOUT_MS = int(os.getenv("DB_STATEMENT_TIMEOUT_MS", "30000"))
+
+SQLITE_PRAGMAS = {
+    "journal_mode": os.getenv("SQLITE_JOURNAL_MODE", "WAL"),
+    "synchronous": os.getenv("SQLITE_SYNCHRONOUS", "NORMAL"),
+    "busy_timeout": int(os.getenv("SQLITE_BUSY_TIMEOUT_MS", "15000")),
+    # Negative cache_size is in KiB rather than pages
+    "cache_size": -int(os.getenv("SQLITE_CACHE_SIZE_KB", "32768")),
+    "mmap_size": int(os.getenv("SQLITE_MMAP_SIZE", str(256 * 1024 * 1024))),
+    "temp_store": "MEMORY",
+}
+
+APPLICATION_NAME = "mango_dpp"
+
+# Upper bounds (seconds) of the checkout wait histogram
+WAIT_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+class PoolMetrics:
+    """Checkout wait histogram and in-use counts of one engine's pool"""
+
+    def __init__(self, name: str):
+        self.name = name
+        self.pool = None
+        self.checkouts = self.timeouts = 0
+        self.wait_sum = self.wait_max = 0.0
+        self.bucket_counts = [0] * (len(WAIT_BUCKETS) + 1)
+        self.peak_in_use = 0
+        self._lock = threading.Lock()
+
+    def record(self, pool, wait: float):
+        with self._lock:
+            self.checkouts += 1
+            self.wait_sum += wait
+            self.wait_max = max(self.wait_max, wait)
+            self.bucket_counts[bisect_left(WAIT_BUCKETS, wait)] += 1
+            self.peak_in_use = max(self.peak_in_use, pool.checkedout())
+
+    def record_timeout(self):
+        with self._lock:
+            self.timeouts += 1
+
+    def wait_quantile(self, q: float) -> float:
+        """Upper bound of the bucket holding the q-th checkout wait"""
+        rank = q * self.checkouts
+        seen = 0
+        for bound, count in zip(WAIT_BUCKETS + (float("inf"),), self.bucket_counts):
+            seen += count
+            if count and seen >= rank:
+                return bound
+        return 0.0
+
+    def stats(self) -> dict:
+        pool = self.pool
+        with self._lock:
+            return {
+                "engine": self.name,
+                "pool_size": pool.size() if pool else None,
+                "in_use": pool.checkedout() if pool else None,
+                "idle": pool.checkedin() if pool else None,
+                "overflow": max(pool.overflow(), 0) if pool else None,
+                "peak_in_use": self.peak_in_use,
+                "checkouts": self.checkouts,
+                "timeouts": self.timeouts,
+                "wait_ms": {
+                    "avg": round(self.wait_sum / self.checkouts * 1000, 3) if self.checkouts else 0.0,
+                    "p50_le": self.wait_quantile(0.5) * 1000,
+                    "p95_le": self.wait_quantile(0.95) * 1000,
+                    "p99_le": self.wait_quantile(0.99) * 1000,
+                    "max": round(self.wait_max * 1000, 3),
+                },
+            }
+
+
+METRICS = {}
+
+
+class _TimedCheckout:
+    """Pool mixin timing each checkout; the metrics object is a class attribute so it survives pool.recreate()"""
+
+    metrics: PoolMetrics
+
+    def _do_get(self):
+        started = time.perf_counter()
+        try:
+            record = super()._do_get()
+        except exc.TimeoutError:
+            self.metrics.record_timeout()
+            raise
+        self.metrics.pool = self
+        self.metrics.record(self, time.perf_counter() - started)
+        return record
+
+
+def timed_pool_class(name: str, base):
+    metrics = METRICS[name] = PoolMetrics(name)
+    return type(f"Timed{base.__name__}", (_TimedCheckout, base), {"metrics": metrics})
+
+
+def is_sqlite(url: str) -> bool:
+    return url.startswith("sqlite")
+
+
+def is_postgresql(url: str) -> bool:
+    return url.startswith(("postgresql", "postgres"))
+
+
+def async_pool_size() -> int:
+    if DB_POOL_SIZE:
+        return int(DB_POOL_SIZE)
+    per_worker = DB_MAX_CONNECTIONS // max(WEB_CONCURRENCY, 1)
+    return max(per_worker - SYNC_POOL_SIZE, 1)
+
+
+def engine_options(url: str, name: str, is_async: bool = False) -> dict:
+    """create_engine / create_async_engine keyword arguments for this database"""
+    base = AsyncAdaptedQueuePool if is_async else QueuePool
+    if is_sqlite(url):
+        options = {} if is_async else {"connect_args": {"check_same_thread": False}}
+        # In-memory databases keep SQLAlchemy's single-connection pools
+        if ":memory:" not in url and "///" in url:
+            options["poolclass"] = timed_pool_class(name, base)
+        return options
+
+    options = {
+        "poolclass": timed_pool_class(name, base),
+        "pool_pre_ping": True,
+        "pool_recycle": DB_POOL_RECYCLE,
+        "pool_timeout": DB_POOL_TIMEOUT,
+    }
+    if is_postgresql(url):
+        options["pool_size"] = async_pool_size() if is_async else SYNC_POOL_SIZE
+        options["max_overflow"] = 0
+        settings = {"application_name": APPLICATION_NAME}
+        if DB_STATEMENT_TIMEOUT_MS:
+            settings["statement_timeout"] = str(DB_STATEMENT_TIMEOUT_MS)
+        if is_async:
+            options["connect_args"] = {"server_settings": settings}
+        else:
+            options["connect_args"] = {"options": " ".join(f"-c {k}={v}" for k, v in settings.items())}
+    return options
+
+
+def install(engine):
+    """Per-connection setup that can't be passed as engine options (SQLite pragmas)"""
+    sync_engine = getattr(engine, "sync_engine", engine)
+    if sync_engine.dialect.name != "sqlite":
+        return
+
+    @event.listens_for(sync_engine, "connect")
+    def _sqlite_pragmas(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        for pragma, value in SQLITE_PRAGMAS.items():
+            cursor.execute(f"PRAGMA {pragma}={value}")
+        cursor.close()
+
+
+def pool_stats() -> list:
+    return [metrics.stats() for metrics in METRICS.values()]
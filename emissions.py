@@ -0,0 +1,240 @@
+"""Append-only emissions time series with monthly and yearly rollups
+
+Every change of the catalog footprint is booked as one emission_entries row
+per style and day, with the production location and supplier it happened
+under: a new style books its footprint, a recompute or a text repair books
+the difference. Bulk imports book one entry per production location and
+supplier per chunk instead (style_id NULL), which keeps the ledger write a
+few hundred rows per 5000 styles. Entries are never updated, so the history
+stays as it was recorded and the sum of all entries is the catalog total.
+
+Write paths call `record_style_changes` with the same (before, after)
+snapshots they pass to rollups.apply_style_changes, in the same transaction,
+and the monthly and yearly rollups are upserted along with the entries:
+
+    create_style        "create"
+    style_import        "import" (record_bulk_style_changes)
+    text_repair         "repair"
+    carbon_engine       "recompute"
+
+The carbon follow-up page reads TREND_MONTHS monthly rows and two yearly
+rows instead of summing the styles table. Styles that predate the ledger are
+booked on their creation day by migration 0005; to re-run that, or to
+recompute the rollups from the entries:
+
+    python emissions.py backfill
+    python emissions.py rebuild
+"""
+import calendar
+import os
+import sys
+from collections import defaultdict
+from datetime import date, datetime
+from typing import Iterable, List, Optional, Tuple
+
+from sqlalchemy import delete, exists, func, insert, literal, or_, select
+from sqlalchemy.orm import Session
+
+import rollups
+from models import EmissionEntry, EmissionMonthly, EmissionYearly, RollupTotals, Style
+
+REDUCTION_TARGET = float(os.getenv("EMISSION_REDUCTION_TARGET", "0.20"))  # versus the previous year
+TREND_MONTHS = 12
+
+Change = Tuple[Optional[rollups.StyleSnapshot], Optional[rollups.StyleSnapshot]]
+
+
+def month_key(day: date) -> str:
+    return f"{day.year:04d}-{day.month:02d}"
+
+
+def months_back(today: date, count: int) -> List[str]:
+    """The `count` month keys ending with the month of `today`, oldest first"""
+    year, month = today.year, today.month
+    keys = []
+    for _ in range(count):
+        keys.append(f"{year:04d}-{month:02d}")
+        year, month = (year - 1, 12) if month == 1 else (year, month - 1)
+    return keys[::-1]
+
+
+def entries_for(changes: Iterable[Change], reason: str, day: Optional[date] = None,
+                now: Optional[datetime] = None) -> List[dict]:
+    """One entry per style whose footprint changed, booked on `day` (today, UTC)"""
+    now = now or datetime.utcnow()
+    day = day or now.date()
+    rows = []
+    for before, after in changes:
+        delta = (after.carbon_footprint if after else 0) - (before.carbon_footprint if before else 0)
+        if abs(delta) < 1e-9:
+            continue
+        snap = after or before
+        rows.append({
+            "day": day, "style_id": snap.style_id, "production_location": snap.production_location,
+            "supplier": snap.supplier, "kg_co2": delta, "reason": reason, "recorded_at": now,
+        })
+    return rows
+
+
+def bulk_entries_for(changes: Iterable[Change], reason: str, now: Optional[datetime] = None) -> List[dict]:
+    """One entry per production location and supplier, summing the styles' changes (style_id NULL)
+
+    `now` is the styles' created_at, so backfill sees them as booked.
+    """
+    totals = defaultdict(float)
+    for row in entries_for(changes, reason, None, now):
+        totals[row["day"], row["production_location"], row["supplier"], row["recorded_at"]] += row["kg_co2"]
+    return [
+        {"day": day, "style_id": None, "production_location": location, "supplier": supplier,
+         "kg_co2": kg_co2, "reason": reason, "recorded_at": recorded_at}
+        for (day, location, supplier, recorded_at), kg_co2 in totals.items()
+    ]
+
+
+def record(db: Session, rows: List[dict]):
+    """Append the entries and add them to the monthly and yearly rollups (caller commits)"""
+    if not rows:
+        return
+    db.execute(insert(EmissionEntry.__table__), rows)
+    months = defaultdict(lambda: [0.0, 0])
+    years = defaultdict(lambda: [0.0, 0])
+    for row in rows:
+        for bucket in (months[month_key(row["day"])], years[row["day"].year]):
+            bucket[0] += row["kg_co2"]
+            bucket[1] += 1
+    rollups.upsert_add(db, EmissionMonthly, ["month"], [
+        {"month": month, "kg_co2": total, "entry_count": count} for month, (total, count) in months.items()
+    ])
+    rollups.upsert_add(db, EmissionYearly, ["year"], [
+        {"year": year, "kg_co2": total, "entry_count": count} for year, (total, count) in years.items()
+    ])
+
+
+def record_style_changes(db: Session, changes: Iterable[Change], reason: str):
+    record(db, entries_for(changes, reason))
+
+
+def record_bulk_style_changes(db: Session, changes: Iterable[Change], reason: str, now: Optional[datetime] = None):
+    record(db, bulk_entries_for(changes, reason, now))
+
+
+def reset(db: Session):
+    """Empty the ledger and its rollups (only when the catalog itself is wiped)"""
+    for model in (EmissionEntry, EmissionMonthly, EmissionYearly):
+        db.execute(delete(model))
+
+
+def rebuild_rollups(db: Session):
+    """Recompute the monthly and yearly rollups from the entries, one GROUP BY day"""
+    db.execute(delete(EmissionMonthly))
+    db.execute(delete(EmissionYearly))
+    months = defaultdict(lambda: [0.0, 0])
+    years = defaultdict(lambda: [0.0, 0])
+    for day, total, count in db.execute(
+        select(EmissionEntry.day, func.sum(EmissionEntry.kg_co2), func.count()).group_by(EmissionEntry.day)
+    ):
+        for bucket in (months[month_key(day)], years[day.year]):
+            bucket[0] += total
+            bucket[1] += count
+    if months:
+        db.execute(insert(EmissionMonthly), [
+            {"month": month, "kg_co2": total, "entry_count": count} for month, (total, count) in months.items()
+        ])
+        db.execute(insert(EmissionYearly), [
+            {"year": year, "kg_co2": total, "entry_count": count} for year, (total, count) in years.items()
+        ])
+
+
+def backfill(db: Session) -> int:
+    """Book every style that predates the ledger on its creation day, then rebuild the rollups (caller commits)
+
+    Styles created since the app started booking (the oldest entry that isn't
+    a backfill) are already covered, imported ones by their bulk entries.
+    """
+    day = func.date(func.coalesce(Style.created_at, func.current_timestamp()))
+    ledger_start = select(func.min(EmissionEntry.recorded_at)).where(EmissionEntry.reason != "backfill").scalar_subquery()
+    created = db.execute(
+        insert(EmissionEntry).from_select(
+            ["day", "style_id", "production_location", "supplier", "kg_co2", "reason", "recorded_at"],
+            select(day, Style.id, Style.production_location, Style.supplier, Style.carbon_footprint,
+                   literal("backfill"), func.current_timestamp())
+            .where(Style.carbon_footprint.isnot(None), Style.carbon_footprint != 0)
+            .where(~exists().where(EmissionEntry.style_id == Style.id))
+            .where(or_(ledger_start.is_(None), Style.created_at.is_(None), Style.created_at < ledger_start))
+        )
+    ).rowcount
+    rebuild_rollups(db)
+    return created
+
+
+def monthly_series(db: Session, today: Optional[date] = None, months: int = TREND_MONTHS) -> List[dict]:
+    """kg CO2 booked per month for the last `months` months, oldest first (months without entries are 0)"""
+    keys = months_back(today or datetime.utcnow().date(), months)
+    found = dict(db.execute(
+        select(EmissionMonthly.month, EmissionMonthly.kg_co2).where(EmissionMonthly.month.in_(keys))
+    ).all())
+    return [{"month": key, "kg_co2": round(found.get(key, 0.0), 2)} for key in keys]
+
+
+def followup(db: Session, today: Optional[date] = None, months: int = TREND_MONTHS) -> dict:
+    """Current month, trend and progress towards the yearly reduction target, from the rollups only
+
+    The target is the previous year's emissions minus REDUCTION_TARGET. This
+    year is projected from the year to date, and the progress is the share of
+    the planned reduction that projection achieves. Without a previous year
+    the target starts from this year's run rate.
+    """
+    today = today or datetime.utcnow().date()
+    trend = monthly_series(db, today, max(months, 2))
+    current, previous = trend[-1]["kg_co2"], trend[-2]["kg_co2"]
+
+    years = dict(db.execute(
+        select(EmissionYearly.year, EmissionYearly.kg_co2).where(EmissionYearly.year.in_([today.year, today.year - 1]))
+    ).all())
+    this_year, last_year = years.get(today.year, 0.0), years.get(today.year - 1, 0.0)
+    elapsed = today.timetuple().tm_yday / (366 if calendar.isleap(today.year) else 365)
+    projected_year = this_year / elapsed
+
+    if last_year > 0 and REDUCTION_TARGET > 0:
+        yearly_target = last_year * (1 - REDUCTION_TARGET)
+        progress = (last_year - projected_year) / (last_year - yearly_target) * 100
+    else:
+        yearly_target = projected_year * (1 - REDUCTION_TARGET)
+        progress = 0.0
+
+    totals = db.get(RollupTotals, 1)
+    intensity = totals.total_carbon / totals.style_count if totals and totals.style_count else 0.0
+
+    return {
+        "current_month_emissions": round(current, 2),
+        "previous_month_emissions": round(previous, 2),
+        "month_change": round((current - previous) / previous * 100, 1) if previous > 0 else None,
+        "year": today.year,
+        "year_to_date": round(this_year, 2),
+        "last_year": round(last_year, 2),
+        "projected_year": round(projected_year, 2),
+        "yearly_target": round(yearly_target, 2),
+        "reduction_progress": round(max(0.0, min(100.0, progress)), 1),
+        "carbon_intensity": round(intensity, 2),
+        "trend": trend[-months:],
+    }
+
+
+if __name__ == "__main__":
+    from database import SessionLocal, init_db
+
+    if sys.argv[1:] not in (["backfill"], ["rebuild"]):
+        print("Usage: python emissions.py backfill|rebuild")
+        sys.exit(1)
+
+    init_db()
+    db = SessionLocal()
+    try:
+        if sys.argv[1] == "backfill":
+            print(f"emission backfill: {backfill(db)} styles booked")
+        else:
+            rebuild_rollups(db)
+            print("emission rollups rebuilt")
+        db.commit()
+    finally:
+        db.close()
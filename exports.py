@@ -0,0 +1,138 @@
+"""Streaming NDJSON/CSV exports of passports and styles (full DPP dumps)
+
+Rows come from a server-side cursor in `yield_per` partitions and are
+serialized and sent partition by partition, so memory stays constant no
+matter how many rows the table has. Only the requested columns are selected;
+the legacy base64 QR column is never exported (QR images are served from
+/qr/{id}.png). Output is gzip-compressed on the fly when the client accepts it.
+"""
+import csv
+import io
+import json
+import zlib
+from datetime import datetime
+from typing import AsyncIterator, Iterable, List, Optional
+
+from sqlalchemy import select
+
+from database import AsyncSessionLocal
+from listings import STYLE_FILTERS
+from models import NFTPassport, Style
+
+YIELD_PER = 1000
+FORMATS = {
+    "ndjson": "application/x-ndjson",
+    "csv": "text/csv; charset=utf-8",
+}
+
+
+class ExportError(ValueError):
+    pass
+
+
+def check_format(fmt: str) -> str:
+    fmt = (fmt or "ndjson").lower()
+    if fmt not in FORMATS:
+        raise ExportError(f"Unsupported export format {fmt!r} (use ndjson or csv)")
+    return fmt
+
+
+class Export:
+    """One exportable table: its columns (minus internal ones) and server-side filters"""
+
+    def __init__(self, model, exclude: Iterable[str], filters: dict):
+        self.model = model
+        self.columns = {c.key: c for c in model.__table__.columns if c.key not in set(exclude)}
+        self.filters = filters
+
+    def select_columns(self, requested: Optional[str]) -> List[str]:
+        if not requested:
+            return list(self.columns)
+        names = [name.strip() for name in requested.split(",") if name.strip()]
+        unknown = [name for name in names if name not in self.columns]
+        if unknown:
+            raise ExportError(f"Unknown columns: {', '.join(unknown)} (available: {', '.join(self.columns)})")
+        return list(dict.fromkeys(names))
+
+    def statement(self, names: List[str], filters: dict):
+        stmt = select(*[self.columns[name] for name in names])
+        for key, value in filters.items():
+            if value not in (None, ""):
+                stmt = stmt.where(self.filters[key] == value)
+        return stmt.order_by(self.model.id).execution_options(yield_per=YIELD_PER)
+
+
+EXPORTS = {
+    "passports": Export(NFTPassport, exclude=("qr_code_data", "qr_code_hash"),
+                        filters={"style": NFTPassport.style_id}),
+    "styles": Export(Style, exclude=(), filters=STYLE_FILTERS),
+}
+
+
+def _json_value(value):
+    return value.isoformat() if isinstance(value, datetime) else value
+
+
+def _csv_value(value):
+    if value is None:
+        return ""
+    if isinstance(value, datetime):
+        return value.isoformat()
+    if isinstance(value, list):
+        # Same separator style_import accepts, so a styles export can be re-imported
+        return ";".join(str(item) for item in value)
+    if isinstance(value, dict):
+        return json.dumps(value, ensure_ascii=False)
+    return value
+
+
+def ndjson_lines(names: List[str], rows) -> str:
+    return "".join(
+        json.dumps({name: _json_value(value) for name, value in zip(names, row)}, ensure_ascii=False) + "\n"
+        for row in rows
+    )
+
+
+def csv_lines(rows) -> str:
+    buffer = io.StringIO()
+    csv.writer(buffer).writerows([_csv_value(value) for value in row] for row in rows)
+    return buffer.getvalue()
+
+
+def accepts_gzip(accept_encoding: Optional[str]) -> bool:
+    """gzip (or *) listed with a q-value above 0; an explicit gzip entry wins over *"""
+    weights = {}
+    for part in (accept_encoding or "").split(","):
+        coding, *params = [item.strip() for item in part.split(";")]
+        q = 1.0
+        for param in params:
+            name, _, value = param.partition("=")
+            if name.strip().lower() == "q":
+                try:
+                    q = float(value)
+                except ValueError:
+                    q = 0.0
+        weights.setdefault(coding.lower(), q)
+    q = weights.get("gzip", weights.get("*", 0.0))
+    return q > 0
+
+
+async def stream(stmt, fmt: str, names: List[str], compress: bool) -> AsyncIterator[bytes]:
+    """Encoded export body, one chunk per database partition"""
+    # wbits=31: gzip container, not raw zlib
+    gzip = zlib.compressobj(6, zlib.DEFLATED, 31) if compress else None
+
+    def encode(text: str) -> bytes:
+        data = text.encode("utf-8")
+        return gzip.compress(data) if gzip else data
+
+    if fmt == "csv":
+        yield encode(csv_lines([names]))
+    async with AsyncSessionLocal() as db:
+        result = await db.stream(stmt)
+        async for rows in result.partitions():
+            chunk = encode(ndjson_lines(names, rows) if fmt == "ndjson" else csv_lines(rows))
+            if chunk:
+                yield chunk
+    if gzip:
+        yield gzip.flush()
@@ -0,0 +1,46 @@
+"""Pre-rendered, per-language template fragments
+
+The navigation bar and footer in base.html depend only on the language, yet
+every page render used to re-evaluate them. They live in templates/partials/
+and are rendered once per language; base.html inserts the cached markup with
+`{{ fragment("nav", lang) }}`, so a page render only does its dynamic parts.
+"""
+from typing import Optional
+
+from jinja2 import Environment
+from markupsafe import Markup
+
+from translations import SUPPORTED_LANGUAGES, get_all_texts
+
+FRAGMENTS = ("nav", "footer")
+
+
+class FragmentCache:
+    def __init__(self, env: Environment):
+        self.env = env
+        self._rendered = {}
+
+    def __call__(self, name: str, lang: Optional[str] = None) -> Markup:
+        # Pages rendered without a language (404) keep the English fallbacks in the partials
+        lang = lang if lang in SUPPORTED_LANGUAGES else None
+        key = (name, lang)
+        entry = self._rendered.get(key)
+        # is_up_to_date is always true unless the template loader auto-reloads edited files
+        if entry is None or not entry[0].is_up_to_date:
+            template = self.env.get_template(f"partials/{name}.html")
+            html = Markup(template.render(lang=lang, t=get_all_texts(lang) if lang else None).strip())
+            entry = self._rendered[key] = (template, html)
+        return entry[1]
+
+    def warm(self):
+        for name in FRAGMENTS:
+            for lang in (*SUPPORTED_LANGUAGES, None):
+                self(name, lang)
+
+
+def install(env: Environment) -> FragmentCache:
+    """Register `fragment()` as a template global and pre-render every fragment"""
+    cache = FragmentCache(env)
+    env.globals["fragment"] = cache
+    cache.warm()
+    return cache
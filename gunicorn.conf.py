@@ -0,0 +1,27 @@
+"""gunicorn settings (Procfile / railway.json: `gunicorn -c gunicorn.conf.py main:app`)
+
+Workers come from WEB_CONCURRENCY, the same variable db_profile.py divides
+the database connection budget by. Prometheus multiprocess mode is switched
+on here: every worker writes its samples to PROMETHEUS_MULTIPROC_DIR and
+GET /metrics, whichever worker serves it, reports the sum over all of them.
+"""
+import os
+import shutil
+import tempfile
+
+bind = f"0.0.0.0:{os.getenv('PORT', '8000')}"
+workers = int(os.getenv("WEB_CONCURRENCY", "4"))
+worker_class = "uvicorn.workers.UvicornWorker"
+
+
+def on_starting(server):
+    # Must be set before the workers import prometheus_client; start from an empty directory
+    # so samples of a previous run's workers aren't summed in
+    path = os.environ.setdefault("PROMETHEUS_MULTIPROC_DIR", os.path.join(tempfile.gettempdir(), "mango_dpp_metrics"))
+    shutil.rmtree(path, ignore_errors=True)
+    os.makedirs(path, exist_ok=True)
+
+
+def child_exit(server, worker):
+    from prometheus_client import multiprocess
+    multiprocess.mark_process_dead(worker.pid)
@@ -0,0 +1,51 @@
+"""Image generation backends used by MangoDPP.generate_product_image
+
+IMAGE_PROVIDER=openai (default) calls DALL-E 3 through the async OpenAI
+client and downloads the result. IMAGE_PROVIDER=stub draws a placeholder PNG
+locally, so the image job queue can be exercised without network access or
+an OpenAI account.
+"""
+import asyncio
+import hashlib
+import io
+import os
+
+import aiohttp
+from PIL import Image, ImageDraw
+
+
+class OpenAIImageProvider:
+    def __init__(self, client):
+        self.client = client  # openai.AsyncOpenAI
+
+    async def generate(self, prompt: str) -> bytes:
+        response = await self.client.images.generate(
+            model="dall-e-3",
+            prompt=prompt,
+            size="1024x1024",
+            quality="standard",
+            n=1,
+        )
+        image_url = response.data[0].url
+
+        async with aiohttp.ClientSession() as session:
+            async with session.get(image_url) as image_response:
+                image_response.raise_for_status()
+                return await image_response.read()
+
+
+class StubImageProvider:
+    """Deterministic local placeholder: same prompt, same image"""
+
+    def __init__(self, delay: float = None):
+        self.delay = float(os.getenv("STUB_IMAGE_DELAY", "0")) if delay is None else delay
+
+    async def generate(self, prompt: str) -> bytes:
+        if self.delay:
+            await asyncio.sleep(self.delay)
+        digest = hashlib.sha256(prompt.encode()).digest()
+        img = Image.new("RGB", (256, 256), color=(digest[0], digest[1], digest[2]))
+        ImageDraw.Draw(img).text((10, 10), "Mango DPP", fill=(255, 255, 255))
+        buffer = io.BytesIO()
+        img.save(buffer, format="PNG")
+        return buffer.getvalue()
@@ -0,0 +1,225 @@
+"""DB-backed background job queue
+
+Jobs are rows in the `jobs` table, so they survive restarts and their status
+can be polled from any gunicorn worker (GET /jobs/{id}). Every app process
+runs a small pool of asyncio workers (JOB_WORKERS, default 2) that claim jobs
+with a conditional UPDATE, so a job is only ever run by one worker even when
+several processes poll the same table. Failed jobs are retried with backoff
+up to `max_attempts`; a job whose worker died is picked up again once its
+lease expires, as long as it has attempts left. Otherwise it is marked
+failed, so a job that kills its worker isn't rerun forever and a job created
+with max_attempts=1 never runs twice.
+
+Handlers are registered per job kind:
+
+    @jobs.handler("generate_image")
+    async def generate_image_job(job): ...
+"""
+import asyncio
+import os
+import socket
+import uuid
+from datetime import datetime, timedelta
+from typing import Optional
+
+from sqlalchemy import and_, or_, select, update
+
+from database import AsyncSessionLocal, write_guard
+from models import Job
+
+JOB_WORKERS = int(os.getenv("JOB_WORKERS", "2"))
+POLL_INTERVAL = float(os.getenv("JOB_POLL_INTERVAL", "1.0"))
+LEASE_SECONDS = int(os.getenv("JOB_LEASE_SECONDS", "300"))
+RETRY_BACKOFF_SECONDS = 5
+
+_handlers = {}
+
+
+def handler(kind: str):
+    """Register the coroutine that runs jobs of this kind"""
+    def register(fn):
+        _handlers[kind] = fn
+        return fn
+    return register
+
+
+def new_job(kind: str, payload: dict, max_attempts: int = 3, progress_total: int = 0) -> Job:
+    """Job row for the caller to add to its session, so it commits together with the caller's writes"""
+    return Job(
+        id=str(uuid.uuid4()),
+        kind=kind,
+        status="queued",
+        payload=payload,
+        max_attempts=max_attempts,
+        progress_total=progress_total,
+        available_at=datetime.utcnow(),
+    )
+
+
+def job_to_dict(job: Job) -> dict:
+    return {
+        "id": job.id,
+        "kind": job.kind,
+        "status": job.status,
+        "result": job.result,
+        "error": job.error,
+        "attempts": job.attempts,
+        "progress": {"done": job.progress_done, "total": job.progress_total},
+        "created_at": job.created_at.isoformat() if job.created_at else None,
+        "started_at": job.started_at.isoformat() if job.started_at else None,
+        "finished_at": job.finished_at.isoformat() if job.finished_at else None,
+    }
+
+
+async def set_progress(job_id: str, done: int, total: Optional[int] = None):
+    """Record progress from inside a running handler (own session, committed immediately)
+
+    Also renews the lease, so long jobs that report progress aren't reclaimed
+    by another worker halfway through.
+    """
+    values = {"progress_done": done}
+    if total is not None:
+        values["progress_total"] = total
+    async with AsyncSessionLocal() as db:
+        async with write_guard():
+            await db.execute(update(Job).where(Job.id == job_id).values(**values))
+            await db.execute(
+                update(Job)
+                .where(Job.id == job_id, Job.status == "running")
+                .values(lease_expires_at=datetime.utcnow() + timedelta(seconds=LEASE_SECONDS))
+            )
+            await db.commit()
+
+
+def _lease_expired(now: datetime):
+    return and_(Job.status == "running", Job.lease_expires_at < now)
+
+
+def _claimable(now: datetime):
+    return or_(
+        and_(Job.status == "queued", Job.available_at <= now),
+        and_(_lease_expired(now), Job.attempts < Job.max_attempts),
+    )
+
+
+class WorkerPool:
+    """Bounded set of asyncio workers polling the jobs table"""
+
+    def __init__(self, concurrency: int = JOB_WORKERS, poll_interval: float = POLL_INTERVAL):
+        self.concurrency = concurrency
+        self.poll_interval = poll_interval
+        self.worker_id = f"{socket.gethostname()}:{os.getpid()}"
+        self._wakeup = None
+        self._tasks = []
+
+    def start(self):
+        if self._tasks or self.concurrency <= 0:
+            return
+        self._wakeup = asyncio.Event()
+        self._tasks = [asyncio.create_task(self._work()) for _ in range(self.concurrency)]
+
+    async def stop(self):
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+
+    def notify(self):
+        """Wake idle workers right away after enqueueing in this process"""
+        if self._wakeup is not None:
+            self._wakeup.set()
+
+    async def _work(self):
+        while True:
+            try:
+                job = await self._claim()
+            except Exception as e:
+                print(f"Job claim hatası: {e}")
+                job = None
+            if job is None:
+                self._wakeup.clear()
+                try:
+                    await asyncio.wait_for(self._wakeup.wait(), self.poll_interval)
+                except asyncio.TimeoutError:
+                    pass
+                continue
+            await self._run(job)
+
+    async def _claim(self) -> Optional[Job]:
+        now = datetime.utcnow()
+        async with AsyncSessionLocal() as db:
+            await self._fail_expired(db, now)
+            job_id = (await db.execute(
+                select(Job.id).where(_claimable(now)).order_by(Job.available_at).limit(1)
+            )).scalar()
+            if job_id is None:
+                return None
+
+            # Conditional UPDATE: only one worker (in any process) wins the job
+            async with write_guard():
+                claimed = await db.execute(
+                    update(Job)
+                    .where(Job.id == job_id, _claimable(now))
+                    .values(
+                        status="running",
+                        locked_by=self.worker_id,
+                        lease_expires_at=now + timedelta(seconds=LEASE_SECONDS),
+                        started_at=now,
+                        attempts=Job.attempts + 1,
+                    )
+                )
+                await db.commit()
+            if claimed.rowcount != 1:
+                return None
+            return await db.get(Job, job_id)
+
+    async def _fail_expired(self, db, now: datetime):
+        """Fail running jobs whose worker died on their last attempt (a read unless there are any)"""
+        exhausted = and_(_lease_expired(now), Job.attempts >= Job.max_attempts)
+        if (await db.execute(select(Job.id).where(exhausted).limit(1))).first() is None:
+            return
+        async with write_guard():
+            await db.execute(
+                update(Job)
+                .where(exhausted)
+                .values(status="failed", error="Lease expired: the worker stopped during the last attempt",
+                        finished_at=now, locked_by=None, lease_expires_at=None)
+            )
+            await db.commit()
+
+    async def _run(self, job: Job):
+        fn = _handlers.get(job.kind)
+        try:
+            if fn is None:
+                raise LookupError(f"No handler registered for job kind {job.kind!r}")
+            result = await fn(job)
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            await self._finish(job, error=str(e) or type(e).__name__)
+        else:
+            await self._finish(job, result=result)
+
+    async def _finish(self, job: Job, result: Optional[dict] = None, error: Optional[str] = None):
+        now = datetime.utcnow()
+        if error is None:
+            values = {"status": "succeeded", "result": result, "error": None, "finished_at": now}
+        elif job.attempts < job.max_attempts:
+            values = {
+                "status": "queued",
+                "error": error,
+                "available_at": now + timedelta(seconds=RETRY_BACKOFF_SECONDS * 2 ** (job.attempts - 1)),
+            }
+        else:
+            values = {"status": "failed", "error": error, "finished_at": now}
+        values.update(locked_by=None, lease_expires_at=None)
+
+        async with AsyncSessionLocal() as db:
+            async with write_guard():
+                await db.execute(
+                    update(Job).where(Job.id == job.id, Job.locked_by == self.worker_id).values(**values)
+                )
+                await db.commit()
+
+
+pool = WorkerPool()
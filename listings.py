@@ -0,0 +1,126 @@
+"""Keyset (cursor) pagination for the style and collection listings
+
+Listings are ordered newest first on (created_at, id); created_at is NOT NULL
+(migration 0012), since a NULL would drop out of every cursor comparison. A
+cursor encodes the last row of the previous page, so every page is an index range scan of the
+same cost no matter how deep the client pages, unlike OFFSET.
+"""
+import base64
+import json
+from collections import namedtuple
+from datetime import datetime
+from typing import Optional
+
+from sqlalchemy import select, tuple_
+from sqlalchemy.orm import Session
+
+from models import Collection, Style
+
+DEFAULT_PAGE_SIZE = 24
+MAX_PAGE_SIZE = 100
+
+# Query parameter -> column for the server-side filters
+STYLE_FILTERS = {
+    "collection": Style.collection_id,
+    "category": Style.category,
+    "status": Style.status,
+    "location": Style.production_location,
+}
+COLLECTION_FILTERS = {
+    "season": Collection.season,
+    "year": Collection.year,
+}
+
+Page = namedtuple("Page", ["items", "next_cursor"])
+
+
+class InvalidCursor(ValueError):
+    pass
+
+
+def encode_cursor(created_at: datetime, row_id: str) -> str:
+    raw = json.dumps([created_at.isoformat(), row_id]).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str):
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        created_at, row_id = json.loads(raw)
+        return datetime.fromisoformat(created_at), str(row_id)
+    except (ValueError, TypeError) as e:
+        raise InvalidCursor(f"Invalid cursor: {cursor!r}") from e
+
+
+def clamp_page_size(limit: Optional[int]) -> int:
+    if not limit or limit < 1:
+        return DEFAULT_PAGE_SIZE
+    return min(limit, MAX_PAGE_SIZE)
+
+
+def active_filters(params: dict, allowed: dict) -> dict:
+    """Keep only known, non-empty filter values"""
+    return {key: value for key, value in params.items() if key in allowed and value not in (None, "")}
+
+
+def _keyset_page(db: Session, model, filters: dict, allowed: dict, cursor: Optional[str], limit: int) -> Page:
+    stmt = select(model)
+    for key, value in filters.items():
+        stmt = stmt.where(allowed[key] == value)
+    if cursor:
+        created_at, row_id = decode_cursor(cursor)
+        stmt = stmt.where(tuple_(model.created_at, model.id) < tuple_(created_at, row_id))
+    stmt = stmt.order_by(model.created_at.desc(), model.id.desc()).limit(limit + 1)
+
+    rows = db.execute(stmt).scalars().all()
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        next_cursor = encode_cursor(rows[-1].created_at, rows[-1].id)
+    return Page(rows, next_cursor)
+
+
+def list_styles(db: Session, filters: dict, cursor: Optional[str] = None, limit: int = DEFAULT_PAGE_SIZE) -> Page:
+    return _keyset_page(db, Style, active_filters(filters, STYLE_FILTERS), STYLE_FILTERS, cursor, clamp_page_size(limit))
+
+
+def list_collections(db: Session, filters: dict, cursor: Optional[str] = None, limit: int = DEFAULT_PAGE_SIZE) -> Page:
+    return _keyset_page(db, Collection, active_filters(filters, COLLECTION_FILTERS), COLLECTION_FILTERS, cursor, clamp_page_size(limit))
+
+
+def collection_options(db: Session):
+    """Lightweight (id, name, season, year) rows for dropdowns"""
+    return db.execute(
+        select(Collection.id, Collection.name, Collection.season, Collection.year)
+        .order_by(Collection.created_at.desc(), Collection.id.desc())
+    ).all()
+
+
+def style_to_dict(style: Style) -> dict:
+    return {
+        "id": style.id,
+        "name": style.name,
+        "collection_id": style.collection_id,
+        "category": style.category,
+        "materials": style.materials or [],
+        "target_price": style.target_price,
+        "production_location": style.production_location,
+        "supplier": style.supplier,
+        "carbon_footprint": style.carbon_footprint,
+        "status": style.status,
+        "image_url": style.image_url,
+        "nft_id": style.nft_id,
+        "created_at": style.created_at.isoformat() if style.created_at else None,
+    }
+
+
+def collection_to_dict(collection: Collection, style_count: int = 0) -> dict:
+    return {
+        "id": collection.id,
+        "name": collection.name,
+        "season": collection.season,
+        "year": collection.year,
+        "description": collection.description,
+        "style_count": style_count,
+        "created_at": collection.created_at.isoformat() if collection.created_at else None,
+    }
@@ -1,11 +1,12 @@
 from fastapi import FastAPI, Request, Form, File, UploadFile, Depends
-from fastapi.responses import HTMLResponse, JSONResponse
+from fastapi.responses import HTMLResponse, JSONResponse, Response, StreamingResponse
 from fastapi.staticfiles import StaticFiles
 from fastapi.templating import Jinja2Templates
 from fastapi.middleware.cors import CORSMiddleware
+from starlette.concurrency import run_in_threadpool
 import urllib.parse
-from sqlalchemy.orm import Session
-import qrcode
+from sqlalchemy import select, delete, update
+from sqlalchemy.ext.asyncio import AsyncSession
 import io
 import base64
 import json
@@ -13,20 +14,49 @@ import uuid
 from datetime import datetime
 from typing import Optional, List
 import os
-from web3 import Web3
-from eth_account import Account
-import hashlib
 import openai
 import keyring
 import asyncio
-import aiohttp
+from contextlib import asynccontextmanager
 
 # Database imports
-from database import get_db, init_db
-from models import Collection, Style, NFTPassport, Supplier
-from translations import get_text, get_all_texts
+from database import get_async_db, init_db, SessionLocal, AsyncSessionLocal, engine, async_engine, write_guard, thread_write_guard
+from models import Collection, Style, StyleMaterial, NFTPassport, Supplier, Job, SearchDocument, AnchorBatch, PassportAnchor, PassportAnchorHistory
+from translations import get_text, get_all_texts, resolve_language
+import stats
+import rollups
+import listings
+import jobs
+import qr_store
+import passport_batch
+import page_cache
+import passports
+import anchoring
+import carbon_engine
+import emissions
+import search
+import style_import
+import exports
+import fragments
+import text_repair
+import db_profile
+import metrics
+import query_inspector
+import style_materials
+from turkish_text import fix_turkish_encoding
+from image_providers import OpenAIImageProvider, StubImageProvider
 
-app = FastAPI(title="Mango DPP - Digital Product Platform")
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    jobs.pool.start()
+    anchor_scheduler = asyncio.create_task(anchoring.schedule())
+    yield
+    anchor_scheduler.cancel()
+    await jobs.pool.stop()
+    passport_batch.shutdown()
+    await async_engine.dispose()
+
+app = FastAPI(title="Mango DPP - Digital Product Platform", lifespan=lifespan)
 
 # CORS ve encoding ayarları
 app.add_middleware(
@@ -36,75 +66,91 @@ app.add_middleware(
     allow_methods=["*"],
     allow_headers=["*"],
 )
+app.add_middleware(metrics.MetricsMiddleware)
+metrics.instrument_engine(engine)
+metrics.instrument_engine(async_engine)
+query_inspector.install(app, engine, async_engine)
 
 # Static files ve templates
 os.makedirs("static", exist_ok=True)
 os.makedirs("templates", exist_ok=True)
 app.mount("/static", StaticFiles(directory="static"), name="static")
 templates = Jinja2Templates(directory="templates")
+metrics.instrument_templates(templates.env)
+fragments.install(templates.env)
 
 # Initialize database on startup
 init_db()
+page_cache.install()
 
-def fix_turkish_encoding(text):
-    """Fix Turkish character encoding issues"""
-    if not text:
-        return text
-    
-    # Common Turkish character fixes - comprehensive mapping
-    replacements = {
-        'Ä°': 'İ',  # Capital I with dot
-        'Ä±': 'ı',  # Lowercase dotless i
-        'Ã¼': 'ü',  # u with umlaut
-        'Ã–': 'Ö',  # Capital O with umlaut
-        'Ã¶': 'ö',  # o with umlaut
-        'Ã‡': 'Ç',  # Capital C with cedilla
-        'Ã§': 'ç',  # c with cedilla
-        'Åž': 'Ş',  # Capital S with cedilla
-        'ÅŸ': 'ş',  # s with cedilla
-        'Å ': 'Ş',  # Alternative Capital S with cedilla
-        'Å¡': 'ş',  # Alternative s with cedilla
-        'Åı': 'Şı', # Specific combination
-        'Åık': 'Şık', # Common word
-        'Äž': 'Ğ',  # Capital G with breve
-        'ÄŸ': 'ğ',  # g with breve
-        'GÃ¶z': 'Göz',  # Common word
-        'alÄ±cÄ±': 'alıcı',  # Common word
-    }
-    
-    fixed_text = text
-    for wrong, correct in replacements.items():
-        fixed_text = fixed_text.replace(wrong, correct)
-    
-    return fixed_text
+def ensure_rollups():
+    """Backfill the sustainability rollups on first start against an existing database"""
+    db = SessionLocal()
+    try:
+        if not rollups.is_built(db):
+            rollups.rebuild(db)
+            db.commit()
+            print("Sustainability rollups rebuilt")
+    except Exception as e:
+        db.rollback()
+        print(f"Rollup rebuild hatası: {e}")
+    finally:
+        db.close()
+
+ensure_rollups()
+
+def ensure_search_index():
+    """Index the catalog on first start against an existing database"""
+    db = SessionLocal()
+    try:
+        if not search.is_built(db):
+            indexed = search.rebuild(db)
+            db.commit()
+            print(f"Search index built: {indexed} documents")
+    except Exception as e:
+        db.rollback()
+        print(f"Arama dizini oluşturma hatası: {e}")
+    finally:
+        db.close()
+
+ensure_search_index()
+
+def ensure_anchors():
+    """Hash and queue passports created before anchoring on first start"""
+    db = SessionLocal()
+    try:
+        if anchoring.needs_backfill(db):
+            queued = anchoring.backfill(db)
+            db.commit()
+            print(f"Anchoring backfill: {queued} passports queued")
+    except Exception as e:
+        db.rollback()
+        print(f"Anchoring backfill hatası: {e}")
+    finally:
+        db.close()
+
+ensure_anchors()
 
 class MangoDPP:
     def __init__(self):
         self.setup_ai_client()
     
-    def get_collections(self, db: Session):
-        return db.query(Collection).all()
+    async def get_collections(self, db: AsyncSession):
+        return (await db.execute(select(Collection))).scalars().all()
     
-    def get_styles(self, db: Session):
-        return db.query(Style).all()
+    async def get_styles(self, db: AsyncSession):
+        return (await db.execute(select(Style))).scalars().all()
     
-    def get_nfts(self, db: Session):
-        return db.query(NFTPassport).all()
+    async def get_nfts(self, db: AsyncSession):
+        return (await db.execute(select(NFTPassport))).scalars().all()
         
-    def generate_qr_code(self, data: str) -> str:
-        """QR kod oluştur ve base64 string olarak döndür"""
-        qr = qrcode.QRCode(version=1, box_size=10, border=5)
-        qr.add_data(data)
-        qr.make(fit=True)
-        
-        img = qr.make_image(fill_color="black", back_color="white")
-        img_buffer = io.BytesIO()
-        img.save(img_buffer, format='PNG')
-        img_str = base64.b64encode(img_buffer.getvalue()).decode()
-        return f"data:image/png;base64,{img_str}"
-    
-    def create_nft_passport(self, product_data: dict) -> dict:
-        """NFT dijital pasaport oluştur"""
+    def generate_qr_code(self, data: str) -> bytes:
+        """QR kod oluştur ve PNG olarak döndür (qr_store'da saklanır)"""
+        with metrics.external_call("qr"):
+            return qr_store.render_png(data)
+    
+    def create_nft_passport(self, product_data: dict, render_qr: bool = True) -> dict:
+        """NFT dijital pasaport oluştur (toplu üretimde QR kodları ayrıca işlem havuzunda çizilir)"""
         nft_id = str(uuid.uuid4())
         
         # NFT metadata
@@ -118,13 +164,14 @@ class MangoDPP:
             "carbon_footprint": product_data.get("carbon_footprint", 0),
             "certificates": product_data.get("certificates", []),
             "supplier": product_data.get("supplier", ""),
-            "created_at": datetime.now().isoformat(),
-            "blockchain_hash": hashlib.sha256(nft_id.encode()).hexdigest()
+            "created_at": datetime.now().isoformat()
         }
         
         # QR kod oluştur
         qr_data = f"https://mangodpp.com/passport/{nft_id}"
-        nft_data["qr_code"] = self.generate_qr_code(qr_data)
+        if render_qr:
+            nft_data["qr_png"] = self.generate_qr_code(qr_data)
+        nft_data["qr_code"] = qr_store.qr_path(nft_id)
         nft_data["qr_url"] = qr_data
         
         # NFT data is now stored in database by the route handler
@@ -146,8 +193,13 @@ class MangoDPP:
                     except:
                         continue
             
-            if api_key:
-                self.openai_client = openai.OpenAI(api_key=api_key)
+            if os.getenv("IMAGE_PROVIDER") == "stub":
+                # Local placeholder images (tests, development without an API key)
+                self.image_provider = StubImageProvider()
+                self.ai_enabled = True
+            elif api_key:
+                self.openai_client = openai.AsyncOpenAI(api_key=api_key)
+                self.image_provider = OpenAIImageProvider(self.openai_client)
                 self.ai_enabled = True
             else:
                 self.ai_enabled = False
@@ -157,7 +209,7 @@ class MangoDPP:
             print(f"AI client kurulum hatası: {e}")
     
     async def generate_product_image(self, style_data: dict) -> Optional[str]:
-        """AI ile ürün görseli oluştur"""
+        """AI ile ürün görseli oluştur (arka plan işinden çağrılır)"""
         if not self.ai_enabled:
             return None
             
@@ -165,22 +217,11 @@ class MangoDPP:
             # Ürün tanımını oluştur
             prompt = self.create_image_prompt(style_data)
             
-            # OpenAI DALL-E ile görsel oluştur
-            response = self.openai_client.images.generate(
-                model="dall-e-3",
-                prompt=prompt,
-                size="1024x1024",
-                quality="standard",
-                n=1,
-            )
-            
-            # Görsel URL'sini al
-            image_url = response.data[0].url
+            # Görseli oluştur (async, event loop'u bloklamaz)
+            with metrics.external_call("image_generation"):
+                image_data = await self.image_provider.generate(prompt)
             
-            # Görseli indir ve kaydet
-            image_path = await self.download_and_save_image(image_url, style_data["id"])
-            
-            return image_path
+            return self.save_image(image_data, style_data["id"])
             
         except Exception as e:
             error_message = str(e)
@@ -192,7 +233,8 @@ class MangoDPP:
             elif "billing" in error_message or "quota" in error_message:
                 print("OpenAI hesap bakiyesi yetersiz veya kota aşıldı")
             
-            return None
+            # Job kuyruğu hatayı kaydedip yeniden deneyebilsin
+            raise
     
     def create_image_prompt(self, style_data: dict) -> str:
         """Stil verilerinden görsel prompt'u oluştur"""
@@ -222,64 +264,29 @@ class MangoDPP:
         
         return prompt.strip()
     
-    async def download_and_save_image(self, image_url: str, style_id: str) -> str:
-        """Görseli indir ve kaydet"""
-        try:
-            os.makedirs("static/images", exist_ok=True)
-            
-            async with aiohttp.ClientSession() as session:
-                async with session.get(image_url) as response:
-                    if response.status == 200:
-                        image_data = await response.read()
-                        
-                        # Dosya yolunu oluştur
-                        filename = f"product_{style_id}.png"
-                        filepath = f"static/images/{filename}"
-                        
-                        # Dosyayı kaydet
-                        with open(filepath, 'wb') as f:
-                            f.write(image_data)
-                        
-                        return f"/static/images/{filename}"
-            
-        except Exception as e:
-            print(f"Görsel indirme hatası: {e}")
-            return None
-    
-    def calculate_carbon_footprint(self, materials: List[str], production_location: str, transport: str) -> float:
-        """Karbon ayak izi hesapla (basitleştirilmiş)"""
-        base_carbon = 2.5  # kg CO2
+    def save_image(self, image_data: bytes, style_id: str) -> str:
+        """Görseli kaydet"""
+        os.makedirs("static/images", exist_ok=True)
         
-        # Malzeme bazlı katsayılar
-        material_factors = {
-            "pamuk": 1.2,
-            "polyester": 2.1,
-            "yün": 3.8,
-            "ipek": 2.9,
-            "keten": 0.9,
-            "organik_pamuk": 0.8
-        }
-        
-        # Lokasyon bazlı katsayılar
-        location_factors = {
-            "türkiye": 1.0,
-            "hindistan": 1.8,
-            "çin": 2.2,
-            "bangladeş": 1.9,
-            "vietnam": 1.7
-        }
+        # Dosya yolunu oluştur
+        filename = f"product_{style_id}.png"
+        filepath = f"static/images/{filename}"
         
-        material_carbon = sum([material_factors.get(mat.lower(), 1.0) for mat in materials])
-        location_carbon = location_factors.get(production_location.lower(), 1.0)
+        # Dosyayı kaydet
+        with open(filepath, 'wb') as f:
+            f.write(image_data)
         
-        total_carbon = base_carbon * material_carbon * location_carbon
-        return round(total_carbon, 2)
+        return f"/static/images/{filename}"
+    
+    def calculate_carbon_footprint(self, materials: List[str], production_location: str, transport: str) -> float:
+        """Karbon ayak izi hesapla (basitleştirilmiş, katsayılar carbon_engine'de)"""
+        return carbon_engine.footprint(materials, production_location)
 
 mango_dpp = MangoDPP()
 
 def get_language(request: Request) -> str:
-    """Get current language from cookie or default to Turkish"""
-    return request.cookies.get("language", "tr")
+    """Get current language from cookie or default to Turkish (only supported codes)"""
+    return resolve_language(request.cookies.get("language"))
 
 def translate_season(season: str, lang: str) -> str:
     """Translate season names"""
@@ -294,24 +301,16 @@ def translate_season(season: str, lang: str) -> str:
     return season_map.get(season, {}).get(lang, season)
 
 @app.get("/")
-async def dashboard(request: Request, db: Session = Depends(get_db)):
+async def dashboard(request: Request, db: AsyncSession = Depends(get_async_db)):
     """Ana dashboard"""
     lang = get_language(request)
-    collections = mango_dpp.get_collections(db)
-    styles = mango_dpp.get_styles(db)
-    nfts = mango_dpp.get_nfts(db)
-    
-    stats = {
-        "total_collections": len(collections),
-        "total_styles": len(styles),
-        "total_samples": 0,  # Placeholder
-        "total_nfts": len(nfts)
-    }
+    recent = await db.run_sync(stats.get_recent_collections, 5)
     
     response = templates.TemplateResponse("dashboard.html", {
         "request": request, 
-        "stats": stats,
-        "collections": collections[:5],
+        "stats": await db.run_sync(stats.get_dashboard_stats),
+        "collections": [collection for collection, _ in recent],
+        "style_counts": {collection.id: count for collection, count in recent},
         "lang": lang,
         "t": get_all_texts(lang)
     })
@@ -321,31 +320,73 @@ async def dashboard(request: Request, db: Session = Depends(get_db)):
 @app.post("/set-language")
 async def set_language(language: str = Form(...)):
     """Set language preference"""
+    language = resolve_language(language)
     response = JSONResponse({"success": True, "language": language})
     response.set_cookie("language", language, max_age=31536000)  # 1 year
     return response
 
+def listing_url(path: str, params: dict) -> str:
+    """Listing URL with only the query parameters that are set"""
+    query = urllib.parse.urlencode({k: v for k, v in params.items() if v not in (None, "")})
+    return f"{path}?{query}" if query else path
+
 @app.get("/collections")
-async def collections_page(request: Request, db: Session = Depends(get_db)):
+async def collections_page(
+    request: Request,
+    season: Optional[str] = None,
+    year: Optional[int] = None,
+    cursor: Optional[str] = None,
+    limit: int = listings.DEFAULT_PAGE_SIZE,
+    db: AsyncSession = Depends(get_async_db)
+):
     """Koleksiyonlar sayfası"""
     lang = get_language(request)
-    collections = mango_dpp.get_collections(db)
+    filters = {"season": season, "year": year}
+    try:
+        page = await db.run_sync(listings.list_collections, filters, cursor, limit)
+    except listings.InvalidCursor:
+        cursor = None
+        page = await db.run_sync(listings.list_collections, filters, None, limit)
+    
     response = templates.TemplateResponse("collections.html", {
         "request": request,
-        "collections": collections,
+        "collections": page.items,
+        "style_counts": await db.run_sync(stats.style_counts_for, [c.id for c in page.items]),
+        "next_url": listing_url("/collections", {**filters, "limit": limit, "cursor": page.next_cursor}) if page.next_cursor else None,
+        "first_url": listing_url("/collections", {**filters, "limit": limit}) if cursor else None,
         "lang": lang,
         "t": get_all_texts(lang)
     })
     response.headers["Content-Type"] = "text/html; charset=utf-8"
     return response
 
+@app.get("/api/collections")
+async def api_collections(
+    season: Optional[str] = None,
+    year: Optional[int] = None,
+    cursor: Optional[str] = None,
+    limit: int = listings.DEFAULT_PAGE_SIZE,
+    db: AsyncSession = Depends(get_async_db)
+):
+    """API: Koleksiyon listesi (cursor sayfalama)"""
+    try:
+        page = await db.run_sync(listings.list_collections, {"season": season, "year": year}, cursor, limit)
+    except listings.InvalidCursor as e:
+        return JSONResponse({"error": str(e)}, status_code=400)
+    
+    counts = await db.run_sync(stats.style_counts_for, [c.id for c in page.items])
+    return {
+        "items": [listings.collection_to_dict(c, counts.get(c.id, 0)) for c in page.items],
+        "next_cursor": page.next_cursor
+    }
+
 @app.post("/collections")
 async def create_collection(
     name: str = Form(...),
     season: str = Form(...),
     year: int = Form(...),
     description: str = Form(...),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """Yeni koleksiyon oluştur"""
     collection_id = str(uuid.uuid4())
@@ -364,22 +405,26 @@ async def create_collection(
     )
     
     db.add(collection)
-    db.commit()
-    db.refresh(collection)
+    async with write_guard():
+        await db.run_sync(search.index_collections, [collection_id])
+        await db.run_sync(rollups.apply_catalog_counts, 1)
+        await db.commit()
     
     return JSONResponse({"success": True, "collection_id": collection_id})
 
 @app.get("/collections/{collection_id}")
-async def view_collection(request: Request, collection_id: str, db: Session = Depends(get_db)):
+async def view_collection(request: Request, collection_id: str, db: AsyncSession = Depends(get_async_db)):
     """Koleksiyon detayını görüntüle"""
     lang = get_language(request)
     
-    collection = db.query(Collection).filter(Collection.id == collection_id).first()
+    collection = await db.get(Collection, collection_id)
     if not collection:
-        return templates.TemplateResponse("404.html", {"request": request})
+        return templates.TemplateResponse("404.html", {"request": request, "lang": lang, "t": get_all_texts(lang)})
     
     # Get styles in this collection
-    collection_styles = db.query(Style).filter(Style.collection_id == collection_id).all()
+    collection_styles = (await db.execute(
+        select(Style).where(Style.collection_id == collection_id)
+    )).scalars().all()
     
     response = templates.TemplateResponse("collection_detail.html", {
         "request": request,
@@ -392,13 +437,13 @@ async def view_collection(request: Request, collection_id: str, db: Session = De
     return response
 
 @app.get("/collections/{collection_id}/edit")
-async def edit_collection(request: Request, collection_id: str, db: Session = Depends(get_db)):
+async def edit_collection(request: Request, collection_id: str, db: AsyncSession = Depends(get_async_db)):
     """Koleksiyon düzenleme sayfası"""
     lang = get_language(request)
     
-    collection = db.query(Collection).filter(Collection.id == collection_id).first()
+    collection = await db.get(Collection, collection_id)
     if not collection:
-        return templates.TemplateResponse("404.html", {"request": request})
+        return templates.TemplateResponse("404.html", {"request": request, "lang": lang, "t": get_all_texts(lang)})
     
     response = templates.TemplateResponse("collection_edit.html", {
         "request": request,
@@ -416,10 +461,10 @@ async def update_collection(
     season: str = Form(...),
     year: int = Form(...),
     description: str = Form(...),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """Koleksiyon güncelle"""
-    collection = db.query(Collection).filter(Collection.id == collection_id).first()
+    collection = await db.get(Collection, collection_id)
     if not collection:
         return JSONResponse({"error": "Collection not found"}, status_code=404)
     
@@ -429,26 +474,89 @@ async def update_collection(
     collection.year = year
     collection.description = fix_turkish_encoding(description)
     
-    db.commit()
+    async with write_guard():
+        # Style documents carry the collection name too
+        await db.run_sync(search.index_collections, [collection_id])
+        await db.commit()
     return JSONResponse({"success": True})
 
 @app.get("/styles")
-async def styles_page(request: Request, db: Session = Depends(get_db)):
+async def styles_page(
+    request: Request,
+    collection: Optional[str] = None,
+    category: Optional[str] = None,
+    status: Optional[str] = None,
+    location: Optional[str] = None,
+    cursor: Optional[str] = None,
+    limit: int = listings.DEFAULT_PAGE_SIZE,
+    db: AsyncSession = Depends(get_async_db)
+):
     """Stiller sayfası"""
     lang = get_language(request)
-    styles = mango_dpp.get_styles(db)
-    collections = mango_dpp.get_collections(db)
+    filters = {"collection": collection, "category": category, "status": status, "location": location}
+    try:
+        page = await db.run_sync(listings.list_styles, filters, cursor, limit)
+    except listings.InvalidCursor:
+        cursor = None
+        page = await db.run_sync(listings.list_styles, filters, None, limit)
     
     response = templates.TemplateResponse("styles.html", {
         "request": request,
-        "styles": styles,
-        "collections": collections,
+        "styles": page.items,
+        "collections": await db.run_sync(listings.collection_options),
+        "filters": filters,
+        "next_url": listing_url("/styles", {**filters, "limit": limit, "cursor": page.next_cursor}) if page.next_cursor else None,
+        "first_url": listing_url("/styles", {**filters, "limit": limit}) if cursor else None,
         "lang": lang,
         "t": get_all_texts(lang)
     })
     response.headers["Content-Type"] = "text/html; charset=utf-8"
     return response
 
+@app.get("/api/styles")
+async def api_styles(
+    collection: Optional[str] = None,
+    category: Optional[str] = None,
+    status: Optional[str] = None,
+    location: Optional[str] = None,
+    cursor: Optional[str] = None,
+    limit: int = listings.DEFAULT_PAGE_SIZE,
+    db: AsyncSession = Depends(get_async_db)
+):
+    """API: Stil listesi (cursor sayfalama + filtreler)"""
+    filters = {"collection": collection, "category": category, "status": status, "location": location}
+    try:
+        page = await db.run_sync(listings.list_styles, filters, cursor, limit)
+    except listings.InvalidCursor as e:
+        return JSONResponse({"error": str(e)}, status_code=400)
+    
+    return {
+        "items": [listings.style_to_dict(style) for style in page.items],
+        "next_cursor": page.next_cursor
+    }
+
+@app.get("/api/search")
+async def api_search(
+    q: str = "",
+    kind: Optional[str] = None,
+    cursor: Optional[str] = None,
+    limit: int = listings.DEFAULT_PAGE_SIZE,
+    db: AsyncSession = Depends(get_async_db)
+):
+    """API: Stil, koleksiyon ve pasaportlarda tam metin arama (en iyi eşleşme önce, cursor sayfalama)"""
+    if kind and kind not in search.KINDS:
+        return JSONResponse({"error": f"kind must be one of: {', '.join(search.KINDS)}"}, status_code=400)
+    try:
+        page = await db.run_sync(search.search, q, kind, cursor, limit)
+    except listings.InvalidCursor as e:
+        return JSONResponse({"error": str(e)}, status_code=400)
+    
+    return {
+        "query": q,
+        "items": [search.hit_to_dict(hit) for hit in page.items],
+        "next_cursor": page.next_cursor
+    }
+
 @app.post("/styles")
 async def create_style(
     name: str = Form(...),
@@ -459,7 +567,7 @@ async def create_style(
     production_location: str = Form(...),
     supplier: str = Form(...),
     generate_image: bool = Form(False),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """Yeni stil oluştur"""
     style_id = str(uuid.uuid4())
@@ -471,7 +579,8 @@ async def create_style(
     production_location = fix_turkish_encoding(production_location)
     supplier = fix_turkish_encoding(supplier)
     
-    materials_list = [m.strip() for m in materials.split(",")]
+    # "%60 pamuk" gibi oranlar style_materials'a, malzeme adı Style.materials'a
+    materials_list, material_shares = style_materials.split_shares(materials.split(","))
     
     # Karbon ayak izi hesapla
     carbon_footprint = mango_dpp.calculate_carbon_footprint(
@@ -491,45 +600,124 @@ async def create_style(
         status="design"
     )
     
-    # AI görsel oluştur (istenirse)
-    if generate_image and mango_dpp.ai_enabled:
-        try:
-            # Style dict oluştur AI için
-            style_dict = {
-                "id": style_id,
-                "name": name,
-                "category": category,
-                "materials": materials_list
-            }
-            image_path = await mango_dpp.generate_product_image(style_dict)
-            if image_path:
-                style.image_url = image_path
-                style.status = "image_created"
-        except Exception as e:
-            print(f"Görsel oluşturma hatası: {e}")
+    # AI görseli arka plan işi olarak kuyruğa al (istenirse); stil hemen kaydedilir
+    job = jobs.new_job("generate_image", {"style_id": style_id}) if generate_image and mango_dpp.ai_enabled else None
+    
+    async with write_guard():
+        db.add(style)
+        db.add_all(style_materials.entries(style_id, materials_list, material_shares))
+        if job:
+            db.add(job)
+        await db.run_sync(rollups.apply_style_change, None, rollups.snapshot(style))
+        await db.run_sync(emissions.record_style_changes, [(None, rollups.snapshot(style))], "create")
+        await db.run_sync(search.index_styles, [style_id])
+        await db.commit()
     
-    db.add(style)
-    db.commit()
-    db.refresh(style)
+    if job:
+        jobs.pool.notify()
     
     return JSONResponse({
         "success": True, 
         "style_id": style_id,
-        "image_generated": style.image_url is not None,
+        "image_generated": False,
+        "image_job_id": job.id if job else None,
         "ai_enabled": mango_dpp.ai_enabled
     })
 
-@app.post("/generate-image/{style_id}")
-async def generate_style_image(style_id: str, db: Session = Depends(get_db)):
-    """Var olan stil için AI görsel oluştur"""
+def _import_styles(upload: UploadFile, fmt: str, collection_id: Optional[str]) -> dict:
+    db = SessionLocal()
+    try:
+        return style_import.import_stream(
+            db, upload.file, fmt, default_collection_id=collection_id, write_lock=thread_write_guard
+        )
+    finally:
+        db.close()
+
+@app.post("/styles/import")
+async def import_styles(
+    file: UploadFile = File(...),
+    format: str = Form(""),
+    collection_id: str = Form("")
+):
+    """API: CSV/JSONL dosyasından toplu stil içe aktar (satır satır okunur, parça parça kaydedilir)"""
+    try:
+        fmt = style_import.detect_format(file.filename or "", format or None)
+    except style_import.ImportFormatError as e:
+        return JSONResponse({"error": str(e)}, status_code=400)
+
+    # Ayrıştırma ve yazma bir iş parçacığında; olay döngüsü bloklanmaz. Yazma kilidi
+    # parça başına alınır, diğer yazmalar ve iş kiralama yenilemeleri araya girebilir
     try:
-        style = db.query(Style).filter(Style.id == style_id).first()
+        result = await run_in_threadpool(_import_styles, file, fmt, collection_id or None)
+    except Exception:
+        # Hatadan önce kaydedilen parçalar da aranabilir olmalı
+        await _enqueue_search_index()
+        raise
+
+    # Arama dizini içe aktarmadan sonra arka planda güncellenir
+    job = await _enqueue_search_index() if result["imported"] else None
+
+    return JSONResponse({"success": True, **result, "search_index_job_id": job.id if job else None})
+
+async def _enqueue_search_index() -> Job:
+    job = jobs.new_job("index_search", {})
+    async with AsyncSessionLocal() as db:
+        async with write_guard():
+            db.add(job)
+            await db.commit()
+    jobs.pool.notify()
+    return job
+
+@jobs.handler("index_search")
+async def index_search_job(job: Job) -> dict:
+    """Arka plan işi: arama dokümanı olmayan stilleri (toplu içe aktarma) parça parça indeksle"""
+    chunks = 0
+    after_id = ""
+    while True:
+        async with AsyncSessionLocal() as db:
+            async with write_guard():
+                last_id = await db.run_sync(search.index_missing_styles, after_id)
+                await db.commit()
+        if last_id is None:
+            break
+        after_id = last_id
+        chunks += 1
+        await jobs.set_progress(job.id, chunks)  # also renews the lease
+    
+    return {"chunks": chunks}
+
+@app.post("/generate-image/{style_id}")
+async def generate_style_image(style_id: str, db: AsyncSession = Depends(get_async_db)):
+    """Var olan stil için AI görsel oluşturma işini kuyruğa al"""
+    style = await db.get(Style, style_id)
+    if not style:
+        return JSONResponse({"error": "Style not found"}, status_code=404)
+    
+    if not mango_dpp.ai_enabled:
+        return JSONResponse({"error": "AI image generation disabled. OpenAI API key required."}, status_code=400)
+    
+    job = jobs.new_job("generate_image", {"style_id": style_id})
+    async with write_guard():
+        db.add(job)
+        await db.commit()
+    jobs.pool.notify()
+    
+    return JSONResponse({
+        "success": True,
+        "job_id": job.id,
+        "status": job.status,
+        "status_url": f"/jobs/{job.id}"
+    }, status_code=202)
+
+@jobs.handler("generate_image")
+async def generate_image_job(job: Job) -> dict:
+    """Arka plan işi: stil görselini oluştur ve stile kaydet"""
+    style_id = job.payload["style_id"]
+    async with AsyncSessionLocal() as db:
+        style = await db.get(Style, style_id)
         if not style:
-            return JSONResponse({"error": "Style not found"}, status_code=404)
+            raise LookupError("Style not found")
         
-        if not mango_dpp.ai_enabled:
-            return JSONResponse({"error": "AI image generation disabled. OpenAI API key required."}, status_code=400)
-    
         # Create style data for AI generation
         style_data = {
             "id": style.id,
@@ -538,117 +726,170 @@ async def generate_style_image(style_id: str, db: Session = Depends(get_db)):
             "category": style.category or "",
             "description": f"{style.name} made of {', '.join(style.materials) if style.materials else 'fabric'}"
         }
-        
-        image_path = await mango_dpp.generate_product_image(style_data)
-        if image_path:
-            style.image_url = image_path
-            db.commit()
-            
-            return JSONResponse({
-                "success": True,
-                "image_url": image_path,
-                "message": "Image created successfully"
-            })
-        else:
-            # More specific error based on AI status
-            if not mango_dpp.ai_enabled:
-                return JSONResponse({"error": "OpenAI API key invalid or missing"}, status_code=500)
-            else:
-                return JSONResponse({"error": "Image could not be created - OpenAI API issue"}, status_code=500)
-            
-    except Exception as e:
-        error_message = str(e)
-        if "invalid_api_key" in error_message or "401" in error_message:
-            return JSONResponse({"error": "OpenAI API key invalid or expired"}, status_code=401)
-        elif "billing" in error_message or "quota" in error_message:
-            return JSONResponse({"error": "OpenAI account balance insufficient"}, status_code=402)
-        else:
-            return JSONResponse({"error": f"Image generation error: {str(e)}"}, status_code=500)
+    
+    image_path = await mango_dpp.generate_product_image(style_data)
+    if not image_path:
+        raise RuntimeError("Image could not be created - OpenAI API issue")
+    
+    async with AsyncSessionLocal() as db:
+        async with write_guard():
+            await db.execute(
+                update(Style).where(Style.id == style_id).values(image_url=image_path, status="image_created")
+            )
+            await db.commit()
+    
+    return {"style_id": style_id, "image_url": image_path}
+
+@app.get("/jobs/{job_id}")
+async def get_job_status(job_id: str, db: AsyncSession = Depends(get_async_db)):
+    """API: Arka plan işi durumu"""
+    job = await db.get(Job, job_id)
+    if not job:
+        return JSONResponse({"error": "Job not found"}, status_code=404)
+    return jobs.job_to_dict(job)
 
 @app.get("/passport/{nft_id}", response_class=HTMLResponse)
-async def nft_passport(request: Request, nft_id: str, db: Session = Depends(get_db)):
+async def nft_passport(request: Request, nft_id: str, db: AsyncSession = Depends(get_async_db)):
     """NFT dijital pasaport görüntüle"""
-    # Find NFT passport by its ID
-    nft_passport = db.query(NFTPassport).filter(NFTPassport.id == nft_id).first()
-    
-    if not nft_passport:
-        return templates.TemplateResponse("404.html", {"request": request})
-    
-    style = db.query(Style).filter(Style.id == nft_passport.style_id).first()
-    collection = db.query(Collection).filter(Collection.id == style.collection_id).first() if style else None
-    
-    nft_data = {
-        "id": nft_id,
-        "name": style.name if style else "",
-        "product_code": nft_passport.product_code,
-        "collection": collection.name if collection else "",
-        "materials": style.materials if style and style.materials else [],
-        "production_location": style.production_location if style else "",
-        "supplier": style.supplier if style else "",
-        "carbon_footprint": style.carbon_footprint if style else 0,
-        "certificates": nft_passport.certificates if nft_passport.certificates else [],
-        "blockchain_hash": nft_passport.blockchain_hash,
-        "qr_code": nft_passport.qr_code_data,
-        "qr_url": f"https://mango-dpp-platform-production.up.railway.app/passport/{nft_id}",
-        "created_at": nft_passport.created_at
-    }
-    
     lang = get_language(request)
     
-    return templates.TemplateResponse("passport.html", {
+    # Rendered page cache: the invalidation log other workers append to is read at most
+    # once per PAGE_CACHE_SYNC_INTERVAL, hits in between don't touch the database
+    if page_cache.sync_due():
+        await db.run_sync(page_cache.sync)
+    cached = page_cache.passport_pages.get((nft_id, lang))
+    if cached:
+        return passport_response(request, cached)
+    
+    nft_data = await passports.get_view(db, nft_id)
+    if not nft_data:
+        return templates.TemplateResponse("404.html", {"request": request, "lang": lang, "t": get_all_texts(lang)})
+    
+    body = templates.get_template("passport.html").render({
         "request": request,
         "nft": nft_data,
+        "lang": lang,
         "t": get_all_texts(lang)
-    })
+    }).encode("utf-8")
+    page = page_cache.passport_pages.set((nft_id, lang), page_cache.page(body), passports.cache_tags(nft_data))
+    return passport_response(request, page)
+
+def passport_response(request: Request, page: page_cache.CachedPage) -> Response:
+    """Cached passport page, or 304 when the browser already has this version"""
+    headers = {"ETag": page.etag, "Cache-Control": "no-cache", "Vary": "Cookie"}
+    if page_cache.etag_matches(request.headers.get("if-none-match"), page.etag):
+        return Response(status_code=304, headers=headers)
+    return HTMLResponse(content=page.body, headers=headers)
+
+@app.get("/api/cache-stats")
+async def cache_stats():
+    """API: Süreç içi önbellek sayaçları (bu worker için)"""
+    return {"pid": os.getpid(), "caches": [cache.stats() for cache in page_cache.CACHES]}
+
+@app.get("/metrics")
+async def prometheus_metrics():
+    """Prometheus metrikleri (gunicorn altında tüm worker'ların toplamı)"""
+    return Response(content=metrics.render_latest(), media_type=metrics.CONTENT_TYPE_LATEST)
+
+@app.get("/api/db-stats")
+async def db_stats():
+    """API: Bağlantı havuzu sayaçları (bekleme süresi, kullanımdaki bağlantılar; bu worker için)"""
+    return {"pid": os.getpid(), "pools": db_profile.pool_stats()}
+
+@app.get("/qr/{nft_id}.png")
+async def nft_qr_code(request: Request, nft_id: str, db: AsyncSession = Depends(get_async_db)):
+    """Pasaport QR kodu (içerik hash'i ETag, tarayıcıda kalıcı önbellek)"""
+    found = await db.run_sync(qr_store.load, nft_id)
+    if not found:
+        return JSONResponse({"error": "QR code not found"}, status_code=404)
+    
+    digest, png = found
+    headers = {"Cache-Control": qr_store.CACHE_CONTROL, "ETag": f'"{digest}"'}
+    if request.headers.get("if-none-match") == headers["ETag"]:
+        return Response(status_code=304, headers=headers)
+    return Response(content=png, media_type="image/png", headers=headers)
+
+def export_response(request: Request, name: str, format: str, columns: Optional[str], filters: dict):
+    """Sütunları/filtreleri doğrula, sonra gövdeyi veritabanından akış halinde gönder"""
+    try:
+        fmt = exports.check_format(format)
+        export = exports.EXPORTS[name]
+        names = export.select_columns(columns)
+    except exports.ExportError as e:
+        return JSONResponse({"error": str(e)}, status_code=400)
+
+    compress = exports.accepts_gzip(request.headers.get("accept-encoding"))
+    headers = {
+        "Content-Disposition": f'attachment; filename="{name}.{"csv" if fmt == "csv" else "ndjson"}"',
+        "Vary": "Accept-Encoding",
+    }
+    if compress:
+        headers["Content-Encoding"] = "gzip"
+    return StreamingResponse(
+        exports.stream(export.statement(names, filters), fmt, names, compress),
+        media_type=exports.FORMATS[fmt],
+        headers=headers
+    )
+
+@app.get("/api/export/passports")
+async def export_passports(
+    request: Request,
+    format: str = "ndjson",
+    columns: Optional[str] = None,
+    style: Optional[str] = None
+):
+    """API: Tüm dijital ürün pasaportlarını NDJSON/CSV olarak akış halinde dışa aktar"""
+    return export_response(request, "passports", format, columns, {"style": style})
+
+@app.get("/api/export/styles")
+async def export_styles(
+    request: Request,
+    format: str = "ndjson",
+    columns: Optional[str] = None,
+    collection: Optional[str] = None,
+    category: Optional[str] = None,
+    status: Optional[str] = None,
+    location: Optional[str] = None
+):
+    """API: Stilleri NDJSON/CSV olarak akış halinde dışa aktar (filtreler /api/styles ile aynı)"""
+    filters = {"collection": collection, "category": category, "status": status, "location": location}
+    return export_response(request, "styles", format, columns, filters)
 
 @app.post("/generate-nft")
 async def generate_nft_passport(
     style_id: str = Form(...),
     certificates: str = Form(""),
     additional_info: str = Form(""),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """Stil için NFT pasaport oluştur"""
     try:
-        style = db.query(Style).filter(Style.id == style_id).first()
+        style = await db.get(Style, style_id)
         if not style:
             return JSONResponse({"error": "Style not found"}, status_code=404)
         
-        collection = db.query(Collection).filter(Collection.id == style.collection_id).first()
+        collection = await db.get(Collection, style.collection_id) if style.collection_id else None
     
-        product_data = {
-            "code": f"MNG-{style_id[:8]}",
-            "name": style.name,
-            "collection": collection.name if collection else "",
-            "materials": style.materials if style.materials else [],
-            "production_location": style.production_location or "",
-            "carbon_footprint": style.carbon_footprint or 0,
-            "certificates": [c.strip() for c in certificates.split(",") if c.strip()],
-            "supplier": style.supplier or "",
-            "additional_info": additional_info
-        }
+        product_data = passport_batch.product_data(
+            style,
+            collection.name if collection else "",
+            [c.strip() for c in certificates.split(",") if c.strip()],
+            additional_info
+        )
         
         nft_data = mango_dpp.create_nft_passport(product_data)
         
         # Create NFT passport in database
-        nft_passport = NFTPassport(
-            id=nft_data["id"],
-            style_id=style.id,
-            product_code=nft_data["product_code"],
-            name=nft_data["name"],
-            collection_name=nft_data["collection"],
-            materials=nft_data["materials"],
-            production_location=nft_data["production_location"],
-            carbon_footprint=nft_data["carbon_footprint"],
-            certificates=nft_data["certificates"],
-            supplier=nft_data["supplier"],
-            blockchain_hash=nft_data["blockchain_hash"],
-            qr_code_data=nft_data["qr_code"],
-            qr_url=nft_data["qr_url"],
-            additional_info=additional_info
-        )
+        passport = passport_batch.passport_row(nft_data, style.id, additional_info)
+        nft_passport = NFTPassport(**passport)
         db.add(nft_passport)
-        db.commit()
+        style.nft_id = nft_passport.id
+        async with write_guard():
+            nft_passport.qr_code_hash = await db.run_sync(qr_store.store, nft_data["qr_png"])
+            await db.run_sync(search.upsert, [search.passport_document(passport)])
+            await db.run_sync(anchoring.add_pending, [passport])
+            await db.run_sync(rollups.apply_catalog_counts, 0, 1)
+            await db.commit()
     
         return JSONResponse({
             "success": True,
@@ -659,48 +900,201 @@ async def generate_nft_passport(
     except Exception as e:
         return JSONResponse({"error": str(e)}, status_code=500)
 
+@app.post("/generate-nft/batch")
+async def generate_nft_passport_batch(
+    collection_id: str = Form(""),
+    style_ids: str = Form(""),
+    certificates: str = Form(""),
+    additional_info: str = Form(""),
+    skip_existing: bool = Form(True),
+    db: AsyncSession = Depends(get_async_db)
+):
+    """Koleksiyondaki tüm stiller ya da verilen stil listesi için toplu NFT pasaport işi başlat"""
+    ids = [s.strip() for s in style_ids.split(",") if s.strip()]
+    if not collection_id and not ids:
+        return JSONResponse({"error": "collection_id or style_ids required"}, status_code=400)
+    if collection_id and not await db.get(Collection, collection_id):
+        return JSONResponse({"error": "Collection not found"}, status_code=404)
+    
+    job = jobs.new_job(
+        "generate_nft_batch",
+        {
+            "collection_id": collection_id or None,
+            "style_ids": ids,
+            "certificates": [c.strip() for c in certificates.split(",") if c.strip()],
+            "additional_info": additional_info,
+            "skip_existing": skip_existing,
+        },
+        # Without skip_existing a retry would duplicate the chunks already written
+        max_attempts=3 if skip_existing else 1,
+    )
+    async with write_guard():
+        db.add(job)
+        await db.commit()
+    jobs.pool.notify()
+    
+    return JSONResponse({
+        "success": True,
+        "job_id": job.id,
+        "status": job.status,
+        "status_url": f"/jobs/{job.id}"
+    }, status_code=202)
+
+@jobs.handler("generate_nft_batch")
+async def generate_nft_batch_job(job: Job) -> dict:
+    """Arka plan işi: pasaportları parça parça oluştur, QR kodlarını işlem havuzunda çiz"""
+    payload = job.payload
+    skip_existing = payload.get("skip_existing", True)
+    async with AsyncSessionLocal() as db:
+        style_ids = await db.run_sync(
+            passport_batch.target_style_ids, payload.get("collection_id"), payload.get("style_ids"), skip_existing
+        )
+    await jobs.set_progress(job.id, 0, len(style_ids))
+    
+    created = 0
+    for start in range(0, len(style_ids), passport_batch.CHUNK_SIZE):
+        chunk = style_ids[start:start + passport_batch.CHUNK_SIZE]
+        async with AsyncSessionLocal() as db:
+            styles = await db.run_sync(passport_batch.load_styles, chunk, skip_existing)
+        rows = []
+        for style, collection_name in styles:
+            product_data = passport_batch.product_data(
+                style, collection_name, payload.get("certificates", []), payload.get("additional_info", "")
+            )
+            nft_data = mango_dpp.create_nft_passport(product_data, render_qr=False)
+            rows.append(passport_batch.passport_row(nft_data, style.id, payload.get("additional_info", "")))
+
+        # Oturum kapalıyken çiz: bağlantı havuza döner, SQLite'ta okuma snapshot'ı da tutulmaz
+        with metrics.external_call("qr_batch"):
+            pngs = await passport_batch.render_qr_codes([row["qr_url"] for row in rows])
+        async with AsyncSessionLocal() as db:
+            async with write_guard():
+                await db.run_sync(passport_batch.insert_passports, rows, pngs)
+                await db.commit()
+        created += len(rows)
+        await jobs.set_progress(job.id, start + len(chunk))
+    
+    return {"requested": len(style_ids), "created": created}
+
+@app.get("/api/passport/{nft_id}/proof")
+async def passport_anchor_proof(nft_id: str, chain: bool = False, db: AsyncSession = Depends(get_async_db)):
+    """API: Pasaportun Merkle kapsama kanıtı (yerelde doğrulanır; chain=true ile kök zincirde de kontrol edilir)"""
+    proof = await db.run_sync(anchoring.proof_for, nft_id)
+    if proof is None:
+        return JSONResponse({"error": "Passport not found"}, status_code=404)
+    if chain:
+        proof["on_chain"] = await run_in_threadpool(anchoring.verify_on_chain, proof["batch"])
+    return proof
+
+@app.post("/api/anchoring/run")
+async def run_anchoring(db: AsyncSession = Depends(get_async_db)):
+    """API: Bekleyen pasaportları beklemeden partile ve Merkle köklerini zincire yaz"""
+    job = jobs.new_job("anchor_passports", {"force": True})
+    async with write_guard():
+        db.add(job)
+        await db.commit()
+    jobs.pool.notify()
+    
+    return JSONResponse({
+        "success": True,
+        "job_id": job.id,
+        "status": job.status,
+        "status_url": f"/jobs/{job.id}"
+    }, status_code=202)
+
+@jobs.handler("anchor_passports")
+async def anchor_passports_job(job: Job) -> dict:
+    """Arka plan işi: bekleyen pasaportları Merkle partilerine kapat, yalnızca kökleri zincire yaz"""
+    force = job.payload.get("force", False)
+    anchor_chain = anchoring.chain()
+    if anchor_chain is None:
+        print("ANCHOR_RPC_URL ayarlı değil: partiler kapatılıyor ama zincire yazılmıyor")
+    anchored = []
+    sealed = []
+    while True:
+        async with AsyncSessionLocal() as db:
+            async with write_guard():
+                if anchor_chain is None:
+                    batch = await db.run_sync(anchoring.seal_due, force)
+                else:
+                    batch = await db.run_sync(anchoring.next_batch, force)
+                await db.commit()
+        if batch is None:
+            break
+        if anchor_chain is None:
+            sealed.append({"batch_id": batch.id, "leaf_count": batch.leaf_count})
+            continue
+        with metrics.external_call("anchor"):
+            receipt = await run_in_threadpool(anchor_chain.anchor, bytes.fromhex(batch.merkle_root))
+        async with AsyncSessionLocal() as db:
+            async with write_guard():
+                await db.run_sync(anchoring.mark_anchored, batch.id, receipt)
+                await db.commit()
+        anchored.append({"batch_id": batch.id, "leaf_count": batch.leaf_count, "tx_hash": receipt.tx_hash})
+    
+    return {"batches": anchored, "sealed": sealed}
+
+@app.post("/api/repair-text")
+async def repair_text(dry_run: bool = Form(False), db: AsyncSession = Depends(get_async_db)):
+    """API: Kayıtlı koleksiyon/stil/pasaport metinlerindeki bozuk Türkçe karakterleri onaran işi başlat"""
+    job = jobs.new_job("repair_text", {"dry_run": dry_run})
+    async with write_guard():
+        db.add(job)
+        await db.commit()
+    jobs.pool.notify()
+    
+    return JSONResponse({
+        "success": True,
+        "job_id": job.id,
+        "status": job.status,
+        "status_url": f"/jobs/{job.id}"
+    }, status_code=202)
+
+@jobs.handler("repair_text")
+async def repair_text_job(job: Job) -> dict:
+    """Arka plan işi: tabloları birincil anahtar sırasıyla parça parça tara ve onar"""
+    dry_run = job.payload.get("dry_run", False)
+    async with AsyncSessionLocal() as db:
+        total = await db.run_sync(text_repair.count_rows)
+    await jobs.set_progress(job.id, 0, total)
+    
+    done = 0
+    result = {}
+    for table in text_repair.TARGETS:
+        scanned = repaired = 0
+        after_id = ""
+        while True:
+            async with AsyncSessionLocal() as db:
+                async with write_guard():
+                    chunk = await db.run_sync(text_repair.repair_chunk, table, after_id, text_repair.CHUNK_SIZE, dry_run)
+                    await db.commit()
+            if chunk.last_id is None:
+                break
+            after_id = chunk.last_id
+            scanned += chunk.scanned
+            repaired += chunk.repaired
+            done += chunk.scanned
+            await jobs.set_progress(job.id, done)
+        result[table] = {"scanned": scanned, "repaired": repaired}
+    
+    return {"tables": result, "dry_run": dry_run}
+
 @app.get("/sustainability")
-async def sustainability_page(request: Request, db: Session = Depends(get_db)):
+async def sustainability_page(request: Request, db: AsyncSession = Depends(get_async_db)):
     """Sürdürülebilirlik dashboard"""
     lang = get_language(request)
-    styles = mango_dpp.get_styles(db)
-    
-    total_carbon = sum([style.carbon_footprint or 0 for style in styles])
-    avg_carbon = total_carbon / len(styles) if styles else 0
-    
-    # En düşük karbon ayak izli stiller
-    low_carbon_styles = sorted(styles, key=lambda x: x.carbon_footprint or 0)[:5]
-    
-    # Karbon kategorilerine göre dağılım
-    low_carbon_count = len([s for s in styles if (s.carbon_footprint or 0) < 3])
-    medium_carbon_count = len([s for s in styles if 3 <= (s.carbon_footprint or 0) <= 5])
-    high_carbon_count = len([s for s in styles if (s.carbon_footprint or 0) > 5])
-    
-    # Malzeme analizi
-    material_analysis = {}
-    for style in styles:
-        for material in style.materials or []:
-            if material not in material_analysis:
-                material_analysis[material] = {"count": 0, "total_carbon": 0}
-            material_analysis[material]["count"] += 1
-            material_analysis[material]["total_carbon"] += style.carbon_footprint or 0
-    
-    # Ortalama karbon hesapla
-    for material in material_analysis:
-        material_analysis[material]["avg_carbon"] = round(
-            material_analysis[material]["total_carbon"] / material_analysis[material]["count"], 2
-        )
+    summary = await db.run_sync(rollups.read_sustainability)
     
     response = templates.TemplateResponse("sustainability.html", {
         "request": request,
-        "total_carbon": round(total_carbon, 2),
-        "avg_carbon": round(avg_carbon, 2),
-        "low_carbon_styles": low_carbon_styles,
-        "total_styles": len(styles),
-        "low_carbon_count": low_carbon_count,
-        "medium_carbon_count": medium_carbon_count,
-        "high_carbon_count": high_carbon_count,
-        "material_analysis": material_analysis,
+        "total_carbon": round(summary["total_carbon"], 2),
+        "avg_carbon": round(summary["avg_carbon"], 2),
+        "low_carbon_styles": summary["low_carbon_styles"],
+        "total_styles": summary["total_styles"],
+        "low_carbon_count": summary["low_carbon_count"],
+        "medium_carbon_count": summary["medium_carbon_count"],
+        "high_carbon_count": summary["high_carbon_count"],
+        "material_analysis": summary["material_analysis"],
         "lang": lang,
         "t": get_all_texts(lang)
     })
@@ -708,86 +1102,55 @@ async def sustainability_page(request: Request, db: Session = Depends(get_db)):
     return response
 
 @app.get("/sustainability/materials", response_class=HTMLResponse)
-async def materials_analysis(request: Request, db: Session = Depends(get_db)):
+async def materials_analysis(request: Request, db: AsyncSession = Depends(get_async_db)):
     """Malzeme bazlı sürdürülebilirlik analizi"""
-    lang = request.cookies.get("lang", "tr")
-    material_stats = {}
-    
-    styles = mango_dpp.get_styles(db)
-    for style in styles:
-        materials = style.materials if style.materials else []
-        for material in materials:
-            if material not in material_stats:
-                material_stats[material] = {
-                    "styles": [],
-                    "total_carbon": 0,
-                    "avg_carbon": 0,
-                    "usage_count": 0,
-                    "sustainability_score": 0
-                }
-            
-            material_stats[material]["styles"].append(style)
-            material_stats[material]["total_carbon"] += style.carbon_footprint or 0
-            material_stats[material]["usage_count"] += 1
-    
-    # Sürdürülebilirlik skorları (basitleştirilmiş)
-    sustainability_scores = {
-        "organik_pamuk": 9, "keten": 8, "yün": 6, "pamuk": 5,
-        "ipek": 4, "polyester": 3, "naylon": 2, "akrilik": 1
-    }
-    
-    for material in material_stats:
-        if material_stats[material]["usage_count"] > 0:
-            material_stats[material]["avg_carbon"] = round(
-                material_stats[material]["total_carbon"] / material_stats[material]["usage_count"], 2
-            )
-        material_stats[material]["sustainability_score"] = sustainability_scores.get(
-            material.lower(), 5
-        )
-    
-    # En iyi ve en kötü malzemeler
-    best_materials = sorted(
-        material_stats.items(),
-        key=lambda x: (x[1]["sustainability_score"], -x[1]["avg_carbon"]),
-        reverse=True
-    )[:5]
+    lang = get_language(request)
     
-    worst_materials = sorted(
-        material_stats.items(),
-        key=lambda x: (x[1]["sustainability_score"], -x[1]["avg_carbon"])
-    )[:5]
+    # Tek GROUP BY sorgusu (style_materials); stiller belleğe yüklenmez
+    analysis = await db.run_sync(style_materials.material_analysis)
     
     response = templates.TemplateResponse("materials_analysis.html", {
         "request": request,
-        "material_stats": material_stats,
-        "best_materials": best_materials,
-        "worst_materials": worst_materials,
+        "material_stats": analysis["material_stats"],
+        "best_materials": analysis["best_materials"],
+        "worst_materials": analysis["worst_materials"],
         "lang": lang,
         "t": get_all_texts(lang)
     })
     response.headers["Content-Type"] = "text/html; charset=utf-8"
     return response
 
+async def cached_location_stats(db: AsyncSession) -> dict:
+    """stats.location_stats, computed at most once per LOCATION_STATS_TTL seconds per worker"""
+    cached = page_cache.location_stats.get("all")
+    if cached is None:
+        cached = page_cache.location_stats.set("all", await db.run_sync(stats.location_stats), ())
+    return cached
+
+@app.get("/api/production-locations")
+async def api_production_locations(db: AsyncSession = Depends(get_async_db)):
+    """API: Lokasyon bazlı stil sayısı ve karbon; stiller styles_url ile sayfa sayfa alınır"""
+    location_stats = await cached_location_stats(db)
+    return {"locations": [
+        {
+            "name": name,
+            "location": entry["location"],
+            "count": entry["count"],
+            "total_carbon": round(entry["total_carbon"], 2),
+            "avg_carbon": entry["avg_carbon"],
+            "styles_url": listing_url("/api/styles", {"location": entry["location"]}) if entry["location"] else None,
+        }
+        for name, entry in sorted(location_stats.items(), key=lambda x: x[1]["avg_carbon"])
+    ]}
+
 @app.get("/sustainability/production", response_class=HTMLResponse)
-async def production_analysis(request: Request, db: Session = Depends(get_db)):
+async def production_analysis(request: Request, db: AsyncSession = Depends(get_async_db)):
     """Üretim lokasyonu bazlı analiz"""
-    lang = request.cookies.get("lang", "tr")
-    location_stats = {}
-    
-    styles = mango_dpp.get_styles(db)
-    for style in styles:
-        location = style.production_location if style.production_location else "Bilinmiyor"
-        if location not in location_stats:
-            location_stats[location] = {
-                "styles": [],
-                "total_carbon": 0,
-                "avg_carbon": 0,
-                "count": 0
-            }
-        
-        location_stats[location]["styles"].append(style)
-        location_stats[location]["total_carbon"] += style.carbon_footprint or 0
-        location_stats[location]["count"] += 1
+    lang = get_language(request)
+    
+    # Lokasyon bazlı sayılar tek GROUP BY sorgusundan, kısa süreli önbellekle;
+    # lokasyonun stilleri sayfalı stil listesinde (/styles?location=...) açılır
+    location_stats = dict(await cached_location_stats(db))
     
     # Add sample production data if database is empty
     if not location_stats or len(location_stats) <= 1:
@@ -866,25 +1229,11 @@ async def production_analysis(request: Request, db: Session = Depends(get_db)):
             }
         }
         location_stats.update(sample_locations)
-    else:
-        # Add additional details to existing locations
-        for location in location_stats:
-            if location_stats[location]["count"] > 0:
-                location_stats[location]["avg_carbon"] = round(
-                    location_stats[location]["total_carbon"] / location_stats[location]["count"], 2
-                )
-    
-    # En iyi ve en kötü lokasyonlar
-    best_locations = sorted(
-        location_stats.items(),
-        key=lambda x: x[1]["avg_carbon"]
-    )[:5]
-    
-    worst_locations = sorted(
-        location_stats.items(),
-        key=lambda x: x[1]["avg_carbon"],
-        reverse=True
-    )[:5]
+    
+    # En iyi ve en kötü lokasyonlar (tek sıralama)
+    ranked = sorted(location_stats.items(), key=lambda x: x[1]["avg_carbon"])
+    best_locations = ranked[:5]
+    worst_locations = ranked[::-1][:5]
     
     response = templates.TemplateResponse("production_analysis.html", {
         "request": request,
@@ -898,15 +1247,12 @@ async def production_analysis(request: Request, db: Session = Depends(get_db)):
     return response
 
 @app.get("/sustainability/carbon-followup", response_class=HTMLResponse)
-async def carbon_followup(request: Request, db: Session = Depends(get_db)):
+async def carbon_followup(request: Request, db: AsyncSession = Depends(get_async_db)):
     """Konfeksiyon üreticisi karbon takibi"""
-    lang = request.cookies.get("lang", "tr")
-    styles = mango_dpp.get_styles(db)
+    lang = get_language(request)
     
-    # Aylık karbon emisyonu verisi (örnek data)
-    current_month_emissions = sum([style.carbon_footprint or 0 for style in styles])
-    yearly_target = current_month_emissions * 12 * 0.8  # %20 azaltım hedefi
-    reduction_progress = min(95, (yearly_target - current_month_emissions * 12) / yearly_target * 100) if yearly_target > 0 else 0
+    # Aylık emisyon, trend ve azaltım hedefi emisyon özet tablolarından (emissions.py)
+    followup = await db.run_sync(emissions.followup)
     
     # Enerji karışımı (örnek data)
     energy_mix = {
@@ -970,10 +1316,6 @@ async def carbon_followup(request: Request, db: Session = Depends(get_db)):
         "carbon_neutral": 25
     }
     
-    # Karbon yoğunluğu hesaplama
-    total_production = len(styles) * 1000  # varsayılan üretim miktarı
-    carbon_intensity = current_month_emissions / (total_production / 1000) if total_production > 0 else 0
-    
     # Tedarikçi skorları (örnek data) 
     supplier_scores = [
         {"name": "ABC Tekstil", "score": 85, "category": "İplik", "location": "Bursa"},
@@ -984,15 +1326,12 @@ async def carbon_followup(request: Request, db: Session = Depends(get_db)):
     
     response = templates.TemplateResponse("carbon_followup.html", {
         "request": request,
-        "current_month_emissions": round(current_month_emissions, 2),
-        "yearly_target": round(yearly_target, 2),
-        "reduction_progress": round(reduction_progress, 1),
+        **followup,
         "energy_mix": energy_mix,
         "water_usage_per_kg": water_usage_per_kg,
         "chemical_usage": chemical_usage,
         "improvement_actions": improvement_actions,
         "certifications": certifications,
-        "carbon_intensity": round(carbon_intensity, 2),
         "supplier_scores": supplier_scores,
         "lang": lang,
         "t": get_all_texts(lang)
@@ -1000,39 +1339,56 @@ async def carbon_followup(request: Request, db: Session = Depends(get_db)):
     response.headers["Content-Type"] = "text/html; charset=utf-8"
     return response
 
+@app.get("/api/emissions")
+async def get_emissions(months: int = emissions.TREND_MONTHS, db: AsyncSession = Depends(get_async_db)):
+    """API: Aylık emisyon trendi ve yıllık azaltım hedefi"""
+    return await db.run_sync(emissions.followup, None, max(1, min(months, 120)))
+
 @app.get("/api/stats")
-async def get_stats(db: Session = Depends(get_db)):
+async def get_stats(db: AsyncSession = Depends(get_async_db)):
     """API: İstatistikler"""
-    collections = mango_dpp.get_collections(db)
-    styles = mango_dpp.get_styles(db)
-    nfts = mango_dpp.get_nfts(db)
+    totals = await db.run_sync(stats.get_totals)
     
     return {
-        "collections": len(collections),
-        "styles": len(styles),
+        "collections": totals["collections"],
+        "styles": totals["styles"],
         "samples": 0,
-        "nfts": len(nfts),
-        "total_carbon": sum([s.carbon_footprint or 0 for s in styles])
+        "nfts": totals["nfts"],
+        "total_carbon": totals["total_carbon"]
     }
 
 @app.post("/api/delete-all")
-async def delete_all_data(db: Session = Depends(get_db)):
+async def delete_all_data(db: AsyncSession = Depends(get_async_db)):
     """Delete all data from database - Fresh restart (Force deploy)"""
     try:
-        # Delete all NFT passports
-        db.query(NFTPassport).delete()
-        
-        # Delete all styles
-        db.query(Style).delete()
-        
-        # Delete all collections
-        db.query(Collection).delete()
-        
-        # Delete all suppliers
-        db.query(Supplier).delete()
-        
-        # Commit the changes
-        db.commit()
+        async with write_guard():
+            # Delete all NFT passports
+            await db.execute(delete(NFTPassport))
+            
+            # Delete all styles (and their material rows)
+            await db.execute(delete(StyleMaterial))
+            await db.execute(delete(Style))
+            
+            # Delete all collections
+            await db.execute(delete(Collection))
+            
+            # Delete all suppliers
+            await db.execute(delete(Supplier))
+            
+            # Search documents (the index follows them)
+            await db.execute(delete(SearchDocument))
+            
+            # Anchoring proofs of the deleted passports (roots already on-chain stay there)
+            await db.execute(delete(PassportAnchor))
+            await db.execute(delete(PassportAnchorHistory))
+            await db.execute(delete(AnchorBatch))
+            
+            # Summary tables and the emissions history follow the now empty catalog
+            await db.run_sync(rollups.reset)
+            await db.run_sync(emissions.reset)
+            
+            # Commit the changes
+            await db.commit()
         
         return JSONResponse({
             "success": True,
@@ -1040,7 +1396,7 @@ async def delete_all_data(db: Session = Depends(get_db)):
         })
         
     except Exception as e:
-        db.rollback()
+        await db.rollback()
         return JSONResponse({
             "error": f"Failed to delete data: {str(e)}"
         }, status_code=500)
@@ -0,0 +1,160 @@
+"""Prometheus metrics: request latency, SQL per request, template render and external call times
+
+- Per route (the route template, e.g. /passport/{nft_id}): latency histogram,
+  plus the number of SQL statements and the SQL time each request spent.
+- Jinja render time per template.
+- QR rendering and AI image generation call durations.
+
+SQL is counted with engine cursor events. The per-request totals live in a
+contextvar, which follows the request into async sessions, run_sync and the
+threadpool.
+
+Under gunicorn every worker is a separate process. gunicorn.conf.py sets
+PROMETHEUS_MULTIPROC_DIR before the workers start, so each worker writes its
+samples there and GET /metrics sums all workers. Without it (uvicorn
+--reload, scripts) the metrics are those of the current process.
+"""
+import contextvars
+import os
+import time
+from contextlib import contextmanager
+
+from jinja2 import Template
+from prometheus_client import CONTENT_TYPE_LATEST, REGISTRY, CollectorRegistry, Counter, Histogram, generate_latest
+from prometheus_client import multiprocess
+from sqlalchemy import event
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+QUERY_COUNT_BUCKETS = (0, 1, 2, 3, 5, 10, 20, 50, 100, 250)
+RENDER_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 1.0)
+
+REQUEST_LATENCY = Histogram(
+    "mango_http_request_duration_seconds", "HTTP request latency (until the response body is sent)",
+    ["method", "route", "status"], buckets=LATENCY_BUCKETS,
+)
+REQUEST_QUERIES = Histogram(
+    "mango_http_request_sql_queries", "SQL statements executed per request",
+    ["route"], buckets=QUERY_COUNT_BUCKETS,
+)
+REQUEST_SQL_TIME = Histogram(
+    "mango_http_request_sql_seconds", "Time spent in SQL per request",
+    ["route"], buckets=LATENCY_BUCKETS,
+)
+SQL_QUERIES = Counter("mango_sql_queries", "SQL statements executed, inside or outside requests")
+TEMPLATE_RENDER = Histogram(
+    "mango_template_render_seconds", "Jinja template render time",
+    ["template"], buckets=RENDER_BUCKETS,
+)
+EXTERNAL_CALLS = Histogram(
+    "mango_external_call_seconds", "Duration of QR rendering and AI image calls",
+    ["operation", "outcome"], buckets=LATENCY_BUCKETS,
+)
+
+# Label for requests that no route matched (404s, static files), so stray URLs can't blow up cardinality
+UNMATCHED_ROUTE = "<unmatched>"
+
+
+class RequestStats:
+    __slots__ = ("queries", "sql_seconds")
+
+    def __init__(self):
+        self.queries = 0
+        self.sql_seconds = 0.0
+
+
+_request_stats = contextvars.ContextVar("mango_request_stats", default=None)
+
+
+def current_request_stats():
+    return _request_stats.get()
+
+
+class MetricsMiddleware:
+    """ASGI middleware timing each HTTP request from the first byte in to the last byte out"""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        stats = RequestStats()
+        token = _request_stats.set(stats)
+        status = [500]
+        started = time.perf_counter()
+
+        async def send_wrapper(message):
+            if message["type"] == "http.response.start":
+                status[0] = message["status"]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            _request_stats.reset(token)
+            route = getattr(scope.get("route"), "path", None) or UNMATCHED_ROUTE
+            REQUEST_LATENCY.labels(scope["method"], route, str(status[0])).observe(time.perf_counter() - started)
+            REQUEST_QUERIES.labels(route).observe(stats.queries)
+            REQUEST_SQL_TIME.labels(route).observe(stats.sql_seconds)
+
+
+def instrument_engine(engine):
+    """Count statements and SQL time of this engine (sync or async) into the current request"""
+    sync_engine = getattr(engine, "sync_engine", engine)
+
+    @event.listens_for(sync_engine, "before_cursor_execute")
+    def _before(conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault("mango_query_started", []).append(time.perf_counter())
+
+    @event.listens_for(sync_engine, "after_cursor_execute")
+    def _after(conn, cursor, statement, parameters, context, executemany):
+        elapsed = time.perf_counter() - conn.info["mango_query_started"].pop()
+        SQL_QUERIES.inc()
+        stats = _request_stats.get()
+        if stats is not None:
+            stats.queries += 1
+            stats.sql_seconds += elapsed
+
+    @event.listens_for(sync_engine, "handle_error")
+    def _failed(context):
+        started = context.connection.info.get("mango_query_started") if context.connection else None
+        if started:
+            started.pop()
+
+
+class TimedTemplate(Template):
+    def render(self, *args, **kwargs):
+        started = time.perf_counter()
+        try:
+            return super().render(*args, **kwargs)
+        finally:
+            TEMPLATE_RENDER.labels(self.name or "<string>").observe(time.perf_counter() - started)
+
+
+def instrument_templates(env):
+    """Time every template loaded from `env` from now on"""
+    env.template_class = TimedTemplate
+
+
+@contextmanager
+def external_call(operation: str):
+    """`with metrics.external_call("qr"):` around a slow call; failures are recorded too"""
+    started = time.perf_counter()
+    outcome = "error"
+    try:
+        yield
+        outcome = "ok"
+    finally:
+        EXTERNAL_CALLS.labels(operation, outcome).observe(time.perf_counter() - started)
+
+
+def render_latest() -> bytes:
+    """Exposition text for GET /metrics, summed over all gunicorn workers in multiprocess mode"""
+    if os.getenv("PROMETHEUS_MULTIPROC_DIR"):
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+        return generate_latest(registry)
+    return generate_latest(REGISTRY)
+
@@ -0,0 +1,73 @@
+"""Alembic environment
+
+The database comes from DATABASE_URL (database.engine), the same as the app,
+so `alembic upgrade head` and `database.init_db()` migrate the same database.
+init_db passes its own connection in `config.attributes["connection"]`.
+"""
+from logging.config import fileConfig
+
+from alembic import context
+from sqlalchemy import text
+
+from database import engine
+from models import Base
+
+config = context.config
+
+if config.config_file_name is not None and config.attributes.get("configure_logger", True):
+    fileConfig(config.config_file_name, disable_existing_loggers=False)
+
+target_metadata = Base.metadata
+
+# Arbitrary key for the PostgreSQL advisory lock that serializes migrations
+MIGRATION_LOCK_KEY = 727272
+
+
+def run_migrations_offline() -> None:
+    """Emit the migration SQL instead of running it (alembic upgrade --sql)"""
+    context.configure(
+        url=str(engine.url),
+        target_metadata=target_metadata,
+        literal_binds=True,
+        dialect_opts={"paramstyle": "named"},
+        render_as_batch=engine.dialect.name == "sqlite",
+    )
+
+    with context.begin_transaction():
+        context.run_migrations()
+
+
+def run_with_connection(connection) -> None:
+    if connection.dialect.name == "postgresql":
+        # Index builds on big tables outlast the app's statement_timeout (db_profile.py)
+        connection.execute(text("SET statement_timeout = 0"))
+        # Several app instances may start at once; only one migrates at a time
+        connection.execute(text("SELECT pg_advisory_lock(:key)"), {"key": MIGRATION_LOCK_KEY})
+        connection.commit()
+    context.configure(
+        connection=connection,
+        target_metadata=target_metadata,
+        render_as_batch=connection.dialect.name == "sqlite",
+    )
+    try:
+        with context.begin_transaction():
+            context.run_migrations()
+    finally:
+        if connection.dialect.name == "postgresql":
+            connection.execute(text("SELECT pg_advisory_unlock(:key)"), {"key": MIGRATION_LOCK_KEY})
+            connection.commit()
+
+
+def run_migrations_online() -> None:
+    connection = config.attributes.get("connection")
+    if connection is not None:
+        run_with_connection(connection)
+        return
+    with engine.connect() as connection:
+        run_with_connection(connection)
+
+
+if context.is_offline_mode():
+    run_migrations_offline()
+else:
+    run_migrations_online()
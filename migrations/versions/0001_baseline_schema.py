@@ -0,0 +1,154 @@
+"""baseline schema
+
+Every table as it existed before migrations were introduced (databases
+created by `Base.metadata.create_all` are stamped at this revision by
+database.init_db instead of running it).
+
+Revision ID: 0001
+Revises:
+Create Date: 2026-10-18 09:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0001'
+down_revision: Union[str, Sequence[str], None] = None
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table('collections',
+    sa.Column('id', sa.String(), nullable=False),
+    sa.Column('name', sa.String(), nullable=False),
+    sa.Column('season', sa.String(), nullable=False),
+    sa.Column('year', sa.Integer(), nullable=False),
+    sa.Column('description', sa.Text(), nullable=True),
+    sa.Column('created_at', sa.DateTime(), nullable=True),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index('ix_collections_created_at_id', 'collections', ['created_at', 'id'], unique=False)
+    op.create_table('jobs',
+    sa.Column('id', sa.String(), nullable=False),
+    sa.Column('kind', sa.String(), nullable=False),
+    sa.Column('status', sa.String(), nullable=False),
+    sa.Column('payload', sa.JSON(), nullable=True),
+    sa.Column('result', sa.JSON(), nullable=True),
+    sa.Column('error', sa.Text(), nullable=True),
+    sa.Column('attempts', sa.Integer(), nullable=False),
+    sa.Column('max_attempts', sa.Integer(), nullable=False),
+    sa.Column('progress_done', sa.Integer(), nullable=False),
+    sa.Column('progress_total', sa.Integer(), nullable=False),
+    sa.Column('available_at', sa.DateTime(), nullable=True),
+    sa.Column('locked_by', sa.String(), nullable=True),
+    sa.Column('lease_expires_at', sa.DateTime(), nullable=True),
+    sa.Column('created_at', sa.DateTime(), nullable=True),
+    sa.Column('started_at', sa.DateTime(), nullable=True),
+    sa.Column('finished_at', sa.DateTime(), nullable=True),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index('ix_jobs_status_available_at', 'jobs', ['status', 'available_at'], unique=False)
+    op.create_table('qr_images',
+    sa.Column('content_hash', sa.String(), nullable=False),
+    sa.Column('png', sa.LargeBinary(), nullable=False),
+    sa.Column('created_at', sa.DateTime(), nullable=True),
+    sa.PrimaryKeyConstraint('content_hash')
+    )
+    op.create_table('rollup_carbon_buckets',
+    sa.Column('bucket', sa.String(), nullable=False),
+    sa.Column('style_count', sa.Integer(), nullable=False),
+    sa.PrimaryKeyConstraint('bucket')
+    )
+    op.create_table('rollup_low_carbon_styles',
+    sa.Column('style_id', sa.String(), nullable=False),
+    sa.Column('rank', sa.Integer(), nullable=False),
+    sa.Column('name', sa.String(), nullable=False),
+    sa.Column('materials', sa.JSON(), nullable=True),
+    sa.Column('production_location', sa.String(), nullable=True),
+    sa.Column('carbon_footprint', sa.Float(), nullable=True),
+    sa.PrimaryKeyConstraint('style_id')
+    )
+    op.create_table('rollup_materials',
+    sa.Column('material', sa.String(), nullable=False),
+    sa.Column('style_count', sa.Integer(), nullable=False),
+    sa.Column('total_carbon', sa.Float(), nullable=False),
+    sa.PrimaryKeyConstraint('material')
+    )
+    op.create_table('rollup_totals',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('style_count', sa.Integer(), nullable=False),
+    sa.Column('total_carbon', sa.Float(), nullable=False),
+    sa.Column('updated_at', sa.DateTime(), nullable=True),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_table('suppliers',
+    sa.Column('id', sa.String(), nullable=False),
+    sa.Column('name', sa.String(), nullable=False),
+    sa.Column('location', sa.String(), nullable=True),
+    sa.Column('contact_info', sa.JSON(), nullable=True),
+    sa.Column('sustainability_score', sa.Float(), nullable=True),
+    sa.Column('certificates', sa.JSON(), nullable=True),
+    sa.Column('created_at', sa.DateTime(), nullable=True),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_table('styles',
+    sa.Column('id', sa.String(), nullable=False),
+    sa.Column('name', sa.String(), nullable=False),
+    sa.Column('collection_id', sa.String(), nullable=True),
+    sa.Column('category', sa.String(), nullable=False),
+    sa.Column('materials', sa.JSON(), nullable=True),
+    sa.Column('target_price', sa.Float(), nullable=True),
+    sa.Column('production_location', sa.String(), nullable=True),
+    sa.Column('supplier', sa.String(), nullable=True),
+    sa.Column('carbon_footprint', sa.Float(), nullable=True),
+    sa.Column('status', sa.String(), nullable=True),
+    sa.Column('image_url', sa.String(), nullable=True),
+    sa.Column('nft_id', sa.String(), nullable=True),
+    sa.Column('created_at', sa.DateTime(), nullable=True),
+    sa.ForeignKeyConstraint(['collection_id'], ['collections.id'], ),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index('ix_styles_created_at_id', 'styles', ['created_at', 'id'], unique=False)
+    op.create_table('nft_passports',
+    sa.Column('id', sa.String(), nullable=False),
+    sa.Column('style_id', sa.String(), nullable=True),
+    sa.Column('product_code', sa.String(), nullable=False),
+    sa.Column('name', sa.String(), nullable=False),
+    sa.Column('collection_name', sa.String(), nullable=True),
+    sa.Column('materials', sa.JSON(), nullable=True),
+    sa.Column('production_location', sa.String(), nullable=True),
+    sa.Column('carbon_footprint', sa.Float(), nullable=True),
+    sa.Column('certificates', sa.JSON(), nullable=True),
+    sa.Column('supplier', sa.String(), nullable=True),
+    sa.Column('blockchain_hash', sa.String(), nullable=True),
+    sa.Column('qr_code_data', sa.Text(), nullable=True),
+    sa.Column('qr_code_hash', sa.String(), nullable=True),
+    sa.Column('qr_url', sa.String(), nullable=True),
+    sa.Column('additional_info', sa.Text(), nullable=True),
+    sa.Column('created_at', sa.DateTime(), nullable=True),
+    sa.ForeignKeyConstraint(['style_id'], ['styles.id'], ),
+    sa.PrimaryKeyConstraint('id')
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_table('nft_passports')
+    op.drop_index('ix_styles_created_at_id', table_name='styles')
+    op.drop_table('styles')
+    op.drop_table('suppliers')
+    op.drop_table('rollup_totals')
+    op.drop_table('rollup_materials')
+    op.drop_table('rollup_low_carbon_styles')
+    op.drop_table('rollup_carbon_buckets')
+    op.drop_table('qr_images')
+    op.drop_index('ix_jobs_status_available_at', table_name='jobs')
+    op.drop_table('jobs')
+    op.drop_index('ix_collections_created_at_id', table_name='collections')
+    op.drop_table('collections')
@@ -0,0 +1,43 @@
+"""core indexes
+
+Indexes for the hot read paths (checked by benchmarks/check_query_plans.py):
+styles of a collection newest first, the lowest-carbon ranking and passports
+by style. On PostgreSQL they are built CONCURRENTLY so a deploy doesn't lock
+the tables while the indexes build.
+
+Revision ID: 0002
+Revises: 0001
+Create Date: 2026-10-18 09:10:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0002'
+down_revision: Union[str, Sequence[str], None] = '0001'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+INDEXES = [
+    ('ix_styles_collection_id_created_at_id', 'styles', ['collection_id', 'created_at', 'id']),
+    ('ix_styles_carbon_id', 'styles', [sa.text('coalesce(carbon_footprint, 0)'), 'id']),
+    ('ix_nft_passports_style_id', 'nft_passports', ['style_id']),
+]
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    with op.get_context().autocommit_block():
+        for name, table, columns in INDEXES:
+            op.create_index(name, table, columns, unique=False, if_not_exists=True, postgresql_concurrently=True)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    with op.get_context().autocommit_block():
+        for name, table, _ in reversed(INDEXES):
+            op.drop_index(name, table_name=table, if_exists=True, postgresql_concurrently=True)
@@ -0,0 +1,66 @@
+"""style materials
+
+Normalized style<->material table (style_materials.py), backfilled from the
+styles.materials JSON arrays in one INSERT ... SELECT (json_each on SQLite,
+json_array_elements on PostgreSQL). Databases adopted from create_all may
+already have the empty table; only styles without rows are backfilled.
+
+Revision ID: 0003
+Revises: 0002
+Create Date: 2026-10-18 09:20:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0003'
+down_revision: Union[str, Sequence[str], None] = '0002'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+BACKFILL = {
+    'sqlite': """
+        INSERT INTO style_materials (style_id, position, material)
+        SELECT styles.id, CAST(entry.key AS INTEGER), entry.value
+        FROM styles, json_each(CASE WHEN json_valid(styles.materials) AND json_type(styles.materials) = 'array'
+                                    THEN styles.materials ELSE '[]' END) AS entry
+        WHERE entry.type = 'text'
+          AND NOT EXISTS (SELECT 1 FROM style_materials WHERE style_materials.style_id = styles.id)
+    """,
+    'postgresql': """
+        INSERT INTO style_materials (style_id, position, material)
+        SELECT styles.id, entry.ordinality - 1, entry.value #>> '{}'
+        FROM styles CROSS JOIN LATERAL json_array_elements(
+                CASE WHEN json_typeof(styles.materials::json) = 'array' THEN styles.materials::json ELSE '[]'::json END
+             ) WITH ORDINALITY AS entry(value, ordinality)
+        WHERE json_typeof(entry.value) = 'string'
+          AND NOT EXISTS (SELECT 1 FROM style_materials WHERE style_materials.style_id = styles.id)
+    """,
+}
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    bind = op.get_bind()
+    if 'style_materials' not in sa.inspect(bind).get_table_names():
+        op.create_table('style_materials',
+        sa.Column('style_id', sa.String(), nullable=False),
+        sa.Column('position', sa.Integer(), nullable=False),
+        sa.Column('material', sa.String(), nullable=False),
+        sa.Column('percentage', sa.Float(), nullable=True),
+        sa.ForeignKeyConstraint(['style_id'], ['styles.id'], ),
+        sa.PrimaryKeyConstraint('style_id', 'position')
+        )
+    op.create_index('ix_style_materials_material_style_id', 'style_materials', ['material', 'style_id'],
+                    unique=False, if_not_exists=True)
+    op.execute(BACKFILL[bind.dialect.name])
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_style_materials_material_style_id', table_name='style_materials', if_exists=True)
+    op.drop_table('style_materials')
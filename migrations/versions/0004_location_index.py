@@ -0,0 +1,36 @@
+"""location index
+
+Index for the production-location analytics (GROUP BY production_location)
+and the per-location drill-down, which pages through the styles listing
+filtered by location newest first. Built CONCURRENTLY on PostgreSQL, like
+0002.
+
+Revision ID: 0004
+Revises: 0003
+Create Date: 2026-10-18 09:30:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0004'
+down_revision: Union[str, Sequence[str], None] = '0003'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    with op.get_context().autocommit_block():
+        op.create_index('ix_styles_location_created_at_id', 'styles', ['production_location', 'created_at', 'id'],
+                        unique=False, if_not_exists=True, postgresql_concurrently=True)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    with op.get_context().autocommit_block():
+        op.drop_index('ix_styles_location_created_at_id', table_name='styles', if_exists=True,
+                      postgresql_concurrently=True)
@@ -0,0 +1,94 @@
+"""emissions
+
+Append-only emissions ledger with monthly and yearly rollups (emissions.py).
+Every existing style is booked with its current footprint on the day it was
+created, then the rollups are summed from those entries. Databases adopted
+from create_all may already have the empty tables; styles that already have
+an entry are not booked twice.
+
+Revision ID: 0005
+Revises: 0004
+Create Date: 2026-10-18 09:40:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0005'
+down_revision: Union[str, Sequence[str], None] = '0004'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+BACKFILL = """
+    INSERT INTO emission_entries (day, style_id, production_location, supplier, kg_co2, reason, recorded_at)
+    SELECT date(coalesce(styles.created_at, CURRENT_TIMESTAMP)), styles.id, styles.production_location,
+           styles.supplier, styles.carbon_footprint, 'backfill', CURRENT_TIMESTAMP
+    FROM styles
+    WHERE styles.carbon_footprint IS NOT NULL AND styles.carbon_footprint != 0
+      AND NOT EXISTS (SELECT 1 FROM emission_entries WHERE emission_entries.style_id = styles.id)
+"""
+MONTH = {
+    'sqlite': "substr(day, 1, 7)",
+    'postgresql': "to_char(day, 'YYYY-MM')",
+}
+ROLLUPS = """
+    DELETE FROM emission_monthly;
+    DELETE FROM emission_yearly;
+    INSERT INTO emission_monthly (month, kg_co2, entry_count)
+    SELECT {month}, sum(kg_co2), count(*) FROM emission_entries GROUP BY {month};
+    INSERT INTO emission_yearly (year, kg_co2, entry_count)
+    SELECT CAST(substr(month, 1, 4) AS INTEGER), sum(kg_co2), sum(entry_count)
+    FROM emission_monthly GROUP BY substr(month, 1, 4);
+"""
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    bind = op.get_bind()
+    tables = sa.inspect(bind).get_table_names()
+    if 'emission_entries' not in tables:
+        op.create_table('emission_entries',
+        sa.Column('id', sa.Integer(), autoincrement=True, nullable=False),
+        sa.Column('day', sa.Date(), nullable=False),
+        sa.Column('style_id', sa.String(), nullable=False),
+        sa.Column('production_location', sa.String(), nullable=True),
+        sa.Column('supplier', sa.String(), nullable=True),
+        sa.Column('kg_co2', sa.Float(), nullable=False),
+        sa.Column('reason', sa.String(), nullable=False),
+        sa.Column('recorded_at', sa.DateTime(), nullable=True),
+        sa.PrimaryKeyConstraint('id')
+        )
+    op.create_index('ix_emission_entries_day', 'emission_entries', ['day'], unique=False, if_not_exists=True)
+    op.create_index('ix_emission_entries_style_id_day', 'emission_entries', ['style_id', 'day'],
+                    unique=False, if_not_exists=True)
+    if 'emission_monthly' not in tables:
+        op.create_table('emission_monthly',
+        sa.Column('month', sa.String(), nullable=False),
+        sa.Column('kg_co2', sa.Float(), nullable=False),
+        sa.Column('entry_count', sa.Integer(), nullable=False),
+        sa.PrimaryKeyConstraint('month')
+        )
+    if 'emission_yearly' not in tables:
+        op.create_table('emission_yearly',
+        sa.Column('year', sa.Integer(), nullable=False),
+        sa.Column('kg_co2', sa.Float(), nullable=False),
+        sa.Column('entry_count', sa.Integer(), nullable=False),
+        sa.PrimaryKeyConstraint('year')
+        )
+    op.execute(BACKFILL)
+    for statement in ROLLUPS.format(month=MONTH[bind.dialect.name]).split(';'):
+        if statement.strip():
+            op.execute(statement)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_table('emission_yearly')
+    op.drop_table('emission_monthly')
+    op.drop_index('ix_emission_entries_style_id_day', table_name='emission_entries', if_exists=True)
+    op.drop_index('ix_emission_entries_day', table_name='emission_entries', if_exists=True)
+    op.drop_table('emission_entries')
@@ -0,0 +1,118 @@
+"""search
+
+Full-text search documents (search.py). SQLite indexes them with an
+external-content FTS5 table, plus one over the titles alone, kept in sync
+by triggers (the kind is indexed too, so the kind filter is part of the
+match); PostgreSQL with a
+generated tsvector column and a GIN index, built CONCURRENTLY like 0002.
+The documents themselves are created by the app on first start
+(search.rebuild), since the indexed text is folded in Python.
+
+Revision ID: 0006
+Revises: 0005
+Create Date: 2026-10-18 09:50:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0006'
+down_revision: Union[str, Sequence[str], None] = '0005'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+SQLITE_INDEX = [
+    """
+    CREATE VIRTUAL TABLE IF NOT EXISTS search_fts USING fts5(
+        kind, search_title, search_body, content='search_documents', content_rowid='id', prefix='2 3 4 5 6'
+    )
+    """,
+    # Titles alone: the first relevance tier doesn't scan the postings of words that only occur elsewhere
+    """
+    CREATE VIRTUAL TABLE IF NOT EXISTS search_title_fts USING fts5(
+        kind, search_title, content='search_documents', content_rowid='id', prefix='2 3 4 5 6'
+    )
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS search_documents_ai AFTER INSERT ON search_documents BEGIN
+        INSERT INTO search_fts(rowid, kind, search_title, search_body)
+        VALUES (new.id, new.kind, new.search_title, new.search_body);
+        INSERT INTO search_title_fts(rowid, kind, search_title) VALUES (new.id, new.kind, new.search_title);
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS search_documents_ad AFTER DELETE ON search_documents BEGIN
+        INSERT INTO search_fts(search_fts, rowid, kind, search_title, search_body)
+        VALUES ('delete', old.id, old.kind, old.search_title, old.search_body);
+        INSERT INTO search_title_fts(search_title_fts, rowid, kind, search_title)
+        VALUES ('delete', old.id, old.kind, old.search_title);
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS search_documents_au AFTER UPDATE ON search_documents BEGIN
+        INSERT INTO search_fts(search_fts, rowid, kind, search_title, search_body)
+        VALUES ('delete', old.id, old.kind, old.search_title, old.search_body);
+        INSERT INTO search_title_fts(search_title_fts, rowid, kind, search_title)
+        VALUES ('delete', old.id, old.kind, old.search_title);
+        INSERT INTO search_fts(rowid, kind, search_title, search_body)
+        VALUES (new.id, new.kind, new.search_title, new.search_body);
+        INSERT INTO search_title_fts(rowid, kind, search_title) VALUES (new.id, new.kind, new.search_title);
+    END
+    """,
+    # Documents written before the index existed (create_all databases)
+    "INSERT INTO search_fts(search_fts) VALUES ('rebuild')",
+    "INSERT INTO search_title_fts(search_title_fts) VALUES ('rebuild')",
+]
+POSTGRESQL_DOCUMENT = """
+    ALTER TABLE search_documents ADD COLUMN IF NOT EXISTS document tsvector
+    GENERATED ALWAYS AS (
+        setweight(to_tsvector('simple', search_title), 'A') || setweight(to_tsvector('simple', search_body), 'B')
+    ) STORED
+"""
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    bind = op.get_bind()
+    if 'search_documents' not in sa.inspect(bind).get_table_names():
+        op.create_table('search_documents',
+        sa.Column('id', sa.Integer(), autoincrement=True, nullable=False),
+        sa.Column('kind', sa.String(), nullable=False),
+        sa.Column('ref_id', sa.String(), nullable=False),
+        sa.Column('title', sa.String(), nullable=False),
+        sa.Column('detail', sa.String(), nullable=True),
+        sa.Column('url', sa.String(), nullable=True),
+        sa.Column('search_title', sa.Text(), nullable=False),
+        sa.Column('search_body', sa.Text(), nullable=False),
+        sa.PrimaryKeyConstraint('id')
+        )
+    op.create_index('ix_search_documents_kind_ref_id', 'search_documents', ['kind', 'ref_id'],
+                    unique=True, if_not_exists=True)
+    if bind.dialect.name == 'postgresql':
+        op.execute(POSTGRESQL_DOCUMENT)
+        with op.get_context().autocommit_block():
+            op.create_index('ix_search_documents_document', 'search_documents', ['document'], unique=False,
+                            if_not_exists=True, postgresql_using='gin', postgresql_concurrently=True)
+    else:
+        for statement in SQLITE_INDEX:
+            op.execute(statement)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    bind = op.get_bind()
+    if bind.dialect.name == 'postgresql':
+        with op.get_context().autocommit_block():
+            op.drop_index('ix_search_documents_document', table_name='search_documents', if_exists=True,
+                          postgresql_concurrently=True)
+    else:
+        for trigger in ('search_documents_ai', 'search_documents_ad', 'search_documents_au'):
+            op.execute(f"DROP TRIGGER IF EXISTS {trigger}")
+        op.execute("DROP TABLE IF EXISTS search_title_fts")
+        op.execute("DROP TABLE IF EXISTS search_fts")
+    op.drop_index('ix_search_documents_kind_ref_id', table_name='search_documents', if_exists=True)
+    op.drop_table('search_documents')
@@ -0,0 +1,63 @@
+"""anchoring
+
+Merkle-batched blockchain anchoring of passports (anchoring.py): the sealed
+batches with their on-chain transaction and each passport's content hash
+and inclusion proof. Existing passports are hashed and queued by the app on
+first start (anchoring.backfill), since the content hash is computed over
+canonical JSON in Python.
+
+Revision ID: 0007
+Revises: 0006
+Create Date: 2026-10-18 10:10:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0007'
+down_revision: Union[str, Sequence[str], None] = '0006'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    tables = sa.inspect(op.get_bind()).get_table_names()
+    if 'anchor_batches' not in tables:
+        op.create_table('anchor_batches',
+        sa.Column('id', sa.Integer(), autoincrement=True, nullable=False),
+        sa.Column('merkle_root', sa.String(), nullable=False),
+        sa.Column('leaf_count', sa.Integer(), nullable=False),
+        sa.Column('status', sa.String(), nullable=False),
+        sa.Column('chain_id', sa.Integer(), nullable=True),
+        sa.Column('tx_hash', sa.String(), nullable=True),
+        sa.Column('block_number', sa.Integer(), nullable=True),
+        sa.Column('created_at', sa.DateTime(), nullable=True),
+        sa.Column('anchored_at', sa.DateTime(), nullable=True),
+        sa.PrimaryKeyConstraint('id')
+        )
+    op.create_index('ix_anchor_batches_status', 'anchor_batches', ['status'], unique=False, if_not_exists=True)
+    if 'passport_anchors' not in tables:
+        op.create_table('passport_anchors',
+        sa.Column('passport_id', sa.String(), nullable=False),
+        sa.Column('content_hash', sa.String(), nullable=False),
+        sa.Column('batch_id', sa.Integer(), nullable=True),
+        sa.Column('leaf_index', sa.Integer(), nullable=True),
+        sa.Column('proof', sa.JSON(), nullable=True),
+        sa.Column('created_at', sa.DateTime(), nullable=True),
+        sa.PrimaryKeyConstraint('passport_id')
+        )
+    op.create_index('ix_passport_anchors_batch_id', 'passport_anchors', ['batch_id', 'leaf_index'],
+                    unique=False, if_not_exists=True)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_passport_anchors_batch_id', table_name='passport_anchors', if_exists=True)
+    op.drop_table('passport_anchors')
+    op.drop_index('ix_anchor_batches_status', table_name='anchor_batches', if_exists=True)
+    op.drop_table('anchor_batches')
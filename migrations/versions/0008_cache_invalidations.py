@@ -0,0 +1,42 @@
+"""cache invalidations
+
+Shared invalidation log for the in-process page caches (page_cache.py):
+every commit that changes a passport, style or collection appends the tags
+it touched, and each app process drops its own cached entries for them.
+
+Revision ID: 0008
+Revises: 0007
+Create Date: 2026-10-18 11:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0008'
+down_revision: Union[str, Sequence[str], None] = '0007'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    if 'cache_invalidations' not in sa.inspect(op.get_bind()).get_table_names():
+        op.create_table('cache_invalidations',
+        sa.Column('id', sa.Integer(), autoincrement=True, nullable=False),
+        sa.Column('tag', sa.String(), nullable=False),
+        sa.Column('ref_id', sa.String(), nullable=False),
+        sa.Column('created_at', sa.DateTime(), nullable=True),
+        sa.PrimaryKeyConstraint('id')
+        )
+    op.create_index('ix_cache_invalidations_created_at', 'cache_invalidations', ['created_at'],
+                    unique=False, if_not_exists=True)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_cache_invalidations_created_at', table_name='cache_invalidations', if_exists=True)
+    op.drop_table('cache_invalidations')
@@ -0,0 +1,35 @@
+"""emission bulk entries
+
+emission_entries.style_id becomes nullable: bulk imports book one entry per
+production location and supplier per chunk instead of one per style
+(emissions.record_bulk_style_changes).
+
+Revision ID: 0009
+Revises: 0008
+Create Date: 2026-10-18 11:20:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0009'
+down_revision: Union[str, Sequence[str], None] = '0008'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    with op.batch_alter_table('emission_entries') as batch_op:
+        batch_op.alter_column('style_id', existing_type=sa.String(), nullable=True)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.execute("DELETE FROM emission_entries WHERE style_id IS NULL")
+    with op.batch_alter_table('emission_entries') as batch_op:
+        batch_op.alter_column('style_id', existing_type=sa.String(), nullable=False)
@@ -0,0 +1,46 @@
+"""passport anchor history
+
+Previous proofs of passports whose anchored content changed afterwards (text
+repair): the passport is re-queued with its new content hash and the old
+leaf, proof and batch stay verifiable here.
+
+Revision ID: 0010
+Revises: 0009
+Create Date: 2026-10-18 12:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0010'
+down_revision: Union[str, Sequence[str], None] = '0009'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    if 'passport_anchor_history' not in sa.inspect(op.get_bind()).get_table_names():
+        op.create_table('passport_anchor_history',
+        sa.Column('id', sa.Integer(), autoincrement=True, nullable=False),
+        sa.Column('passport_id', sa.String(), nullable=False),
+        sa.Column('content_hash', sa.String(), nullable=False),
+        sa.Column('batch_id', sa.Integer(), nullable=False),
+        sa.Column('leaf_index', sa.Integer(), nullable=True),
+        sa.Column('proof', sa.JSON(), nullable=True),
+        sa.Column('created_at', sa.DateTime(), nullable=True),
+        sa.Column('superseded_at', sa.DateTime(), nullable=True),
+        sa.PrimaryKeyConstraint('id')
+        )
+    op.create_index('ix_passport_anchor_history_passport_id', 'passport_anchor_history', ['passport_id', 'id'],
+                    unique=False, if_not_exists=True)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_passport_anchor_history_passport_id', table_name='passport_anchor_history', if_exists=True)
+    op.drop_table('passport_anchor_history')
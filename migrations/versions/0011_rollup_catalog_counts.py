@@ -0,0 +1,42 @@
+"""rollup catalog counts
+
+rollup_totals also keeps the collection and passport counts, so the
+dashboard and /api/stats read one row instead of counting three tables
+(stats.get_totals). Existing totals are filled from the tables.
+
+Revision ID: 0011
+Revises: 0010
+Create Date: 2026-10-18 13:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0011'
+down_revision: Union[str, Sequence[str], None] = '0010'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    columns = {column['name'] for column in sa.inspect(op.get_bind()).get_columns('rollup_totals')}
+    for name in ('collection_count', 'passport_count'):
+        if name not in columns:
+            op.add_column('rollup_totals', sa.Column(name, sa.Integer(), nullable=False, server_default='0'))
+    op.execute("""
+        UPDATE rollup_totals SET
+            collection_count = (SELECT COUNT(*) FROM collections),
+            passport_count = (SELECT COUNT(*) FROM nft_passports)
+    """)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    with op.batch_alter_table('rollup_totals') as batch_op:
+        batch_op.drop_column('passport_count')
+        batch_op.drop_column('collection_count')
@@ -0,0 +1,58 @@
+"""listing created_at not null
+
+The style and collection listings page on (created_at, id) (listings.py).
+Rows from before created_at was filled have NULL there: they drop out of
+every `(created_at, id) < cursor` page and their cursor can't be encoded.
+They are backfilled with the table's oldest created_at, so they stay at the
+end of the newest-first order, and the column becomes NOT NULL.
+
+On SQLite the tables are rebuilt (batch mode). The expression index on
+styles isn't reflected by the rebuild, so it is created again.
+
+Revision ID: 0012
+Revises: 0011
+Create Date: 2026-10-18 14:00:00.000000
+
+"""
+import warnings
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0012'
+down_revision: Union[str, Sequence[str], None] = '0011'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+TABLES = ('collections', 'styles')
+
+
+def _set_nullable(nullable: bool) -> None:
+    with warnings.catch_warnings():
+        # Expected for ix_styles_carbon_id, created again below
+        warnings.filterwarnings('ignore', 'Skipped unsupported reflection of expression-based index')
+        for table in TABLES:
+            with op.batch_alter_table(table) as batch_op:
+                batch_op.alter_column('created_at', existing_type=sa.DateTime(), nullable=nullable)
+    if op.get_bind().dialect.name == 'sqlite':
+        op.create_index('ix_styles_carbon_id', 'styles', [sa.text('coalesce(carbon_footprint, 0)'), 'id'], if_not_exists=True)
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    for table in TABLES:
+        op.execute(f"""
+            UPDATE {table} SET created_at = COALESCE(
+                (SELECT MIN(created_at) FROM {table} WHERE created_at IS NOT NULL), CURRENT_TIMESTAMP
+            )
+            WHERE created_at IS NULL
+        """)
+    _set_nullable(False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    _set_nullable(True)
@@ -1,6 +1,6 @@
-from sqlalchemy import Column, Integer, String, Float, DateTime, Text, ForeignKey, JSON
+from sqlalchemy import Column, Integer, String, Float, Date, DateTime, Text, ForeignKey, JSON, Index, LargeBinary, text
 from sqlalchemy.ext.declarative import declarative_base
-from sqlalchemy.orm import relationship
+from sqlalchemy.orm import relationship, deferred
 from datetime import datetime
 
 Base = declarative_base()
@@ -13,10 +13,13 @@ class Collection(Base):
     season = Column(String, nullable=False)
     year = Column(Integer, nullable=False)
     description = Column(Text)
-    created_at = Column(DateTime, default=datetime.utcnow)
+    created_at = Column(DateTime, nullable=False, default=datetime.utcnow)
     
     # Relationship
     styles = relationship("Style", back_populates="collection")
+    
+    # Keyset pagination order (listings.py)
+    __table_args__ = (Index("ix_collections_created_at_id", "created_at", "id"),)
 
 class Style(Base):
     __tablename__ = "styles"
@@ -33,10 +36,33 @@ class Style(Base):
     status = Column(String, default="tasarım")
     image_url = Column(String)
     nft_id = Column(String)
-    created_at = Column(DateTime, default=datetime.utcnow)
+    created_at = Column(DateTime, nullable=False, default=datetime.utcnow)
     
     # Relationship
     collection = relationship("Collection", back_populates="styles")
+    
+    __table_args__ = (
+        # Keyset pagination order (listings.py)
+        Index("ix_styles_created_at_id", "created_at", "id"),
+        # Styles of one collection, newest first (view_collection, filtered listings, per-collection counts)
+        Index("ix_styles_collection_id_created_at_id", "collection_id", "created_at", "id"),
+        # Lowest-carbon ranking (rollups.refresh_low_carbon_styles orders by the same expression)
+        Index("ix_styles_carbon_id", text("coalesce(carbon_footprint, 0)"), "id"),
+        # Per-location analytics and the location drill-down (styles listing filtered by location)
+        Index("ix_styles_location_created_at_id", "production_location", "created_at", "id"),
+    )
+
+# Stil-malzeme ilişkisi (style_materials.py); Style.materials dizisinin normalize edilmiş kopyası
+class StyleMaterial(Base):
+    __tablename__ = "style_materials"
+
+    style_id = Column(String, ForeignKey("styles.id"), primary_key=True)
+    position = Column(Integer, primary_key=True)  # Index in Style.materials
+    material = Column(String, nullable=False)
+    percentage = Column(Float)  # Composition share when the input gave one ("%60 pamuk")
+
+    # Material analytics group by material and join styles by id
+    __table_args__ = (Index("ix_style_materials_material_style_id", "material", "style_id"),)
 
 class NFTPassport(Base):
     __tablename__ = "nft_passports"
@@ -52,10 +78,14 @@ class NFTPassport(Base):
     certificates = Column(JSON)
     supplier = Column(String)
     blockchain_hash = Column(String)
-    qr_code_data = Column(Text)
+    qr_code_data = deferred(Column(Text))  # Legacy base64 data URI, moved to qr_images by qr_store.py
+    qr_code_hash = Column(String)  # sha256 of the PNG in qr_images
     qr_url = Column(String)
     additional_info = Column(Text)
     created_at = Column(DateTime, default=datetime.utcnow)
+    
+    # Passports of a style (joins from styles, batch generation)
+    __table_args__ = (Index("ix_nft_passports_style_id", "style_id"),)
 
 class Supplier(Base):
     __tablename__ = "suppliers"
@@ -66,4 +96,177 @@ class Supplier(Base):
     contact_info = Column(JSON)
     sustainability_score = Column(Float)
     certificates = Column(JSON)
-    created_at = Column(DateTime, default=datetime.utcnow)
\ No newline at end of file
+    created_at = Column(DateTime, default=datetime.utcnow)
+
+# Sürdürülebilirlik özet tabloları (rollups.py tarafından güncellenir)
+class RollupTotals(Base):
+    __tablename__ = "rollup_totals"
+    
+    id = Column(Integer, primary_key=True)  # Always a single row with id=1
+    style_count = Column(Integer, nullable=False, default=0)
+    total_carbon = Column(Float, nullable=False, default=0.0)
+    collection_count = Column(Integer, nullable=False, default=0, server_default="0")
+    passport_count = Column(Integer, nullable=False, default=0, server_default="0")
+    updated_at = Column(DateTime, default=datetime.utcnow)
+
+class RollupCarbonBucket(Base):
+    __tablename__ = "rollup_carbon_buckets"
+    
+    bucket = Column(String, primary_key=True)  # low (<3), medium (3-5), high (>5)
+    style_count = Column(Integer, nullable=False, default=0)
+
+class RollupMaterial(Base):
+    __tablename__ = "rollup_materials"
+    
+    material = Column(String, primary_key=True)
+    style_count = Column(Integer, nullable=False, default=0)
+    total_carbon = Column(Float, nullable=False, default=0.0)
+
+class RollupLowCarbonStyle(Base):
+    __tablename__ = "rollup_low_carbon_styles"
+    
+    style_id = Column(String, primary_key=True)
+    rank = Column(Integer, nullable=False)
+    name = Column(String, nullable=False)
+    materials = Column(JSON)
+    production_location = Column(String)
+    carbon_footprint = Column(Float)
+
+# Emisyon zaman serisi (emissions.py); yalnızca eklenir, aylık/yıllık özetler aynı işlemde güncellenir
+class EmissionEntry(Base):
+    __tablename__ = "emission_entries"
+
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    day = Column(Date, nullable=False)
+    style_id = Column(String)  # No FK: the history outlives the style; NULL for bulk import entries
+    production_location = Column(String)
+    supplier = Column(String)
+    kg_co2 = Column(Float, nullable=False)  # Change of the catalog footprint, negative when it went down
+    reason = Column(String, nullable=False)  # create, import, repair, recompute, backfill
+    recorded_at = Column(DateTime, default=datetime.utcnow)
+
+    __table_args__ = (
+        # Rollup rebuilds group by day; the history of one style
+        Index("ix_emission_entries_day", "day"),
+        Index("ix_emission_entries_style_id_day", "style_id", "day"),
+    )
+
+class EmissionMonthly(Base):
+    __tablename__ = "emission_monthly"
+
+    month = Column(String, primary_key=True)  # YYYY-MM
+    kg_co2 = Column(Float, nullable=False, default=0.0)
+    entry_count = Column(Integer, nullable=False, default=0)
+
+class EmissionYearly(Base):
+    __tablename__ = "emission_yearly"
+
+    year = Column(Integer, primary_key=True)
+    kg_co2 = Column(Float, nullable=False, default=0.0)
+    entry_count = Column(Integer, nullable=False, default=0)
+
+# Arama dizini (search.py); SQLite'ta FTS5 (search_fts), PostgreSQL'de tsvector + GIN ile indekslenir
+class SearchDocument(Base):
+    __tablename__ = "search_documents"
+
+    id = Column(Integer, primary_key=True, autoincrement=True)  # search_fts rowid on SQLite
+    kind = Column(String, nullable=False)  # style, collection, passport
+    ref_id = Column(String, nullable=False)
+    title = Column(String, nullable=False)
+    detail = Column(String)
+    url = Column(String)
+    search_title = Column(Text, nullable=False)  # turkish_text.fold_for_search of the indexed fields
+    search_body = Column(Text, nullable=False)
+    # PostgreSQL also has a generated `document` tsvector column with a GIN index (migration 0006)
+
+    __table_args__ = (Index("ix_search_documents_kind_ref_id", "kind", "ref_id", unique=True),)
+
+# Önbellek geçersiz kılma günlüğü (page_cache.py); her worker kendi önbelleğini buradan günceller
+class CacheInvalidation(Base):
+    __tablename__ = "cache_invalidations"
+    
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    tag = Column(String, nullable=False)  # passport, style, collection; "*" = everything
+    ref_id = Column(String, nullable=False)
+    created_at = Column(DateTime, default=datetime.utcnow)
+    
+    # Pruning of entries older than every cache's TTL
+    __table_args__ = (Index("ix_cache_invalidations_created_at", "created_at"),)
+
+# Arka plan işleri (jobs.py) - AI görsel oluşturma vb.
+class Job(Base):
+    __tablename__ = "jobs"
+    
+    id = Column(String, primary_key=True)
+    kind = Column(String, nullable=False)
+    status = Column(String, nullable=False, default="queued")  # queued, running, succeeded, failed
+    payload = Column(JSON)
+    result = Column(JSON)
+    error = Column(Text)
+    attempts = Column(Integer, nullable=False, default=0)
+    max_attempts = Column(Integer, nullable=False, default=3)
+    progress_done = Column(Integer, nullable=False, default=0)
+    progress_total = Column(Integer, nullable=False, default=0)
+    available_at = Column(DateTime, default=datetime.utcnow)  # not claimed before this (retry backoff)
+    locked_by = Column(String)
+    lease_expires_at = Column(DateTime)
+    created_at = Column(DateTime, default=datetime.utcnow)
+    started_at = Column(DateTime)
+    finished_at = Column(DateTime)
+    
+    # Workers claim the oldest available queued job
+    __table_args__ = (Index("ix_jobs_status_available_at", "status", "available_at"),)
+
+# İçerik adresli QR kod görselleri (qr_store.py)
+class QRImage(Base):
+    __tablename__ = "qr_images"
+    
+    content_hash = Column(String, primary_key=True)  # sha256 hex of png
+    png = Column(LargeBinary, nullable=False)
+    created_at = Column(DateTime, default=datetime.utcnow)
+
+# Blokzincire Merkle kökü yazılan pasaport partileri (anchoring.py)
+class AnchorBatch(Base):
+    __tablename__ = "anchor_batches"
+    
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    merkle_root = Column(String, nullable=False)  # hex
+    leaf_count = Column(Integer, nullable=False)
+    status = Column(String, nullable=False, default="sealed")  # sealed, anchored
+    chain_id = Column(Integer)
+    tx_hash = Column(String)
+    block_number = Column(Integer)
+    created_at = Column(DateTime, default=datetime.utcnow)
+    anchored_at = Column(DateTime)
+    
+    # The anchor job picks up sealed batches whose transaction didn't go through
+    __table_args__ = (Index("ix_anchor_batches_status", "status"),)
+
+# Pasaport içerik özeti ve Merkle kapsama kanıtı
+class PassportAnchor(Base):
+    __tablename__ = "passport_anchors"
+    
+    passport_id = Column(String, primary_key=True)
+    content_hash = Column(String, nullable=False)  # sha256 hex of anchoring.canonical_content
+    batch_id = Column(Integer)  # NULL until sealed into a batch
+    leaf_index = Column(Integer)
+    proof = Column(JSON)  # [["L" | "R", sibling hex], ...] from the leaf up
+    created_at = Column(DateTime, default=datetime.utcnow)
+    
+    # Pending passports (batch_id IS NULL) and the leaves of a batch
+    __table_args__ = (Index("ix_passport_anchors_batch_id", "batch_id", "leaf_index"),)
+
+# İçeriği sonradan değişen pasaportların önceki (sabitlenmiş) kanıtları
+class PassportAnchorHistory(Base):
+    __tablename__ = "passport_anchor_history"
+    
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    passport_id = Column(String, nullable=False)
+    content_hash = Column(String, nullable=False)
+    batch_id = Column(Integer, nullable=False)
+    leaf_index = Column(Integer)
+    proof = Column(JSON)
+    created_at = Column(DateTime)  # when the old content was queued
+    superseded_at = Column(DateTime, default=datetime.utcnow)
+    
+    __table_args__ = (Index("ix_passport_anchor_history_passport_id", "passport_id", "id"),)
@@ -0,0 +1,305 @@
+"""In-process caches with tag-based write-through invalidation
+
+Entries hold a value (a rendered page, a read model) plus the tags of the
+rows it was built from, e.g. ("style", style_id). `install()` hooks
+SQLAlchemy session events so that committing a change to an NFTPassport,
+Style or Collection drops every cached entry tagged with that row. Bulk
+UPDATE/DELETE statements are tagged with the rows they name (by primary key
+or `id ==` / `id IN` criteria); only statements without such criteria, like
+delete-all, clear the caches.
+
+The caches live in each app process, so the tags of every commit are also
+appended to the cache_invalidations table in the same transaction. Readers
+call `sync` before using a cache when `sync_due()`: it reads the log entries
+added since the last read (one primary key range read) and drops the
+matching entries. The log is read at most once every
+PAGE_CACHE_SYNC_INTERVAL seconds per process, so cache hits and 304s in
+between don't touch the database at all. The trade-off is staleness: a
+worker may serve a page (or a 304) for up to PAGE_CACHE_SYNC_INTERVAL
+seconds (default 1) after another worker committed a change to it. Changes
+committed by the same process drop its entries immediately; 0 reads the log
+on every request. Log entries older than every cache's TTL are pruned by the
+writers.
+"""
+import hashlib
+import os
+import threading
+import time
+from collections import OrderedDict, namedtuple
+from typing import Hashable, Iterable, Optional
+
+from datetime import datetime, timedelta
+
+from sqlalchemy import delete, event, insert, or_, select, func
+from sqlalchemy.orm import Session
+from sqlalchemy.sql import operators
+from sqlalchemy.sql.elements import BinaryExpression, BindParameter
+
+from models import CacheInvalidation, Collection, NFTPassport, Style
+
+PAGE_CACHE_SIZE = int(os.getenv("PAGE_CACHE_SIZE", "5000"))
+PAGE_CACHE_TTL = float(os.getenv("PAGE_CACHE_TTL", "60"))
+# How stale a page may be after another worker changed its rows (seconds)
+PAGE_CACHE_SYNC_INTERVAL = float(os.getenv("PAGE_CACHE_SYNC_INTERVAL", "1"))
+
+CachedPage = namedtuple("CachedPage", ["body", "etag"])
+_Entry = namedtuple("_Entry", ["value", "tags", "expires_at"])
+
+# Model -> tag name for invalidation
+TAGGED_MODELS = {NFTPassport: "passport", Style: "style", Collection: "collection"}
+
+
+def make_etag(body: bytes) -> str:
+    """Strong ETag: hash of the exact response bytes"""
+    return '"' + hashlib.sha256(body).hexdigest()[:32] + '"'
+
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    if not if_none_match:
+        return False
+    return if_none_match.strip() == "*" or etag in [value.strip() for value in if_none_match.split(",")]
+
+
+class TaggedLRU:
+    """LRU bounded by size and TTL, with hit/miss/eviction counters"""
+
+    def __init__(self, name: str, max_entries: int = PAGE_CACHE_SIZE, ttl: float = PAGE_CACHE_TTL):
+        self.name = name
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.hits = self.misses = self.evictions = self.invalidations = 0
+        self._entries = OrderedDict()
+        self._by_tag = {}
+        self._lock = threading.Lock()
+
+    def get(self, key: Hashable):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry.expires_at <= time.monotonic():
+                self._remove(key)
+                self.evictions += 1
+                entry = None
+            if entry is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry.value
+
+    def set(self, key: Hashable, value, tags: Iterable[tuple]):
+        entry = _Entry(value, frozenset(tags), time.monotonic() + self.ttl)
+        with self._lock:
+            self._remove(key)
+            self._entries[key] = entry
+            for tag in entry.tags:
+                self._by_tag.setdefault(tag, set()).add(key)
+            while len(self._entries) > self.max_entries:
+                self._remove(next(iter(self._entries)))
+                self.evictions += 1
+        return value
+
+    def invalidate(self, tags: Iterable[tuple]):
+        with self._lock:
+            for tag in tags:
+                for key in self._by_tag.pop(tag, ()):
+                    self._remove(key)
+                    self.invalidations += 1
+
+    def clear(self):
+        with self._lock:
+            self.invalidations += len(self._entries)
+            self._entries.clear()
+            self._by_tag.clear()
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses
+        return {
+            "name": self.name,
+            "size": len(self._entries),
+            "max_entries": self.max_entries,
+            "ttl_seconds": self.ttl,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_ratio": round(self.hits / lookups, 4) if lookups else 0.0,
+            "evictions": self.evictions,
+            "invalidations": self.invalidations,
+        }
+
+    def __len__(self):
+        return len(self._entries)
+
+    def _remove(self, key):
+        entry = self._entries.pop(key, None)
+        if entry is None:
+            return
+        for tag in entry.tags:
+            keys = self._by_tag.get(tag)
+            if keys is not None:
+                keys.discard(key)
+                if not keys:
+                    del self._by_tag[tag]
+
+
+def page(body: bytes) -> CachedPage:
+    return CachedPage(body, make_etag(body))
+
+
+# Rendered /passport/{nft_id} pages, keyed by (nft_id, language)
+passport_pages = TaggedLRU("passport_pages")
+# Language independent passport read models (passports.resolve), keyed by nft_id
+passport_views = TaggedLRU(
+    "passport_views",
+    max_entries=int(os.getenv("PASSPORT_CACHE_SIZE", "20000")),
+    ttl=float(os.getenv("PASSPORT_CACHE_TTL", str(PAGE_CACHE_TTL))),
+)
+
+# Per-location style counts and carbon (stats.location_stats), keyed by "all". Style writes don't
+# invalidate it; the production page accepts figures up to LOCATION_STATS_TTL seconds old
+location_stats = TaggedLRU("location_stats", max_entries=1, ttl=float(os.getenv("LOCATION_STATS_TTL", "30")))
+
+CACHES = [passport_pages, passport_views, location_stats]
+_CLEAR_ALL = ("*", "")
+
+# Log entries a reader may still need: anything older has expired from every cache anyway
+LOG_RETENTION = 2 * max(cache.ttl for cache in CACHES) + 60
+PRUNE_INTERVAL = 60
+# A log id below the highest one read may still show up (a transaction that committed later on PostgreSQL)
+GAP_TIMEOUT = 60
+
+_sync_lock = threading.Lock()
+_last_seen = None
+_next_sync = 0.0  # time.monotonic() before which the log isn't read again
+_gaps = {}  # log id -> time.monotonic() when it was first missing
+_last_prune = 0.0
+
+
+def invalidate_local(tags: set):
+    for cache in CACHES:
+        if _CLEAR_ALL in tags:
+            cache.clear()
+        else:
+            cache.invalidate(tags)
+
+
+def sync_due() -> bool:
+    """Whether PAGE_CACHE_SYNC_INTERVAL has passed since the log was last read (no database access)"""
+    return time.monotonic() >= _next_sync
+
+
+def sync(db: Session):
+    """Apply the invalidations other processes committed since the last read, unless it was recent"""
+    global _last_seen, _next_sync
+    with _sync_lock:
+        now = time.monotonic()
+        if now < _next_sync:
+            return
+        _next_sync = now + PAGE_CACHE_SYNC_INTERVAL
+        if _last_seen is None:
+            # Nothing cached yet in this process
+            _last_seen = db.execute(select(func.max(CacheInvalidation.id))).scalar() or 0
+            return
+        for log_id in [log_id for log_id, since in _gaps.items() if since + GAP_TIMEOUT < now]:
+            del _gaps[log_id]
+        newer = CacheInvalidation.id > _last_seen
+        rows = db.execute(
+            select(CacheInvalidation.id, CacheInvalidation.tag, CacheInvalidation.ref_id)
+            .where(or_(newer, CacheInvalidation.id.in_(list(_gaps))) if _gaps else newer)
+            .order_by(CacheInvalidation.id)
+        ).all()
+        if not rows:
+            return
+        seen = {row.id for row in rows}
+        for log_id in seen:
+            _gaps.pop(log_id, None)
+        highest = max(seen)
+        for log_id in range(_last_seen + 1, highest):
+            if log_id not in seen:
+                _gaps.setdefault(log_id, now)
+        _last_seen = max(_last_seen, highest)
+    invalidate_local({(row.tag, row.ref_id) for row in rows})
+
+
+def _pending(session: Session) -> set:
+    return session.info.setdefault("page_cache_tags", set())
+
+
+def install():
+    """Register the session event hooks (call once at startup)"""
+    if event.contains(Session, "after_flush", _after_flush):
+        return
+    event.listen(Session, "after_flush", _after_flush)
+    event.listen(Session, "do_orm_execute", _do_orm_execute)
+    event.listen(Session, "before_commit", _before_commit)
+    event.listen(Session, "after_commit", _after_commit)
+    event.listen(Session, "after_soft_rollback", _after_rollback)
+
+
+def _after_flush(session: Session, flush_context):
+    pending = _pending(session)
+    for instance in list(session.new) + list(session.dirty) + list(session.deleted):
+        tag = TAGGED_MODELS.get(type(instance))
+        if tag is not None:
+            pending.add((tag, str(instance.id)))
+
+
+def _where_ids(clause, id_column):
+    """Ids named by `id == :value` or `id IN (:values)`, or None for any other criteria"""
+    if not isinstance(clause, BinaryExpression) or not isinstance(clause.right, BindParameter):
+        return None
+    if not clause.left.compare(id_column):
+        return None
+    if clause.operator is operators.eq:
+        return [clause.right.value]
+    if clause.operator is operators.in_op:
+        return list(clause.right.value)
+    return None
+
+
+def _statement_tags(orm_execute_state, tag: str) -> set:
+    params = orm_execute_state.parameters
+    if isinstance(params, (list, tuple)) and params and all("id" in row for row in params):
+        return {(tag, str(row["id"])) for row in params}  # bulk UPDATE by primary key
+    ids = _where_ids(orm_execute_state.statement.whereclause, orm_execute_state.bind_mapper.primary_key[0])
+    if ids is None:
+        return {_CLEAR_ALL}
+    return {(tag, str(ref_id)) for ref_id in ids}
+
+
+def _do_orm_execute(orm_execute_state):
+    if not (orm_execute_state.is_update or orm_execute_state.is_delete):
+        return
+    mapper = orm_execute_state.bind_mapper
+    if mapper is not None and mapper.class_ in TAGGED_MODELS:
+        _pending(orm_execute_state.session).update(_statement_tags(orm_execute_state, TAGGED_MODELS[mapper.class_]))
+
+
+def _before_commit(session: Session):
+    """Append this transaction's tags to the shared log, so it commits together with the change"""
+    global _last_prune
+    if session.new or session.dirty or session.deleted:
+        session.flush()
+    tags = session.info.get("page_cache_tags")
+    if not tags:
+        return
+    connection = session.connection()
+    now = datetime.utcnow()
+    connection.execute(insert(CacheInvalidation.__table__), [
+        {"tag": tag, "ref_id": str(ref_id), "created_at": now} for tag, ref_id in tags
+    ])
+    if time.monotonic() - _last_prune > PRUNE_INTERVAL:
+        _last_prune = time.monotonic()
+        connection.execute(
+            delete(CacheInvalidation.__table__)
+            .where(CacheInvalidation.__table__.c.created_at < now - timedelta(seconds=LOG_RETENTION))
+        )
+
+
+def _after_commit(session: Session):
+    tags = session.info.pop("page_cache_tags", None)
+    if tags:
+        invalidate_local(tags)
+
+
+def _after_rollback(session: Session, previous_transaction):
+    if previous_transaction.parent is None:
+        session.info.pop("page_cache_tags", None)
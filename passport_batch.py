@@ -0,0 +1,148 @@
+"""Bulk NFT passport generation
+
+Used by the `generate_nft_batch` background job (POST /generate-nft/batch).
+Styles are processed in chunks of CHUNK_SIZE: QR codes for a chunk are
+rendered in a process pool (PIL rendering is CPU bound and holds the GIL),
+then the chunk's passports, QR images and style links are written in one bulk
+transaction, and the passports are queued for the next anchoring batch
+(anchoring.py). The job holds no DB session while the pool renders.
+
+Every gunicorn worker has its own pool, so QR_PROCESSES defaults to the CPU
+cores divided by WEB_CONCURRENCY (at least one): a batch in each worker at
+the same time then uses every core once instead of WEB_CONCURRENCY times over.
+Set QR_PROCESSES to override it, e.g. for a single-process deployment.
+"""
+import asyncio
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Iterable, List, Optional
+
+from sqlalchemy import insert, select, update
+from sqlalchemy.orm import Session
+
+import anchoring
+import db_profile
+import qr_store
+import rollups
+import search
+from models import Collection, NFTPassport, Style
+
+QR_PROCESSES = int(os.getenv("QR_PROCESSES", "0")) or max(1, (os.cpu_count() or 1) // max(1, db_profile.WEB_CONCURRENCY))
+CHUNK_SIZE = int(os.getenv("PASSPORT_BATCH_CHUNK", "500"))
+
+_executor: Optional[ProcessPoolExecutor] = None
+
+
+def executor() -> ProcessPoolExecutor:
+    """Process pool created on first use; spawned so children don't inherit DB connections"""
+    global _executor
+    if _executor is None:
+        _executor = ProcessPoolExecutor(max_workers=QR_PROCESSES, mp_context=multiprocessing.get_context("spawn"))
+    return _executor
+
+
+def shutdown():
+    global _executor
+    if _executor is not None:
+        _executor.shutdown(cancel_futures=True)
+        _executor = None
+
+
+def render_pngs(urls: List[str]) -> List[bytes]:
+    """Runs in a pool process"""
+    return [qr_store.render_png(url) for url in urls]
+
+
+async def render_qr_codes(urls: List[str]) -> List[bytes]:
+    """Render QR PNGs for all urls, split evenly across the process pool, in order"""
+    if not urls:
+        return []
+    loop = asyncio.get_running_loop()
+    parts = min(QR_PROCESSES, len(urls))
+    size = -(-len(urls) // parts)
+    try:
+        results = await asyncio.gather(*(
+            loop.run_in_executor(executor(), render_pngs, urls[i:i + size]) for i in range(0, len(urls), size)
+        ))
+    except BrokenProcessPool:
+        # A child died; start a fresh pool for the job's retry
+        shutdown()
+        raise
+    return [png for part in results for png in part]
+
+
+def target_style_ids(db: Session, collection_id: Optional[str], style_ids: Iterable[str], skip_existing: bool = True) -> List[str]:
+    """Styles the batch should cover, in creation order"""
+    stmt = select(Style.id)
+    if collection_id:
+        stmt = stmt.where(Style.collection_id == collection_id)
+    ids = list(dict.fromkeys(style_ids or []))
+    if ids:
+        stmt = stmt.where(Style.id.in_(ids))
+    if skip_existing:
+        stmt = stmt.where(Style.nft_id.is_(None))
+    return db.execute(stmt.order_by(Style.created_at, Style.id)).scalars().all()
+
+
+def load_styles(db: Session, style_ids: List[str], skip_existing: bool = True):
+    """(Style, collection name) rows for one chunk"""
+    stmt = (
+        select(Style, Collection.name)
+        .outerjoin(Collection, Collection.id == Style.collection_id)
+        .where(Style.id.in_(style_ids))
+        .order_by(Style.created_at, Style.id)
+    )
+    if skip_existing:
+        # Another batch may have covered some of them since the ids were listed
+        stmt = stmt.where(Style.nft_id.is_(None))
+    return db.execute(stmt).all()
+
+
+def product_data(style: Style, collection_name: Optional[str], certificates: List[str], additional_info: str = "") -> dict:
+    """Input for MangoDPP.create_nft_passport"""
+    return {
+        "code": f"MNG-{style.id[:8]}",
+        "name": style.name,
+        "collection": collection_name or "",
+        "materials": style.materials if style.materials else [],
+        "production_location": style.production_location or "",
+        "carbon_footprint": style.carbon_footprint or 0,
+        "certificates": certificates,
+        "supplier": style.supplier or "",
+        "additional_info": additional_info
+    }
+
+
+def passport_row(nft_data: dict, style_id: str, additional_info: str = "") -> dict:
+    """nft_passports column values for a create_nft_passport result, blockchain_hash = content hash"""
+    row = {
+        "id": nft_data["id"],
+        "style_id": style_id,
+        "product_code": nft_data["product_code"],
+        "name": nft_data["name"],
+        "collection_name": nft_data["collection"],
+        "materials": nft_data["materials"],
+        "production_location": nft_data["production_location"],
+        "carbon_footprint": nft_data["carbon_footprint"],
+        "certificates": nft_data["certificates"],
+        "supplier": nft_data["supplier"],
+        "qr_url": nft_data["qr_url"],
+        "additional_info": additional_info,
+    }
+    row["blockchain_hash"] = anchoring.content_hash(row)
+    return row
+
+
+def insert_passports(db: Session, rows: List[dict], pngs: List[bytes]):
+    """Bulk insert one chunk of passports with their QR images and link them to their styles"""
+    if not rows:
+        return
+    for row, digest in zip(rows, qr_store.store_many(db, pngs)):
+        row["qr_code_hash"] = digest
+    db.execute(insert(NFTPassport), rows)
+    db.execute(update(Style), [{"id": row["style_id"], "nft_id": row["id"]} for row in rows])
+    search.upsert(db, [search.passport_document(row) for row in rows])
+    anchoring.add_pending(db, rows)
+    rollups.apply_catalog_counts(db, passports=len(rows))
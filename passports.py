@@ -0,0 +1,78 @@
+"""Passport read model
+
+`resolve` loads a passport together with its style and collection in one
+joined query and returns a compact, immutable view with just what the
+passport page needs. `get_view` puts it behind the page_cache.passport_views
+LRU so hot (e.g. viral) passports are served from memory.
+"""
+from collections import namedtuple
+from typing import Optional
+
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+
+import page_cache
+import qr_store
+from models import Collection, NFTPassport, Style
+
+PUBLIC_PASSPORT_URL = "https://mango-dpp-platform-production.up.railway.app/passport/{nft_id}"
+
+PassportView = namedtuple("PassportView", [
+    "id", "name", "product_code", "collection", "materials", "production_location", "supplier",
+    "carbon_footprint", "certificates", "blockchain_hash", "qr_code", "qr_url", "created_at",
+    "style_id", "collection_id",
+])
+
+
+def resolve(db: Session, nft_id: str) -> Optional[PassportView]:
+    """Passport + style + collection in a single query"""
+    row = db.execute(
+        select(
+            NFTPassport.product_code, NFTPassport.certificates, NFTPassport.blockchain_hash, NFTPassport.created_at,
+            Style.id.label("style_id"), Style.name, Style.materials, Style.production_location,
+            Style.supplier, Style.carbon_footprint,
+            Collection.id.label("collection_id"), Collection.name.label("collection_name"),
+        )
+        .outerjoin(Style, Style.id == NFTPassport.style_id)
+        .outerjoin(Collection, Collection.id == Style.collection_id)
+        .where(NFTPassport.id == nft_id)
+    ).first()
+    if row is None:
+        return None
+    return PassportView(
+        id=nft_id,
+        name=row.name or "",
+        product_code=row.product_code,
+        collection=row.collection_name or "",
+        materials=tuple(row.materials or ()),
+        production_location=row.production_location or "",
+        supplier=row.supplier or "",
+        carbon_footprint=row.carbon_footprint if row.style_id else 0,
+        certificates=tuple(row.certificates or ()),
+        blockchain_hash=row.blockchain_hash,
+        qr_code=qr_store.qr_path(nft_id),
+        qr_url=PUBLIC_PASSPORT_URL.format(nft_id=nft_id),
+        created_at=row.created_at,
+        style_id=row.style_id,
+        collection_id=row.collection_id,
+    )
+
+
+def cache_tags(view: PassportView):
+    tags = [("passport", view.id)]
+    if view.style_id:
+        tags.append(("style", view.style_id))
+    if view.collection_id:
+        tags.append(("collection", view.collection_id))
+    return tags
+
+
+async def get_view(db: AsyncSession, nft_id: str) -> Optional[PassportView]:
+    """Cached read model; misses are resolved with one query"""
+    view = page_cache.passport_views.get(nft_id)
+    if view is None:
+        view = await db.run_sync(resolve, nft_id)
+        if view is not None:
+            page_cache.passport_views.set(nft_id, view, cache_tags(view))
+    return view
@@ -0,0 +1,153 @@
+"""Content-addressed QR code image store
+
+QR PNGs live in the `qr_images` table keyed by the sha256 of their bytes;
+a passport only keeps `qr_code_hash`. Pages link to `/qr/{nft_id}.png`,
+which is served with immutable cache headers, so the image is fetched once
+per browser instead of being inlined into every passport page and dragged
+along by every passport query.
+
+Passports created before this store carry a base64 data URI in
+`qr_code_data`. They keep working (the endpoint decodes them on the fly)
+until they are extracted:
+
+    python qr_store.py migrate [--vacuum]
+"""
+import base64
+import hashlib
+import io
+import sys
+from typing import List, Optional, Tuple
+
+import qrcode
+from sqlalchemy import inspect, select, text, update
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlalchemy.engine import Connection
+from sqlalchemy.orm import Session
+
+from models import NFTPassport, QRImage
+
+MIGRATE_CHUNK_SIZE = 500
+CACHE_CONTROL = "public, max-age=31536000, immutable"
+
+
+def render_png(data: str) -> bytes:
+    """QR code for `data` as PNG bytes"""
+    qr = qrcode.QRCode(version=1, box_size=10, border=5)
+    qr.add_data(data)
+    qr.make(fit=True)
+
+    img = qr.make_image(fill_color="black", back_color="white")
+    img_buffer = io.BytesIO()
+    img.save(img_buffer, format='PNG')
+    return img_buffer.getvalue()
+
+
+def content_hash(png: bytes) -> str:
+    return hashlib.sha256(png).hexdigest()
+
+
+def qr_path(nft_id: str) -> str:
+    return f"/qr/{nft_id}.png"
+
+
+def decode_data_uri(data_uri: str) -> bytes:
+    """PNG bytes from a legacy `data:image/png;base64,...` value"""
+    return base64.b64decode(data_uri.split(",", 1)[-1])
+
+
+def store_many(db: Session, pngs: List[bytes]) -> List[str]:
+    """Save each image once (identical QR codes share a row) and return their hashes, in order"""
+    digests = [content_hash(png) for png in pngs]
+    if not pngs:
+        return digests
+    if db.get_bind().dialect.name == "postgresql":
+        stmt = pg_insert(QRImage)
+    else:
+        stmt = sqlite_insert(QRImage)
+    db.execute(
+        stmt.on_conflict_do_nothing(index_elements=["content_hash"]),
+        [{"content_hash": digest, "png": png} for digest, png in dict(zip(digests, pngs)).items()],
+    )
+    return digests
+
+
+def store(db: Session, png: bytes) -> str:
+    return store_many(db, [png])[0]
+
+
+def load(db: Session, nft_id: str) -> Optional[Tuple[str, bytes]]:
+    """(hash, png) for a passport's QR code, or None if the passport has none"""
+    row = db.execute(
+        select(NFTPassport.qr_code_hash, QRImage.png, NFTPassport.qr_code_data)
+        .outerjoin(QRImage, QRImage.content_hash == NFTPassport.qr_code_hash)
+        .where(NFTPassport.id == nft_id)
+    ).first()
+    if row is None:
+        return None
+    if row.png is not None:
+        return row.qr_code_hash, row.png
+    if row.qr_code_data:
+        # Not migrated yet
+        png = decode_data_uri(row.qr_code_data)
+        return content_hash(png), png
+    return None
+
+
+def ensure_schema(connection: Connection):
+    """Add nft_passports.qr_code_hash to databases created before the QR store (see database.adopt_legacy_schema)"""
+    columns = {column["name"] for column in inspect(connection).get_columns("nft_passports")}
+    if "qr_code_hash" not in columns:
+        connection.execute(text("ALTER TABLE nft_passports ADD COLUMN qr_code_hash VARCHAR"))
+        print("nft_passports.qr_code_hash column added")
+
+
+def migrate(db: Session, chunk_size: int = MIGRATE_CHUNK_SIZE) -> int:
+    """Move legacy data URIs into qr_images in chunks; returns the number of passports moved"""
+    moved = 0
+    last_id = ""
+    while True:
+        rows = db.execute(
+            select(NFTPassport.id, NFTPassport.qr_code_data)
+            .where(NFTPassport.qr_code_data.isnot(None), NFTPassport.id > last_id)
+            .order_by(NFTPassport.id)
+            .limit(chunk_size)
+        ).all()
+        if not rows:
+            return moved
+        for nft_id, data_uri in rows:
+            try:
+                digest = store(db, decode_data_uri(data_uri))
+            except ValueError as e:
+                print(f"QR taşınamadı ({nft_id}): {e}")
+                continue
+            db.execute(
+                update(NFTPassport)
+                .where(NFTPassport.id == nft_id)
+                .values(qr_code_hash=digest, qr_code_data=None)
+            )
+            moved += 1
+        db.commit()
+        last_id = rows[-1].id
+        print(f"{moved} QR kod taşındı")
+
+
+if __name__ == "__main__":
+    from database import SessionLocal, engine, init_db
+
+    if not sys.argv[1:] or sys.argv[1] != "migrate" or set(sys.argv[2:]) - {"--vacuum"}:
+        print("Usage: python qr_store.py migrate [--vacuum]")
+        sys.exit(1)
+
+    init_db()
+    db = SessionLocal()
+    try:
+        print(f"Migration complete: {migrate(db)} passports")
+    finally:
+        db.close()
+
+    if "--vacuum" in sys.argv:
+        # Give the space freed by the old data URIs back to the filesystem
+        with engine.connect().execution_options(isolation_level="AUTOCOMMIT") as conn:
+            conn.execute(text("VACUUM" if engine.dialect.name == "sqlite" else "VACUUM ANALYZE nft_passports"))
+        print("VACUUM done")
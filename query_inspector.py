@@ -0,0 +1,177 @@
+"""Opt-in N+1 and slow-query detector for development and staging
+
+    QUERY_INSPECTOR=log    report problems on stdout
+    QUERY_INSPECTOR=raise  also fail the offending statement with NPlusOneError
+                           (tests and staging smoke runs catch it as a 500)
+
+Within one request every statement is reduced to its shape: the SQL text
+with whitespace collapsed and IN-lists folded, so the same lazy load for
+different rows counts as one shape. When a shape runs more than
+QUERY_INSPECTOR_REPEAT times (default 5), it is reported together with the
+application line that issued it. Statements slower than QUERY_INSPECTOR_SLOW_MS
+(default 100) are reported with their EXPLAIN plan.
+
+Every response also gets headers with the totals:
+    X-Query-Report: queries=14; sql_ms=12.3; repeated=1; slow=0
+    Server-Timing: db;dur=12.3;desc="14 queries"
+"""
+import contextvars
+import os
+import re
+import time
+import traceback
+from collections import Counter
+from typing import Optional
+
+from sqlalchemy import event
+
+MODE = os.getenv("QUERY_INSPECTOR", "off").lower()
+REPEAT_THRESHOLD = int(os.getenv("QUERY_INSPECTOR_REPEAT", "5"))
+SLOW_MS = float(os.getenv("QUERY_INSPECTOR_SLOW_MS", "100"))
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+
+_WHITESPACE = re.compile(r"\s+")
+# (?, ?, ?) / (%(p_1)s, %(p_2)s) / ($1, $2) lists of any length fold into one shape
+_PARAM_LIST = re.compile(r"\((?:\s*(?:\?|%\(\w+\)s|\$\d+)\s*,)+\s*(?:\?|%\(\w+\)s|\$\d+)\s*\)")
+
+
+class NPlusOneError(RuntimeError):
+    pass
+
+
+def enabled() -> bool:
+    return MODE in ("log", "raise")
+
+
+def query_shape(statement: str) -> str:
+    return _PARAM_LIST.sub("(?...)", _WHITESPACE.sub(" ", statement).strip())
+
+
+def _app_frame() -> Optional[str]:
+    """Innermost stack frame in this repo outside this module: where the query came from"""
+    for frame in reversed(traceback.extract_stack()[:-2]):
+        if frame.filename.startswith(BASE_DIR) and not frame.filename.endswith("query_inspector.py"):
+            return f"{os.path.relpath(frame.filename, BASE_DIR)}:{frame.lineno} in {frame.name}"
+    return None
+
+
+class RequestReport:
+    def __init__(self, label: str):
+        self.label = label
+        self.queries = 0
+        self.sql_seconds = 0.0
+        self.shapes = Counter()
+        self.repeated = {}  # shape -> origin of the query that crossed the threshold
+        self.slow = []  # (ms, statement, plan)
+
+    def header(self) -> str:
+        return (f"queries={self.queries}; sql_ms={self.sql_seconds * 1000:.1f}; "
+                f"repeated={len(self.repeated)}; slow={len(self.slow)}")
+
+    def print_problems(self):
+        if not self.repeated and not self.slow:
+            return
+        print(f"[query-inspector] {self.label}: {self.header()}")
+        for shape, origin in self.repeated.items():
+            print(f"  N+1? {self.shapes[shape]}x from {origin or 'unknown'}: {shape[:300]}")
+        for ms, statement, plan in self.slow:
+            print(f"  slow {ms:.1f} ms: {statement[:300]}")
+            for line in plan.splitlines():
+                print(f"      {line}")
+
+
+_current = contextvars.ContextVar("query_inspector_report", default=None)
+
+
+def explain(cursor_connection, dialect_name: str, statement: str, parameters) -> str:
+    prefix = "EXPLAIN QUERY PLAN " if dialect_name == "sqlite" else "EXPLAIN "
+    cursor = cursor_connection.cursor()
+    try:
+        cursor.execute(prefix + statement, parameters)
+        rows = cursor.fetchall()
+    except Exception as e:
+        return f"(EXPLAIN failed: {e})"
+    finally:
+        cursor.close()
+    return "\n".join(str(row[-1] if dialect_name == "sqlite" else row[0]) for row in rows)
+
+
+def instrument_engine(engine):
+    sync_engine = getattr(engine, "sync_engine", engine)
+
+    @event.listens_for(sync_engine, "before_cursor_execute")
+    def _before(conn, cursor, statement, parameters, context, executemany):
+        report = _current.get()
+        if report is None:
+            return
+        conn.info.setdefault("query_inspector_started", []).append(time.perf_counter())
+        shape = query_shape(statement)
+        report.shapes[shape] += 1
+        if report.shapes[shape] == REPEAT_THRESHOLD + 1:
+            report.repeated[shape] = _app_frame()
+            if MODE == "raise":
+                raise NPlusOneError(
+                    f"{report.label}: same query ran {REPEAT_THRESHOLD + 1} times "
+                    f"(from {report.repeated[shape] or 'unknown'}): {shape[:300]}"
+                )
+
+    @event.listens_for(sync_engine, "after_cursor_execute")
+    def _after(conn, cursor, statement, parameters, context, executemany):
+        report = _current.get()
+        started = conn.info.get("query_inspector_started")
+        if report is None or not started:
+            return
+        elapsed = time.perf_counter() - started.pop()
+        report.queries += 1
+        report.sql_seconds += elapsed
+        if elapsed * 1000 >= SLOW_MS and not executemany:
+            plan = explain(conn.connection.dbapi_connection, conn.dialect.name, statement, parameters)
+            report.slow.append((elapsed * 1000, statement, plan))
+
+    @event.listens_for(sync_engine, "handle_error")
+    def _failed(context):
+        started = context.connection.info.get("query_inspector_started") if context.connection else None
+        if started:
+            started.pop()
+
+
+class QueryInspectorMiddleware:
+    """Collects one RequestReport per HTTP request and adds the report headers"""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        report = RequestReport(f"{scope['method']} {scope['path']}")
+        token = _current.set(report)
+
+        async def send_wrapper(message):
+            if message["type"] == "http.response.start":
+                # Streaming bodies keep querying after this; their totals are in the log line
+                headers = list(message.get("headers", []))
+                headers.append((b"x-query-report", report.header().encode()))
+                headers.append((b"server-timing",
+                                f'db;dur={report.sql_seconds * 1000:.1f};desc="{report.queries} queries"'.encode()))
+                message = {**message, "headers": headers}
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            _current.reset(token)
+            report.print_problems()
+
+
+def install(app, *engines):
+    """Hook the engines and add the middleware when QUERY_INSPECTOR is log or raise"""
+    if not enabled():
+        return
+    for engine in engines:
+        instrument_engine(engine)
+    app.add_middleware(QueryInspectorMiddleware)
+    print(f"Query inspector on ({MODE}): repeat > {REPEAT_THRESHOLD}, slow >= {SLOW_MS} ms")
@@ -0,0 +1,247 @@
+"""Incrementally maintained sustainability rollups
+
+Every write path that creates a style or changes its carbon footprint calls
+`apply_style_change` (or `apply_style_changes` for batches) inside the same
+transaction as the style write, so the summary tables are always consistent
+with the styles table. Creating collections and passports likewise calls
+`apply_catalog_counts`, so rollup_totals answers the dashboard counts.
+`rebuild` recomputes everything from scratch for backfills:
+
+    python rollups.py rebuild
+"""
+import sys
+from collections import defaultdict, namedtuple
+from datetime import datetime
+from typing import Iterable, List, Optional, Tuple
+
+from sqlalchemy import case, delete, func, insert, literal_column, select
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlalchemy.orm import Session
+
+import style_materials
+from models import (
+    Collection, NFTPassport, Style, RollupTotals, RollupCarbonBucket, RollupMaterial, RollupLowCarbonStyle
+)
+
+LOW_CARBON_TOP_N = 5
+
+# What a style contributed to the rollups at one point in time (location and supplier feed emissions.py)
+StyleSnapshot = namedtuple("StyleSnapshot", ["style_id", "carbon_footprint", "materials",
+                                             "production_location", "supplier"], defaults=(None, None))
+
+
+def carbon_bucket(carbon_footprint: Optional[float]) -> str:
+    """<3 kg low, 3-5 kg medium, >5 kg high (same thresholds as the templates)"""
+    carbon = carbon_footprint or 0
+    if carbon < 3:
+        return "low"
+    if carbon <= 5:
+        return "medium"
+    return "high"
+
+
+def snapshot(style: Style) -> StyleSnapshot:
+    return StyleSnapshot(style.id, style.carbon_footprint or 0, list(style.materials or []),
+                         style.production_location, style.supplier)
+
+
+def upsert_add(db: Session, model, key_names: List[str], rows: List[dict]):
+    """INSERT each row or add its values to the existing one, atomically (one executemany)"""
+    if not rows:
+        return
+    if db.get_bind().dialect.name == "postgresql":
+        stmt = pg_insert(model)
+    else:
+        stmt = sqlite_insert(model)
+    delta_names = [name for name in rows[0] if name not in key_names]
+    set_ = {name: getattr(model, name) + stmt.excluded[name] for name in delta_names if name != "updated_at"}
+    if "updated_at" in delta_names:
+        set_["updated_at"] = stmt.excluded.updated_at
+    db.execute(stmt.on_conflict_do_update(index_elements=key_names, set_=set_), rows)
+
+
+def apply_style_changes(db: Session, changes: Iterable[Tuple[Optional[StyleSnapshot], Optional[StyleSnapshot]]]):
+    """Apply (before, after) snapshot pairs; None means the style did not / no longer exists"""
+    style_delta = 0
+    carbon_delta = 0.0
+    bucket_deltas = defaultdict(int)
+    material_deltas = defaultdict(lambda: [0, 0.0])
+    touched_ids = set()
+    lowest_new = None
+
+    for before, after in changes:
+        for snap, sign in ((before, -1), (after, 1)):
+            if snap is None:
+                continue
+            style_delta += sign
+            carbon_delta += sign * snap.carbon_footprint
+            bucket_deltas[carbon_bucket(snap.carbon_footprint)] += sign
+            for material in snap.materials:
+                material_deltas[material][0] += sign
+                material_deltas[material][1] += sign * snap.carbon_footprint
+            touched_ids.add(snap.style_id)
+        if after is not None and (lowest_new is None or after.carbon_footprint < lowest_new):
+            lowest_new = after.carbon_footprint
+
+    if not touched_ids:
+        return
+
+    upsert_add(db, RollupTotals, ["id"], [
+        {"id": 1, "style_count": style_delta, "total_carbon": carbon_delta, "updated_at": datetime.utcnow()}
+    ])
+    upsert_add(db, RollupCarbonBucket, ["bucket"], [
+        {"bucket": bucket, "style_count": delta} for bucket, delta in bucket_deltas.items() if delta
+    ])
+    upsert_add(db, RollupMaterial, ["material"], [
+        {"material": material, "style_count": count, "total_carbon": carbon}
+        for material, (count, carbon) in material_deltas.items() if count or carbon
+    ])
+    if any(count < 0 for count, _ in material_deltas.values()):
+        db.execute(delete(RollupMaterial).where(RollupMaterial.style_count <= 0))
+
+    if _low_carbon_affected(db, touched_ids, lowest_new):
+        refresh_low_carbon_styles(db)
+
+
+def apply_style_change(db: Session, before: Optional[StyleSnapshot], after: Optional[StyleSnapshot]):
+    apply_style_changes(db, [(before, after)])
+
+
+def apply_catalog_counts(db: Session, collections: int = 0, passports: int = 0):
+    """Add created (or, negative, removed) collections and passports to rollup_totals"""
+    if not (collections or passports):
+        return
+    upsert_add(db, RollupTotals, ["id"], [
+        {"id": 1, "collection_count": collections, "passport_count": passports, "updated_at": datetime.utcnow()}
+    ])
+
+
+def _low_carbon_affected(db: Session, touched_ids: set, lowest_new: Optional[float]) -> bool:
+    """Only re-rank when a change can actually move the top-N list"""
+    current = db.execute(
+        select(RollupLowCarbonStyle.style_id, RollupLowCarbonStyle.carbon_footprint)
+    ).all()
+    if len(current) < LOW_CARBON_TOP_N:
+        return True
+    if any(style_id in touched_ids for style_id, _ in current):
+        return True
+    worst = max((carbon or 0) for _, carbon in current)
+    return lowest_new is not None and lowest_new <= worst
+
+
+def refresh_low_carbon_styles(db: Session):
+    """Re-rank the lowest-carbon styles straight from the styles table"""
+    db.flush()
+    # Same expression as ix_styles_carbon_id, so this reads the first N index entries
+    rows = db.execute(
+        select(Style.id, Style.name, Style.materials, Style.production_location, Style.carbon_footprint)
+        .order_by(func.coalesce(Style.carbon_footprint, literal_column("0")), Style.id)
+        .limit(LOW_CARBON_TOP_N)
+    ).all()
+    db.execute(delete(RollupLowCarbonStyle))
+    if rows:
+        db.execute(insert(RollupLowCarbonStyle), [
+            {
+                "style_id": row.id,
+                "rank": rank,
+                "name": row.name,
+                "materials": row.materials,
+                "production_location": row.production_location,
+                "carbon_footprint": row.carbon_footprint or 0,
+            }
+            for rank, row in enumerate(rows, start=1)
+        ])
+
+
+def reset(db: Session):
+    """Empty all rollup tables (used when the catalog itself is wiped)"""
+    for model in (RollupTotals, RollupCarbonBucket, RollupMaterial, RollupLowCarbonStyle):
+        db.execute(delete(model))
+
+
+def rebuild(db: Session):
+    """Recompute every rollup from the styles table (backfills, factor changes)"""
+    reset(db)
+    carbon = func.coalesce(Style.carbon_footprint, 0)
+
+    totals = db.execute(select(
+        func.count(Style.id), func.coalesce(func.sum(carbon), 0.0),
+        select(func.count()).select_from(Collection).scalar_subquery(),
+        select(func.count()).select_from(NFTPassport).scalar_subquery(),
+    )).one()
+    db.execute(insert(RollupTotals).values(
+        id=1, style_count=totals[0], total_carbon=float(totals[1]), collection_count=totals[2],
+        passport_count=totals[3], updated_at=datetime.utcnow()
+    ))
+
+    bucket_expr = case((carbon < 3, "low"), (carbon <= 5, "medium"), else_="high")
+    buckets = db.execute(select(bucket_expr, func.count(Style.id)).group_by(bucket_expr)).all()
+    if buckets:
+        db.execute(insert(RollupCarbonBucket), [
+            {"bucket": bucket, "style_count": count} for bucket, count in buckets
+        ])
+
+    materials = style_materials.grouped(db)
+    if materials:
+        db.execute(insert(RollupMaterial), [
+            {"material": material, "style_count": count, "total_carbon": float(total)}
+            for material, count, total in materials
+        ])
+
+    refresh_low_carbon_styles(db)
+
+
+def is_built(db: Session) -> bool:
+    return db.get(RollupTotals, 1) is not None
+
+
+def read_sustainability(db: Session) -> dict:
+    """Everything the sustainability page needs, read from the rollup tables"""
+    totals = db.get(RollupTotals, 1)
+    style_count = totals.style_count if totals else 0
+    total_carbon = totals.total_carbon if totals else 0.0
+
+    buckets = dict(db.execute(select(RollupCarbonBucket.bucket, RollupCarbonBucket.style_count)).all())
+
+    material_analysis = {}
+    for material, count, carbon in db.execute(
+        select(RollupMaterial.material, RollupMaterial.style_count, RollupMaterial.total_carbon)
+    ):
+        material_analysis[material] = {
+            "count": count,
+            "total_carbon": carbon,
+            "avg_carbon": round(carbon / count, 2) if count else 0,
+        }
+
+    low_carbon_styles: List[RollupLowCarbonStyle] = db.execute(
+        select(RollupLowCarbonStyle).order_by(RollupLowCarbonStyle.rank)
+    ).scalars().all()
+
+    return {
+        "total_styles": style_count,
+        "total_carbon": total_carbon,
+        "avg_carbon": total_carbon / style_count if style_count else 0,
+        "low_carbon_count": buckets.get("low", 0),
+        "medium_carbon_count": buckets.get("medium", 0),
+        "high_carbon_count": buckets.get("high", 0),
+        "material_analysis": material_analysis,
+        "low_carbon_styles": low_carbon_styles,
+    }
+
+
+if __name__ == "__main__":
+    from database import SessionLocal, init_db
+
+    if sys.argv[1:] != ["rebuild"]:
+        print("Usage: python rollups.py rebuild")
+        sys.exit(1)
+
+    init_db()
+    db = SessionLocal()
+    try:
+        rebuild(db)
+        db.commit()
+        print(f"Rollups rebuilt: {read_sustainability(db)['total_styles']} styles")
+    finally:
+        db.close()
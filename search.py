@@ -0,0 +1,342 @@
+"""Full-text search over styles, collections and passports
+
+Every searchable row has one search_documents row: what the result shows
+(title, detail, url) and the indexed text, folded with
+turkish_text.fold_for_search so "İSTANBUL", "Istanbul" and "istanbul" or
+"gömlek" and "GOMLEK" are the same word. The database indexes the folded
+text itself (migration 0006):
+
+    SQLite       search_fts and search_title_fts, external-content FTS5
+                 tables kept in sync by triggers on search_documents
+    PostgreSQL   a generated tsvector column ('simple' configuration, the
+                 text is already folded, titles weighted A) with a GIN index
+
+Results whose title (style/collection/passport name, product code) has every
+query word come first, then those matching across the other fields
+(category, materials, supplier, production location, collection name), each
+tier newest first. All query words must match, the last one as a prefix
+(search as you type); FTS5 keeps prefix indexes for 2-6 characters so short
+prefixes don't merge posting lists.
+
+Write paths upsert the documents of what they changed in the same
+transaction:
+
+    create_style                    index_styles
+    create/update_collection        index_collections (and its styles)
+    generate-nft, passport_batch    index_passports
+    text_repair                     all three
+
+Bulk imports don't index inline (the FTS triggers would cost more than the
+import itself); the `index_search` job indexes the styles that have no
+document yet once the import is done, see index_missing_styles.
+
+Pages are read with a cursor on (tier, document id). Documents are built on
+first start against an existing catalog; after bulk changes made outside
+the app:
+
+    python search.py rebuild
+"""
+import base64
+import json
+import re
+import sys
+from collections import namedtuple
+from typing import Dict, Iterable, List, Mapping, Optional, Sequence
+
+from sqlalchemy import delete, exists, select, text
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlalchemy.orm import Session
+
+import listings
+from models import Collection, NFTPassport, SearchDocument, Style
+from turkish_text import fold_for_search
+
+KINDS = ("style", "collection", "passport")
+MAX_QUERY_WORDS = 8
+REBUILD_CHUNK_SIZE = 5000
+
+_WORD = re.compile(r"[^\W_]+")
+
+# One ranking tier, newest document first; only the rows of the page are read from search_documents
+SEARCH_SQL = {
+    "sqlite": """
+        SELECT d.kind, d.ref_id, d.title, d.detail, d.url, d.id FROM (
+            SELECT rowid AS id FROM {fts}
+            WHERE {fts} MATCH :query {before_filter}
+            ORDER BY rowid DESC
+            LIMIT :limit
+        ) AS hits JOIN search_documents AS d ON d.id = hits.id
+        ORDER BY d.id DESC
+    """,
+    "postgresql": """
+        SELECT kind, ref_id, title, detail, url, id FROM search_documents
+        WHERE document @@ to_tsquery('simple', :query) {before_filter} {kind_filter}
+        ORDER BY id DESC
+        LIMIT :limit
+    """,
+}
+BEFORE_FILTER = {"sqlite": "AND rowid < :before", "postgresql": "AND id < :before"}
+# Relevance tiers: every word in the title, then every word anywhere else
+TIERS = 2
+# search_documents.id is an int4 on PostgreSQL; a cursor beyond it can't be bound
+MAX_DOCUMENT_ID = 2 ** 31 - 1
+
+Hit = namedtuple("Hit", ["kind", "ref_id", "title", "detail", "url", "id", "tier"])
+Page = namedtuple("Page", ["items", "next_cursor"])
+
+
+def _text(*values) -> str:
+    words = []
+    for value in values:
+        if isinstance(value, (list, tuple)):
+            words.extend(str(item) for item in value if item)
+        elif value:
+            words.append(str(value))
+    return fold_for_search(" ".join(words))
+
+
+def _detail(*values) -> str:
+    return " · ".join(str(value) for value in values if value)
+
+
+def style_document(style: Mapping, collection_name: Optional[str]) -> dict:
+    return {
+        "kind": "style", "ref_id": style["id"], "title": style["name"],
+        "detail": _detail(style["category"], collection_name, style["production_location"]),
+        "url": f"/collections/{style['collection_id']}" if style["collection_id"] else "/styles",
+        "search_title": _text(style["name"]),
+        "search_body": _text(style["category"], style["materials"], style["supplier"],
+                             style["production_location"], collection_name),
+    }
+
+
+def collection_document(collection: Mapping) -> dict:
+    return {
+        "kind": "collection", "ref_id": collection["id"], "title": collection["name"],
+        "detail": _detail(collection["season"], collection["year"]),
+        "url": f"/collections/{collection['id']}",
+        "search_title": _text(collection["name"]),
+        "search_body": _text(collection["season"], collection["year"]),
+    }
+
+
+def passport_document(passport: Mapping) -> dict:
+    return {
+        "kind": "passport", "ref_id": passport["id"], "title": passport["name"],
+        "detail": _detail(passport["product_code"], passport["collection_name"]),
+        "url": f"/passport/{passport['id']}",
+        "search_title": _text(passport["name"], passport["product_code"]),
+        "search_body": _text(passport["materials"], passport["supplier"], passport["production_location"],
+                             passport["collection_name"]),
+    }
+
+
+def upsert(db: Session, documents: List[dict]):
+    """Insert or replace documents by (kind, ref_id); the database index follows (caller commits)"""
+    if not documents:
+        return
+    if db.get_bind().dialect.name == "postgresql":
+        stmt = pg_insert(SearchDocument.__table__)
+    else:
+        stmt = sqlite_insert(SearchDocument.__table__)
+    columns = ("title", "detail", "url", "search_title", "search_body")
+    db.execute(stmt.on_conflict_do_update(index_elements=["kind", "ref_id"],
+                                          set_={name: stmt.excluded[name] for name in columns}), documents)
+
+
+def collection_names(db: Session, collection_ids: Iterable[Optional[str]]) -> Dict[str, str]:
+    ids = {collection_id for collection_id in collection_ids if collection_id}
+    if not ids:
+        return {}
+    return dict(db.execute(select(Collection.id, Collection.name).where(Collection.id.in_(ids))).all())
+
+
+_STYLE_COLUMNS = (Style.id, Style.name, Style.category, Style.materials, Style.supplier,
+                  Style.production_location, Style.collection_id, Collection.name.label("collection_name"))
+_COLLECTION_COLUMNS = (Collection.id, Collection.name, Collection.season, Collection.year)
+_PASSPORT_COLUMNS = (NFTPassport.id, NFTPassport.name, NFTPassport.product_code, NFTPassport.collection_name,
+                     NFTPassport.materials, NFTPassport.supplier, NFTPassport.production_location)
+
+
+def _style_rows(condition, limit: Optional[int] = None):
+    return (select(*_STYLE_COLUMNS).outerjoin(Collection, Collection.id == Style.collection_id)
+            .where(condition).order_by(Style.id).limit(limit))
+
+
+def index_styles(db: Session, style_ids: Sequence[str]):
+    if style_ids:
+        db.flush()
+        rows = db.execute(_style_rows(Style.id.in_(list(style_ids)))).all()
+        upsert(db, [style_document(row._mapping, row.collection_name) for row in rows])
+
+
+def index_missing_styles(db: Session, after_id: str = "", limit: int = REBUILD_CHUNK_SIZE) -> Optional[str]:
+    """Index the next `limit` styles (by id) without a document; the last id done, or None when there are none left"""
+    indexed = ~exists().where(SearchDocument.kind == "style", SearchDocument.ref_id == Style.id)
+    rows = db.execute(_style_rows(indexed & (Style.id > after_id), limit)).all()
+    if not rows:
+        return None
+    upsert(db, [style_document(row._mapping, row.collection_name) for row in rows])
+    return rows[-1].id
+
+
+def index_collections(db: Session, collection_ids: Sequence[str]):
+    """Collection documents and those of their styles, which carry the collection name"""
+    if not collection_ids:
+        return
+    db.flush()
+    rows = db.execute(select(*_COLLECTION_COLUMNS).where(Collection.id.in_(list(collection_ids)))).all()
+    upsert(db, [collection_document(row._mapping) for row in rows])
+    after_id = ""
+    while True:
+        rows = db.execute(_style_rows(
+            Style.collection_id.in_(list(collection_ids)) & (Style.id > after_id), REBUILD_CHUNK_SIZE
+        )).all()
+        if not rows:
+            break
+        upsert(db, [style_document(row._mapping, row.collection_name) for row in rows])
+        after_id = rows[-1].id
+
+
+def index_passports(db: Session, passport_ids: Sequence[str]):
+    if passport_ids:
+        db.flush()
+        rows = db.execute(select(*_PASSPORT_COLUMNS).where(NFTPassport.id.in_(list(passport_ids)))).all()
+        upsert(db, [passport_document(row._mapping) for row in rows])
+
+
+def rebuild(db: Session, chunk_size: int = REBUILD_CHUNK_SIZE) -> int:
+    """Re-create every document from the catalog, one chunk per statement (caller commits)"""
+    db.execute(delete(SearchDocument))
+    sources = (
+        (Collection.id, lambda cond, n: select(*_COLLECTION_COLUMNS).where(cond).order_by(Collection.id).limit(n),
+         lambda row: collection_document(row._mapping)),
+        (Style.id, _style_rows, lambda row: style_document(row._mapping, row.collection_name)),
+        (NFTPassport.id, lambda cond, n: select(*_PASSPORT_COLUMNS).where(cond).order_by(NFTPassport.id).limit(n),
+         lambda row: passport_document(row._mapping)),
+    )
+    indexed = 0
+    for key, query, document in sources:
+        after_id = ""
+        while True:
+            rows = db.execute(query(key > after_id, chunk_size)).all()
+            if not rows:
+                break
+            upsert(db, [document(row) for row in rows])
+            indexed += len(rows)
+            after_id = rows[-1].id
+    if db.get_bind().dialect.name == "sqlite":
+        db.execute(text("INSERT INTO search_fts(search_fts) VALUES ('optimize')"))
+        db.execute(text("INSERT INTO search_title_fts(search_title_fts) VALUES ('optimize')"))
+    return indexed
+
+
+def is_built(db: Session) -> bool:
+    """Documents exist, or there is nothing to index"""
+    for key in (SearchDocument.id, Collection.id, Style.id):
+        if db.execute(select(key).limit(1)).first() is not None:
+            return key is SearchDocument.id
+    return True
+
+
+def query_words(query: str) -> List[str]:
+    return _WORD.findall(fold_for_search(query))[:MAX_QUERY_WORDS]
+
+
+def encode_cursor(hit: Hit) -> str:
+    raw = json.dumps([hit.tier, hit.id]).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str):
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        tier, doc_id = json.loads(raw)
+        tier, doc_id = int(tier), int(doc_id)
+        if not (0 <= tier < TIERS and 0 < doc_id <= MAX_DOCUMENT_ID):
+            raise ValueError("out of range")
+        return tier, doc_id
+    except (ValueError, TypeError) as e:
+        raise listings.InvalidCursor(f"Invalid cursor: {cursor!r}") from e
+
+
+def match_query(dialect: str, words: List[str], tier: int, kind: Optional[str] = None) -> str:
+    """Full-text query for one tier: all words, the last one (still being typed) as a prefix"""
+    last = len(words) - 1
+    if dialect == "postgresql":
+        anywhere = " & ".join(f"{word}:*" if i == last else word for i, word in enumerate(words))
+        in_title = " & ".join(f"{word}:*A" if i == last else f"{word}:A" for i, word in enumerate(words))
+        return in_title if tier == 0 else f"({anywhere}) & !({in_title})"
+    terms = " ".join(f'"{word}"*' if i == last else f'"{word}"' for i, word in enumerate(words))
+    query = f"{{search_title}} : ({terms})"  # search_title_fts in tier 0
+    if tier == 1:
+        query = f"{{search_title search_body}} : ({terms}) NOT {query}"
+    # The kind is an indexed FTS column too, so the filter is part of the match
+    return f'kind : "{kind}" AND ({query})' if kind else query
+
+
+def tier_statement(dialect: str, words: List[str], tier: int, kind: Optional[str], before: Optional[int],
+                   limit: int):
+    """SQL and parameters reading one tier newest first, below document id `before` (None: from the top)"""
+    fts = "search_title_fts" if tier == 0 else "search_fts"
+    sql = SEARCH_SQL[dialect].format(
+        fts=fts,
+        before_filter=BEFORE_FILTER[dialect] if before is not None else "",
+        kind_filter="AND kind = :only_kind" if kind and dialect == "postgresql" else "",
+    )
+    params = {"query": match_query(dialect, words, tier, kind), "limit": limit}
+    if before is not None:
+        params["before"] = before
+    if ":only_kind" in sql:
+        params["only_kind"] = kind
+    return text(sql), params
+
+
+def search(db: Session, query: str, kind: Optional[str] = None, cursor: Optional[str] = None,
+           limit: Optional[int] = None) -> Page:
+    """Title matches first, then the rest, newest first within each; every query word must match
+
+    Relevance is by tier rather than bm25()/ts_rank(): those need the
+    document frequency of every query word, a pass over its whole posting
+    list on each query, while a tier is read newest first straight from the
+    index and stops at the page size.
+    """
+    limit = listings.clamp_page_size(limit)
+    words = query_words(query)
+    if not words:
+        return Page([], None)
+    dialect = db.get_bind().dialect.name
+    tier, before = decode_cursor(cursor) if cursor else (0, None)
+
+    hits = []
+    while tier < TIERS and len(hits) <= limit:
+        wanted = limit + 1 - len(hits)
+        rows = db.execute(*tier_statement(dialect, words, tier, kind, before, wanted)).all()
+        hits.extend(Hit(*row, tier) for row in rows)
+        if len(rows) == wanted:
+            break
+        tier, before = tier + 1, None
+    next_cursor = encode_cursor(hits[limit - 1]) if len(hits) > limit else None
+    return Page(hits[:limit], next_cursor)
+
+
+def hit_to_dict(hit: Hit) -> dict:
+    return {"kind": hit.kind, "id": hit.ref_id, "title": hit.title, "detail": hit.detail, "url": hit.url}
+
+
+if __name__ == "__main__":
+    from database import SessionLocal, init_db
+
+    if sys.argv[1:] != ["rebuild"]:
+        print("Usage: python search.py rebuild")
+        sys.exit(1)
+
+    init_db()
+    db = SessionLocal()
+    try:
+        indexed = rebuild(db)
+        db.commit()
+        print(f"search index rebuilt: {indexed} documents")
+    finally:
+        db.close()
@@ -0,0 +1,87 @@
+from typing import Dict, List, Tuple
+
+from sqlalchemy import func, select
+from sqlalchemy.orm import Session
+
+from models import Collection, Style, RollupTotals
+
+
+def get_totals(db: Session) -> dict:
+    """Collection/style/NFT counts and total carbon: one primary key read of rollup_totals"""
+    row = db.execute(
+        select(RollupTotals.collection_count, RollupTotals.style_count, RollupTotals.passport_count,
+               RollupTotals.total_carbon)
+        .where(RollupTotals.id == 1)
+    ).first()
+    if row is None:  # empty catalog, or rollups not built yet
+        return {"collections": 0, "styles": 0, "nfts": 0, "total_carbon": 0.0}
+
+    return {
+        "collections": row[0],
+        "styles": row[1],
+        "nfts": row[2],
+        "total_carbon": float(row[3] or 0),
+    }
+
+
+def get_recent_collections(db: Session, limit: int = 5) -> List[Tuple[Collection, int]]:
+    """Most recently created collections together with their style counts"""
+    collections = db.execute(
+        select(Collection)
+        .order_by(Collection.created_at.desc(), Collection.id.desc())
+        .limit(limit)
+    ).scalars().all()
+    if not collections:
+        return []
+
+    counts = style_counts_for(db, [c.id for c in collections])
+    return [(collection, counts.get(collection.id, 0)) for collection in collections]
+
+
+def style_counts_for(db: Session, collection_ids: List[str]) -> Dict[str, int]:
+    """Style counts for just the given collections (one GROUP BY, no lazy loads)"""
+    if not collection_ids:
+        return {}
+    return dict(db.execute(
+        select(Style.collection_id, func.count(Style.id))
+        .where(Style.collection_id.in_(collection_ids))
+        .group_by(Style.collection_id)
+    ).all())
+
+
+def get_dashboard_stats(db: Session) -> Dict[str, int]:
+    """Dashboard kartlarındaki sayılar"""
+    totals = get_totals(db)
+    return {
+        "total_collections": totals["collections"],
+        "total_styles": totals["styles"],
+        "total_samples": 0,  # Placeholder
+        "total_nfts": totals["nfts"],
+    }
+
+
+UNKNOWN_LOCATION = "Bilinmiyor"
+
+
+def location_stats(db: Session) -> Dict[str, dict]:
+    """Style count and carbon per production location (one GROUP BY over ix_styles_location_created_at_id)
+
+    `location` is the value to filter the styles listing by for the drill-down;
+    styles without a location are grouped under UNKNOWN_LOCATION and have none.
+    """
+    carbon = func.coalesce(Style.carbon_footprint, 0)
+    result = {}
+    for location, count, total in db.execute(
+        select(Style.production_location, func.count(), func.coalesce(func.sum(carbon), 0.0))
+        .group_by(Style.production_location)
+    ):
+        entry = result.setdefault(location or UNKNOWN_LOCATION, {
+            "location": location or None,
+            "count": 0,
+            "total_carbon": 0.0,
+        })
+        entry["count"] += count
+        entry["total_carbon"] += float(total)
+    for entry in result.values():
+        entry["avg_carbon"] = round(entry["total_carbon"] / entry["count"], 2) if entry["count"] else 0
+    return result
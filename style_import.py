@@ -0,0 +1,281 @@
+"""Streaming bulk style import from CSV or JSONL (supplier tech packs)
+
+Rows are parsed one at a time from the file object, so memory stays bounded
+by the chunk size no matter how large the file is. Each chunk is validated
+and normalized (fix_turkish_encoding, material lists), scored with the
+vectorized carbon engine and written in one transaction together with its
+style_materials rows and rollup deltas. Materials may carry a composition
+share ("%60 pamuk"), see style_materials.parse_material. Search documents
+are written afterwards (search.index_missing_styles): by the index_search
+job for POST /styles/import, at the end of the run for the CLI.
+
+Columns / keys: name, category, collection_id, materials, target_price,
+production_location, supplier, status (optional). `materials` is a list in
+JSONL and a comma or semicolon separated string in CSV. Rows without a
+collection_id use the default collection given to the import.
+
+    python style_import.py styles.csv --collection-id <id>
+    python style_import.py styles.jsonl
+"""
+import codecs
+import csv
+import json
+import re
+import sys
+import time
+import uuid
+from collections import deque
+from contextlib import nullcontext
+from datetime import datetime
+from functools import lru_cache
+from typing import IO, Iterator, List, Optional, Tuple
+
+from sqlalchemy import insert, select
+from sqlalchemy.orm import Session
+
+import carbon_engine
+import emissions
+import rollups
+import style_materials
+from models import Collection, Style, StyleMaterial
+from turkish_text import fix_turkish_encoding
+
+CHUNK_SIZE = 5000
+MAX_REPORTED_ERRORS = 100
+FORMATS = ("csv", "jsonl")
+
+_MATERIAL_SEPARATORS = re.compile(r"[,;]")
+
+
+class ImportFormatError(ValueError):
+    pass
+
+
+def detect_format(filename: str, fmt: Optional[str] = None) -> str:
+    fmt = (fmt or filename.rsplit(".", 1)[-1]).lower()
+    if fmt == "ndjson":
+        fmt = "jsonl"
+    if fmt not in FORMATS:
+        raise ImportFormatError(f"Unsupported import format {fmt!r} (use csv or jsonl)")
+    return fmt
+
+
+def _decoded_lines(stream: IO[bytes], bad_lines: deque) -> Iterator[str]:
+    """UTF-8 lines of a binary stream; undecodable ones are replaced and their line number appended to `bad_lines`"""
+    for line_number, raw in enumerate(iter(stream.readline, b""), start=1):
+        if line_number == 1 and raw.startswith(codecs.BOM_UTF8):
+            raw = raw[len(codecs.BOM_UTF8):]
+        try:
+            yield raw.decode("utf-8")
+        except UnicodeDecodeError:
+            bad_lines.append(line_number)
+            yield raw.decode("utf-8", "replace")
+
+
+def _invalid_utf8(bad_lines: deque, first: int, last: int) -> Optional[ImportFormatError]:
+    """The error for a row on lines first..last if one of them was undecodable (consumes those line numbers)"""
+    invalid = False
+    while bad_lines and bad_lines[0] <= last:
+        invalid |= bad_lines.popleft() >= first
+    return ImportFormatError("Invalid UTF-8") if invalid else None
+
+
+def iter_rows(stream: IO[bytes], fmt: str) -> Iterator[Tuple[int, object]]:
+    """(line number, raw row) pairs, decoded incrementally from a binary stream
+
+    Undecodable bytes and malformed CSV only reject the rows they are in;
+    the rows after them are still read.
+    """
+    bad_lines = deque()
+    lines = _decoded_lines(stream, bad_lines)
+    if fmt == "csv":
+        reader = csv.DictReader(lines)
+        last = 1  # the header
+        while True:
+            try:
+                row = next(reader)
+            except StopIteration:
+                return
+            except csv.Error as e:
+                row = ImportFormatError(f"Invalid CSV: {e}")
+            first, last = last + 1, reader.reader.line_num  # DictReader.line_num isn't updated on errors
+            yield last, _invalid_utf8(bad_lines, first, last) or row
+    for line_number, line in enumerate(lines, start=1):
+        if not line.strip():
+            continue
+        error = _invalid_utf8(bad_lines, line_number, line_number)
+        if error is not None:
+            yield line_number, error
+            continue
+        try:
+            yield line_number, json.loads(line)
+        except ValueError as e:
+            yield line_number, ImportFormatError(f"Invalid JSON: {e}")
+
+
+def _text(value) -> str:
+    if value is None:
+        return ""
+    return fix_turkish_encoding(str(value).strip())
+
+
+# Categories, materials, locations and suppliers repeat across a whole file
+_repeated_text = lru_cache(maxsize=4096)(_text)
+_repeated_material = lru_cache(maxsize=4096)(style_materials.parse_material)
+
+
+def _scalar(raw: dict, key: str):
+    value = raw.get(key)
+    if isinstance(value, (list, dict)):
+        raise ValueError(f"{key} must be a single value")
+    return value
+
+
+def normalize(raw, default_collection_id: Optional[str], collection_ids: set) -> dict:
+    """Validated styles column values for one raw row; raises ValueError with the reason"""
+    if isinstance(raw, Exception):
+        raise raw
+    if not isinstance(raw, dict):
+        raise ValueError("Row must be an object")
+
+    name = _text(_scalar(raw, "name"))
+    category = _repeated_text(_scalar(raw, "category"))
+    if not name:
+        raise ValueError("name is required")
+    if not category:
+        raise ValueError("category is required")
+
+    collection_id = str(_scalar(raw, "collection_id") or default_collection_id or "").strip()
+    if not collection_id:
+        raise ValueError("collection_id is required")
+    if collection_id not in collection_ids:
+        raise ValueError(f"Unknown collection_id {collection_id!r}")
+
+    materials = raw.get("materials") or []
+    if isinstance(materials, str):
+        materials = _MATERIAL_SEPARATORS.split(materials)
+    if not isinstance(materials, list):
+        raise ValueError("materials must be a list or a comma separated string")
+    materials = [_repeated_material(_repeated_text(m)) for m in materials if m is not None and str(m).strip()]
+
+    target_price = _scalar(raw, "target_price")
+    if target_price in (None, ""):
+        target_price = None
+    else:
+        try:
+            target_price = float(str(target_price).replace(",", "."))
+        except ValueError:
+            raise ValueError(f"Invalid target_price {target_price!r}")
+
+    return {
+        "name": name,
+        "collection_id": collection_id,
+        "category": category,
+        "materials": [name for name, _ in materials],
+        "material_shares": [share for _, share in materials],
+        "target_price": target_price,
+        "production_location": _repeated_text(_scalar(raw, "production_location")),
+        "supplier": _repeated_text(_scalar(raw, "supplier")),
+        "status": _repeated_text(_scalar(raw, "status")) or "design",
+    }
+
+
+def _write_chunk(db: Session, rows: List[dict]):
+    carbon = carbon_engine.footprints([r["materials"] for r in rows], [r["production_location"] for r in rows])
+    now = datetime.utcnow()
+    for row, footprint in zip(rows, carbon.tolist()):
+        row["id"] = str(uuid.uuid4())
+        row["carbon_footprint"] = footprint
+        row["created_at"] = now
+    shares = [row.pop("material_shares") for row in rows]
+    db.execute(insert(Style.__table__), rows)
+    material_rows = [
+        material for row, row_shares in zip(rows, shares)
+        for material in style_materials.rows(row["id"], row["materials"], row_shares)
+    ]
+    if material_rows:
+        db.execute(insert(StyleMaterial.__table__), material_rows)
+    changes = [
+        (None, rollups.StyleSnapshot(row["id"], row["carbon_footprint"], row["materials"],
+                                     row["production_location"], row["supplier"]))
+        for row in rows
+    ]
+    rollups.apply_style_changes(db, changes)
+    emissions.record_bulk_style_changes(db, changes, "import", now)
+    db.commit()
+
+
+def import_stream(db: Session, stream: IO[bytes], fmt: str,
+                  default_collection_id: Optional[str] = None, chunk_size: int = CHUNK_SIZE,
+                  write_lock=nullcontext) -> dict:
+    """Import every valid row; invalid rows are skipped and reported with their line numbers
+
+    `write_lock()` is entered around each chunk's transaction only, so parsing
+    doesn't hold up the app's other writers.
+    """
+    started = time.perf_counter()
+    collection_ids = set(db.execute(select(Collection.id)).scalars())
+    imported = rejected = 0
+    errors = []
+    chunk = []
+
+    for line_number, raw in iter_rows(stream, fmt):
+        try:
+            chunk.append(normalize(raw, default_collection_id, collection_ids))
+        except (ValueError, TypeError) as e:
+            rejected += 1
+            if len(errors) < MAX_REPORTED_ERRORS:
+                errors.append({"line": line_number, "error": str(e)})
+            continue
+        if len(chunk) >= chunk_size:
+            with write_lock():
+                _write_chunk(db, chunk)
+            imported += len(chunk)
+            chunk = []
+
+    if chunk:
+        with write_lock():
+            _write_chunk(db, chunk)
+        imported += len(chunk)
+
+    seconds = time.perf_counter() - started
+    return {
+        "imported": imported,
+        "rejected": rejected,
+        "errors": errors,
+        "seconds": round(seconds, 3),
+        "styles_per_second": round(imported / seconds) if seconds else 0,
+    }
+
+
+if __name__ == "__main__":
+    import search
+    from database import SessionLocal, init_db
+
+    args = sys.argv[1:]
+    if not args or args[0].startswith("-"):
+        print("Usage: python style_import.py FILE.csv|FILE.jsonl [--collection-id ID] [--format csv|jsonl] [--chunk-size N]")
+        sys.exit(1)
+
+    def option(name, default=None):
+        return args[args.index(name) + 1] if name in args else default
+
+    path = args[0]
+    init_db()
+    db = SessionLocal()
+    try:
+        with open(path, "rb") as f:
+            result = import_stream(
+                db, f, detect_format(path, option("--format")),
+                default_collection_id=option("--collection-id"),
+                chunk_size=int(option("--chunk-size", CHUNK_SIZE)),
+            )
+        after_id = ""
+        while after_id is not None:
+            after_id = search.index_missing_styles(db, after_id)
+            db.commit()
+    finally:
+        db.close()
+    for error in result.pop("errors"):
+        print(f"  satır {error['line']}: {error['error']}")
+    print(f"Import complete: {result}")
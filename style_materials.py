@@ -0,0 +1,172 @@
+"""Normalized style materials: one style_materials row per entry of Style.materials
+
+Style.materials stays the JSON array the pages, passports and the carbon
+engine read. Every write path that sets it also writes the matching rows
+(same order, `position` = array index), in the same transaction:
+
+    create_style        entries()          ORM objects, flushed after the style
+    style_import        rows() + insert    core executemany after the styles
+    text_repair         sync()             renamed materials, percentages kept
+
+Material analytics are then a GROUP BY over ix_style_materials_material_style_id
+joined to styles by primary key, instead of loading every style and
+exploding the arrays in Python.
+
+A material may carry its composition share ("%60 pamuk", "pamuk 60%"): the
+name goes into Style.materials (so carbon factors still match) and the share
+into style_materials.percentage.
+
+Rows are backfilled from the JSON by migration 0003; to re-run that for
+styles that have no rows (e.g. written by an older deploy during a rollout):
+
+    python style_materials.py backfill
+"""
+import re
+import sys
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+
+from sqlalchemy import delete, func, insert, select, text
+from sqlalchemy.orm import Session
+
+from models import Style, StyleMaterial
+
+# Sürdürülebilirlik skorları (basitleştirilmiş); listede olmayan malzemeler 5
+SUSTAINABILITY_SCORES = {
+    "organik_pamuk": 9, "keten": 8, "yün": 6, "pamuk": 5,
+    "ipek": 4, "polyester": 3, "naylon": 2, "akrilik": 1
+}
+DEFAULT_SCORE = 5
+RANKING_SIZE = 5
+
+_NUMBER = r"(\d+(?:[.,]\d+)?)"
+_PREFIX_SHARE = re.compile(rf"^(?:%\s*{_NUMBER}|{_NUMBER}\s*%)\s+(.+)$")
+_SUFFIX_SHARE = re.compile(rf"^(.+?)\s*\(?\s*(?:%\s*{_NUMBER}|{_NUMBER}\s*%)\s*\)?$")
+
+BACKFILL_SQL = {
+    "sqlite": """
+        INSERT INTO style_materials (style_id, position, material)
+        SELECT styles.id, CAST(entry.key AS INTEGER), entry.value
+        FROM styles, json_each(CASE WHEN json_valid(styles.materials) AND json_type(styles.materials) = 'array'
+                                    THEN styles.materials ELSE '[]' END) AS entry
+        WHERE entry.type = 'text'
+          AND NOT EXISTS (SELECT 1 FROM style_materials WHERE style_materials.style_id = styles.id)
+    """,
+    "postgresql": """
+        INSERT INTO style_materials (style_id, position, material)
+        SELECT styles.id, entry.ordinality - 1, entry.value #>> '{}'
+        FROM styles CROSS JOIN LATERAL json_array_elements(
+                CASE WHEN json_typeof(styles.materials::json) = 'array' THEN styles.materials::json ELSE '[]'::json END
+             ) WITH ORDINALITY AS entry(value, ordinality)
+        WHERE json_typeof(entry.value) = 'string'
+          AND NOT EXISTS (SELECT 1 FROM style_materials WHERE style_materials.style_id = styles.id)
+    """,
+}
+
+
+def parse_material(entry: str) -> Tuple[str, Optional[float]]:
+    """("pamuk", 60.0) for "%60 pamuk", "60% pamuk", "pamuk %60" or "pamuk (60%)"; no share -> None"""
+    entry = entry.strip()
+    match = _PREFIX_SHARE.match(entry)
+    if match:
+        number = match.group(1) or match.group(2)
+        return match.group(3).strip(), float(number.replace(",", "."))
+    match = _SUFFIX_SHARE.match(entry)
+    if match and match.group(1).strip():
+        number = match.group(2) or match.group(3)
+        return match.group(1).strip(), float(number.replace(",", "."))
+    return entry, None
+
+
+def split_shares(entries: Iterable[str]) -> Tuple[List[str], List[Optional[float]]]:
+    """Material names (for Style.materials) and their shares, in input order"""
+    names, shares = [], []
+    for entry in entries:
+        name, share = parse_material(entry)
+        names.append(name)
+        shares.append(share)
+    return names, shares
+
+
+def rows(style_id: str, materials: Sequence, percentages: Optional[Sequence[Optional[float]]] = None) -> List[dict]:
+    """style_materials rows for one style (non-text array entries are skipped, like the backfill)"""
+    return [
+        {"style_id": style_id, "position": position, "material": material,
+         "percentage": percentages[position] if percentages and position < len(percentages) else None}
+        for position, material in enumerate(materials or [])
+        if isinstance(material, str)
+    ]
+
+
+def entries(style_id: str, materials: Sequence, percentages: Optional[Sequence[Optional[float]]] = None) -> List[StyleMaterial]:
+    return [StyleMaterial(**row) for row in rows(style_id, materials, percentages)]
+
+
+def sync(db: Session, materials_by_style: Dict[str, Sequence]):
+    """Rewrite the rows of these styles after their materials changed; shares stay with their position"""
+    if not materials_by_style:
+        return
+    style_ids = list(materials_by_style)
+    shares = {}
+    for style_id, position, percentage in db.execute(
+        select(StyleMaterial.style_id, StyleMaterial.position, StyleMaterial.percentage)
+        .where(StyleMaterial.style_id.in_(style_ids), StyleMaterial.percentage.isnot(None))
+    ):
+        shares.setdefault(style_id, {})[position] = percentage
+    db.execute(delete(StyleMaterial).where(StyleMaterial.style_id.in_(style_ids)))
+    new_rows = []
+    for style_id, materials in materials_by_style.items():
+        style_shares = shares.get(style_id, {})
+        new_rows.extend(rows(style_id, materials, [style_shares.get(i) for i in range(len(materials or []))]))
+    if new_rows:
+        db.execute(insert(StyleMaterial), new_rows)
+
+
+def backfill(db: Session) -> int:
+    """Create the rows of every style that has none yet, straight from the JSON (caller commits)"""
+    return db.execute(text(BACKFILL_SQL[db.get_bind().dialect.name])).rowcount
+
+
+def grouped(db: Session) -> List[tuple]:
+    """(material, style count, total carbon) per material: one GROUP BY over the material index"""
+    carbon = func.coalesce(Style.carbon_footprint, 0)
+    return db.execute(
+        select(StyleMaterial.material, func.count(), func.coalesce(func.sum(carbon), 0.0))
+        .join(Style, Style.id == StyleMaterial.style_id)
+        .group_by(StyleMaterial.material)
+    ).all()
+
+
+def material_analysis(db: Session) -> dict:
+    """Per-material usage, carbon and score, best first, plus the best and worst rankings"""
+    material_stats = {}
+    for material, count, total in grouped(db):
+        material_stats[material] = {
+            "total_carbon": round(total, 2),
+            "avg_carbon": round(total / count, 2) if count else 0,
+            "usage_count": count,
+            "sustainability_score": SUSTAINABILITY_SCORES.get(material.lower(), DEFAULT_SCORE),
+        }
+    ranked = sorted(material_stats.items(), key=lambda x: (x[1]["sustainability_score"], -x[1]["avg_carbon"]),
+                    reverse=True)
+    return {
+        "material_stats": dict(ranked),
+        "best_materials": ranked[:RANKING_SIZE],
+        "worst_materials": ranked[::-1][:RANKING_SIZE],
+    }
+
+
+if __name__ == "__main__":
+    from database import SessionLocal, init_db
+
+    if sys.argv[1:] != ["backfill"]:
+        print("Usage: python style_materials.py backfill")
+        sys.exit(1)
+
+    init_db()
+    db = SessionLocal()
+    try:
+        created = backfill(db)
+        db.commit()
+        print(f"style_materials backfill: {created} rows created")
+    finally:
+        db.close()
@@ -0,0 +1,43 @@
+"""Shared fixtures: one throwaway migrated SQLite database for the whole run
+
+DATABASE_URL is set before any app module is imported, so the tests never
+touch mango_dpp.db. `db` is a session on it; every row a test wrote is
+deleted afterwards.
+"""
+import os
+import sys
+import tempfile
+
+import pytest
+
+REPO_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, REPO_DIR)
+
+_tmp = tempfile.TemporaryDirectory()
+os.environ["DATABASE_URL"] = f"sqlite:///{_tmp.name}/test.db"
+os.environ.pop("ASYNC_DATABASE_URL", None)
+os.environ.pop("ANCHOR_RPC_URL", None)
+os.environ["ANCHOR_CHAIN"] = "local"
+
+
+@pytest.fixture(scope="session")
+def migrated():
+    from database import init_db
+
+    init_db()
+
+
+@pytest.fixture
+def db(migrated):
+    from database import SessionLocal
+    from models import Base
+
+    session = SessionLocal()
+    try:
+        yield session
+    finally:
+        session.rollback()
+        for table in reversed(Base.metadata.sorted_tables):
+            session.execute(table.delete())
+        session.commit()
+        session.close()
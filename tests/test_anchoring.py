@@ -0,0 +1,109 @@
+import hashlib
+
+import pytest
+from eth_account import Account
+from web3 import Web3
+
+import anchoring
+from models import AnchorBatch, NFTPassport, PassportAnchor, PassportAnchorHistory
+
+
+def _hashes(count: int):
+    return [hashlib.sha256(str(i).encode()).hexdigest() for i in range(count)]
+
+
+@pytest.mark.parametrize("count", list(range(1, 18)) + [31, 33, 255, 1023])
+def test_every_leaf_proves_against_the_root(count):
+    hashes = _hashes(count)
+    levels = anchoring.merkle_levels([anchoring.leaf_hash(h) for h in hashes])
+    root = levels[-1][0].hex()
+    assert len(levels[-1]) == 1
+    for index, digest in enumerate(hashes):
+        proof = anchoring.merkle_proof(levels, index)
+        assert anchoring.verify_proof(digest, proof, root)
+        assert not anchoring.verify_proof(_hashes(count + 1)[-1], proof, root)
+
+
+def test_tampered_proofs_fail():
+    hashes = _hashes(7)
+    levels = anchoring.merkle_levels([anchoring.leaf_hash(h) for h in hashes])
+    root = levels[-1][0].hex()
+    proof = anchoring.merkle_proof(levels, 6)  # the odd leaf moves up unpaired
+    assert anchoring.verify_proof(hashes[6], proof, root)
+    flipped = [["R" if side == "L" else "L", sibling] for side, sibling in proof]
+    assert not anchoring.verify_proof(hashes[6], flipped, root)
+    assert not anchoring.verify_proof(hashes[6], proof[:-1], root)
+    # An inner node can't pass for a leaf
+    inner = levels[1][0].hex()
+    assert not anchoring.verify_proof(inner, anchoring.merkle_proof(levels, 0)[1:], root)
+
+
+def test_local_chain_round_trip():
+    chain = anchoring.Web3Chain(Web3(anchoring.LocalChainProvider()), Account.create().key)
+    roots = [hashlib.sha256(b"a").digest(), hashlib.sha256(b"b").digest()]
+    receipts = [chain.anchor(root) for root in roots]
+    assert [r.block_number for r in receipts] == [1, 2]
+    assert receipts[0].chain_id == anchoring.LocalChainProvider.CHAIN_ID
+    assert [chain.root_of(r.tx_hash) for r in receipts] == [root.hex() for root in roots]
+    assert chain.root_of("0x" + "00" * 32) is None
+
+
+def _add_passports(db, count: int):
+    passports = []
+    for i in range(count):
+        passport = {field: None for field in anchoring.CONTENT_FIELDS}
+        passport.update(id=f"p{i}", product_code=f"MNG-{i}", name=f"Gömlek {i}", materials=["pamuk"],
+                        certificates=[], carbon_footprint=2.5)
+        passport["blockchain_hash"] = anchoring.content_hash(passport)
+        db.add(NFTPassport(**passport))
+        passports.append(passport)
+    db.flush()
+    anchoring.add_pending(db, passports)
+    db.commit()
+    return passports
+
+
+def test_requeue_keeps_the_old_proof_as_history(db):
+    _add_passports(db, 3)
+    batch = anchoring.seal_batch(db)
+    chain = anchoring.Web3Chain(Web3(anchoring.LocalChainProvider()), Account.create().key)
+    anchoring.mark_anchored(db, batch.id, chain.anchor(bytes.fromhex(batch.merkle_root)))
+    db.commit()
+    old = anchoring.proof_for(db, "p1")
+    assert old["status"] == "anchored" and old["proof_valid"] and old["content_unchanged"]
+
+    db.get(NFTPassport, "p1").name = "Şık Gömlek"
+    db.commit()
+    assert not anchoring.proof_for(db, "p1")["content_unchanged"]
+
+    anchoring.requeue(db, ["p1", "p2"])  # p2 is unchanged
+    db.commit()
+    db.expire_all()
+    proof = anchoring.proof_for(db, "p1")
+    assert proof["status"] == "pending" and proof["content_unchanged"]
+    assert proof["content_hash"] == db.get(NFTPassport, "p1").blockchain_hash != old["content_hash"]
+    assert [entry["content_hash"] for entry in proof["history"]] == [old["content_hash"]]
+    assert proof["history"][0]["proof_valid"] and proof["history"][0]["batch"]["status"] == "anchored"
+    assert anchoring.proof_for(db, "p2")["status"] == "anchored"
+    assert db.query(PassportAnchorHistory).count() == 1
+
+    # The next batch anchors the new content; the old proof stays verifiable
+    batch = anchoring.seal_batch(db)
+    assert batch.leaf_count == 1
+    anchoring.mark_anchored(db, batch.id, chain.anchor(bytes.fromhex(batch.merkle_root)))
+    db.commit()
+    proof = anchoring.proof_for(db, "p1")
+    assert proof["status"] == "anchored" and proof["proof_valid"] and proof["history"][0]["proof_valid"]
+
+
+def test_requeue_of_a_pending_passport_only_updates_its_hash(db):
+    _add_passports(db, 1)
+    db.get(NFTPassport, "p0").name = "Şık"
+    db.commit()
+    anchoring.requeue(db, ["p0"])
+    db.commit()
+    db.expire_all()
+    anchor = db.get(PassportAnchor, "p0")
+    assert anchor.batch_id is None and anchor.content_hash == db.get(NFTPassport, "p0").blockchain_hash
+    assert db.query(PassportAnchorHistory).count() == 0
+    assert db.query(AnchorBatch).count() == 0
@@ -0,0 +1,105 @@
+import asyncio
+from datetime import datetime, timedelta
+
+import pytest
+
+import database
+import jobs
+from models import Job
+
+
+@jobs.handler("test_ok")
+async def ok_job(job):
+    return {"echo": job.payload["value"]}
+
+
+@jobs.handler("test_fail")
+async def failing_job(job):
+    raise RuntimeError("boom")
+
+
+def run(coro):
+    async def main():
+        try:
+            return await coro
+        finally:
+            await database.async_engine.dispose()
+    return asyncio.run(main())
+
+
+@pytest.fixture
+def enqueue(db):
+    def add(kind: str, max_attempts: int = 3) -> str:
+        job = jobs.new_job(kind, {"value": 7}, max_attempts=max_attempts)
+        db.add(job)
+        db.commit()
+        return job.id
+    return add
+
+
+def reload(db, job_id: str) -> Job:
+    db.expire_all()
+    return db.get(Job, job_id)
+
+
+def expire_lease(db, job_id: str):
+    job = reload(db, job_id)
+    job.lease_expires_at = datetime.utcnow() - timedelta(seconds=1)
+    db.commit()
+
+
+def test_claimed_once_and_finished(db, enqueue):
+    job_id = enqueue("test_ok")
+    pool, other = jobs.WorkerPool(0), jobs.WorkerPool(0)
+    other.worker_id = "other:1"
+
+    job = run(pool._claim())
+    assert job.id == job_id and job.status == "running" and job.attempts == 1
+    assert run(other._claim()) is None
+
+    run(pool._run(job))
+    job = reload(db, job_id)
+    assert job.status == "succeeded" and job.result == {"echo": 7} and job.locked_by is None
+
+
+def test_failed_job_retried_with_backoff_until_max_attempts(db, enqueue):
+    job_id = enqueue("test_fail", max_attempts=2)
+    pool = jobs.WorkerPool(0)
+
+    run(pool._run(run(pool._claim())))
+    job = reload(db, job_id)
+    assert job.status == "queued" and job.error == "boom" and job.available_at > datetime.utcnow()
+    assert run(pool._claim()) is None  # backing off
+
+    job.available_at = datetime.utcnow() - timedelta(seconds=1)
+    db.commit()
+    run(pool._run(run(pool._claim())))
+    job = reload(db, job_id)
+    assert job.status == "failed" and job.attempts == 2
+
+
+def test_expired_lease_reclaimed_while_attempts_left(db, enqueue):
+    job_id = enqueue("test_ok", max_attempts=2)
+    crashed, pool = jobs.WorkerPool(0), jobs.WorkerPool(0)
+    crashed.worker_id = "crashed:1"
+
+    run(crashed._claim())
+    assert run(pool._claim()) is None  # lease still held
+    expire_lease(db, job_id)
+    job = run(pool._claim())
+    assert job.id == job_id and job.attempts == 2 and job.locked_by == pool.worker_id
+
+    run(crashed._finish(job, result={"late": True}))  # the old worker no longer owns it
+    assert reload(db, job_id).status == "running"
+
+
+def test_expired_lease_on_last_attempt_fails(db, enqueue):
+    job_id = enqueue("test_ok", max_attempts=1)
+    crashed, pool = jobs.WorkerPool(0), jobs.WorkerPool(0)
+    crashed.worker_id = "crashed:1"
+
+    run(crashed._claim())
+    expire_lease(db, job_id)
+    assert run(pool._claim()) is None
+    job = reload(db, job_id)
+    assert job.status == "failed" and job.attempts == 1 and "Lease expired" in job.error
@@ -0,0 +1,50 @@
+from datetime import datetime
+
+from alembic import command
+from sqlalchemy import create_engine, inspect, text
+
+import database
+import listings
+from models import Collection, Style
+
+
+def _add_styles(db, created_at, count):
+    db.add(Collection(id="c1", name="Yaz", season="Yaz", year=2026, created_at=created_at))
+    db.add_all([
+        Style(id=f"s{i:02}", name=f"Stil {i}", collection_id="c1", category="Elbise", created_at=created_at)
+        for i in range(count)
+    ])
+    db.commit()
+
+
+def test_pages_cover_every_row_once_when_created_at_ties(db):
+    _add_styles(db, datetime(2026, 1, 1), 7)
+    seen, cursor = [], None
+    while True:
+        page = listings.list_styles(db, {}, cursor, limit=3)
+        seen += [style.id for style in page.items]
+        cursor = page.next_cursor
+        if cursor is None:
+            break
+    assert seen == sorted(seen, reverse=True) and len(seen) == 7
+
+
+def test_migration_backfills_null_created_at(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path}/legacy.db")
+    with engine.connect() as connection:
+        command.upgrade(database.alembic_config_for(connection), "0011")
+        connection.execute(text("INSERT INTO collections (id, name, season, year) VALUES ('old', 'Eski', 'Kış', 2020)"))
+        for row_id, created_at in (("a", "2025-01-01 00:00:00.000000"), ("b", "2026-01-01 00:00:00.000000")):
+            connection.execute(
+                text("INSERT INTO collections (id, name, season, year, created_at) VALUES (:id, 'Yeni', 'Yaz', 2026, :created_at)"),
+                {"id": row_id, "created_at": created_at},
+            )
+        connection.commit()
+        command.upgrade(database.alembic_config_for(connection), "head")
+        connection.commit()
+        rows = connection.execute(text("SELECT id, created_at FROM collections ORDER BY created_at DESC, id DESC")).all()
+        nullable = {c["name"]: c["nullable"] for c in inspect(connection).get_columns("collections")}
+    engine.dispose()
+    # The legacy row takes the oldest timestamp, so it stays at the end of the newest-first listing
+    assert [row.id for row in rows] == ["b", "old", "a"] and rows[1].created_at == rows[2].created_at
+    assert not nullable["created_at"]
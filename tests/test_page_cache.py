@@ -0,0 +1,27 @@
+from datetime import datetime
+
+from sqlalchemy import insert
+
+import page_cache
+from models import CacheInvalidation
+
+
+def test_sync_reads_the_log_at_most_once_per_interval(db, monkeypatch):
+    monkeypatch.setattr(page_cache, "PAGE_CACHE_SYNC_INTERVAL", 60)
+    monkeypatch.setattr(page_cache, "_last_seen", None)
+    monkeypatch.setattr(page_cache, "_next_sync", 0.0)
+    page_cache.sync(db)
+    page_cache.passport_pages.set(("p1", "tr"), "page", [("style", "s1")])
+
+    # Another worker changed the style
+    db.execute(insert(CacheInvalidation.__table__), [{"tag": "style", "ref_id": "s1", "created_at": datetime.utcnow()}])
+    db.commit()
+
+    assert not page_cache.sync_due()
+    page_cache.sync(db)
+    assert page_cache.passport_pages.get(("p1", "tr")) == "page"
+
+    monkeypatch.setattr(page_cache, "_next_sync", 0.0)
+    assert page_cache.sync_due()
+    page_cache.sync(db)
+    assert page_cache.passport_pages.get(("p1", "tr")) is None
@@ -0,0 +1,38 @@
+import asyncio
+from datetime import datetime
+
+import database
+import main
+import passport_batch
+from models import Collection, Job, NFTPassport, Style
+
+
+def test_batch_renders_qr_codes_without_holding_a_connection(db, monkeypatch):
+    db.add(Collection(id="c1", name="Yaz", season="Yaz", year=2026, created_at=datetime.utcnow()))
+    db.add_all([
+        Style(id=f"s{i}", name=f"Stil {i}", collection_id="c1", category="Elbise", materials=["pamuk"], created_at=datetime.utcnow())
+        for i in range(5)
+    ])
+    db.commit()
+
+    render = passport_batch.render_qr_codes
+    in_use = []
+
+    async def counting_render(urls):
+        in_use.append(database.async_engine.sync_engine.pool.checkedout())
+        return await render(urls)
+
+    monkeypatch.setattr(passport_batch, "CHUNK_SIZE", 2)
+    monkeypatch.setattr(passport_batch, "render_qr_codes", counting_render)
+    job = Job(id="batch-test", kind="generate_nft_batch", payload={"collection_id": "c1"})
+
+    async def run():
+        try:
+            return await main.generate_nft_batch_job(job)
+        finally:
+            passport_batch.shutdown()
+            await database.async_engine.dispose()
+
+    assert asyncio.run(run()) == {"requested": 5, "created": 5}
+    assert in_use == [0, 0, 0]
+    assert db.query(NFTPassport).count() == 5
@@ -0,0 +1,51 @@
+import pytest
+from sqlalchemy.dialects.postgresql import asyncpg as pg_asyncpg
+
+import listings
+import search
+
+
+def test_first_page_binds_no_cursor():
+    for dialect in search.SEARCH_SQL:
+        sql, params = search.tier_statement(dialect, ["gomlek"], 0, "style", None, 25)
+        assert "before" not in params
+        assert ":before" not in sql.text
+
+
+def test_postgresql_parameters_fit_int4():
+    # asyncpg binds search_documents.id as int4 and rejects anything larger
+    for before in (None, 1, search.MAX_DOCUMENT_ID):
+        for tier in range(search.TIERS):
+            sql, params = search.tier_statement("postgresql", ["kis", "gom"], tier, "style", before, 25)
+            compiled = sql.bindparams(**params).compile(dialect=pg_asyncpg.dialect())
+            assert "$" in str(compiled)
+            for value in compiled.params.values():
+                if isinstance(value, int):
+                    assert -2 ** 31 <= value <= 2 ** 31 - 1
+
+
+def test_cursor_outside_int4_is_rejected():
+    hit = search.Hit("style", "x", "t", "", "/", 2 ** 62, 0)
+    with pytest.raises(listings.InvalidCursor):
+        search.decode_cursor(search.encode_cursor(hit))
+    hit = hit._replace(id=search.MAX_DOCUMENT_ID)
+    assert search.decode_cursor(search.encode_cursor(hit)) == (0, search.MAX_DOCUMENT_ID)
+
+
+def _document(i: int, title: str, body: str) -> dict:
+    return {"kind": "style", "ref_id": f"s{i:03d}", "title": title, "detail": "", "url": "/styles",
+            "search_title": search.fold_for_search(title), "search_body": search.fold_for_search(body)}
+
+
+def test_pages_walk_both_tiers_once(db):
+    search.upsert(db, [_document(i, f"Gömlek {i}", "pamuk") for i in range(7)]
+                  + [_document(100 + i, f"Elbise {i}", "gömlek kumaşı") for i in range(6)])
+    titles, cursor = [], None
+    while True:
+        page = search.search(db, "gomlek", cursor=cursor, limit=4)
+        titles.extend(hit.title for hit in page.items)
+        cursor = page.next_cursor
+        if cursor is None:
+            break
+    assert len(titles) == len(set(titles)) == 13
+    assert titles[:7] == [f"Gömlek {i}" for i in reversed(range(7))]
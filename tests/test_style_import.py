@@ -0,0 +1,30 @@
+import csv
+import io
+import json
+
+import style_import
+
+
+def _rows(data: bytes, fmt: str):
+    return [(line, str(raw) if isinstance(raw, Exception) else raw)
+            for line, raw in style_import.iter_rows(io.BytesIO(data), fmt)]
+
+
+def test_invalid_utf8_only_rejects_its_line():
+    data = (json.dumps({"name": "A"}) + "\n").encode() + b'{"name": "\xff"}\n' + (json.dumps({"name": "C"}) + "\n").encode()
+    assert _rows(data, "jsonl") == [(1, {"name": "A"}), (2, "Invalid UTF-8"), (3, {"name": "C"})]
+
+
+def test_csv_errors_only_reject_their_row():
+    old = csv.field_size_limit(20)
+    try:
+        data = "﻿name,category\n".encode() + b"A,x\nB\xff,x\n" + b"C" * 50 + b',x\n"D\nE",x\n'
+        rows = _rows(data, "csv")
+    finally:
+        csv.field_size_limit(old)
+    assert rows == [
+        (2, {"name": "A", "category": "x"}),
+        (3, "Invalid UTF-8"),
+        (4, "Invalid CSV: field larger than field limit (20)"),
+        (6, {"name": "D\nE", "category": "x"}),
+    ]
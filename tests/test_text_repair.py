@@ -0,0 +1,64 @@
+from datetime import datetime
+
+import pytest
+from sqlalchemy import func, select
+
+import carbon_engine
+import emissions
+import rollups
+import search
+import style_materials
+import text_repair
+from models import Collection, EmissionMonthly, RollupMaterial, RollupTotals, Style, StyleMaterial
+
+
+@pytest.fixture
+def broken_style(db):
+    """A style stored before input was normalized, booked like the create path books it"""
+    db.add(Collection(id="c1", name="KÄ±ÅŸ", season="Yaz", year=2025, description="", created_at=datetime.utcnow()))
+    style = Style(id="s1", name="GÃ¶mlek", collection_id="c1", category="Elbise", materials=["yÃ¼n", "pamuk"],
+                  production_location="Ã‡in", supplier="ABC", status="design",
+                  carbon_footprint=carbon_engine.footprint(["yÃ¼n", "pamuk"], "Ã‡in"), created_at=datetime.utcnow())
+    db.add(style)
+    db.flush()
+    change = [(None, rollups.snapshot(style))]
+    rollups.apply_style_changes(db, change)
+    emissions.record_style_changes(db, change, "create")
+    style_materials.sync(db, {"s1": style.materials})
+    search.index_styles(db, ["s1"])
+    db.commit()
+    return style
+
+
+def test_dry_run_changes_nothing(db, broken_style):
+    result = text_repair.repair_all(db, dry_run=True)
+    assert result["tables"]["styles"] == {"scanned": 1, "repaired": 1}
+    db.expire_all()
+    assert db.get(Style, "s1").name == "GÃ¶mlek"
+
+
+def test_repair_moves_footprint_rollups_emissions_and_search(db, broken_style):
+    old = broken_style.carbon_footprint
+    new = carbon_engine.footprint(["yün", "pamuk"], "Çin")
+    assert new != old
+
+    result = text_repair.repair_all(db)
+    assert result["tables"]["collections"]["repaired"] == 1
+    assert result["tables"]["styles"]["repaired"] == 1
+
+    db.expire_all()
+    style = db.get(Style, "s1")
+    assert (style.name, style.materials, style.production_location) == ("Gömlek", ["yün", "pamuk"], "Çin")
+    assert style.carbon_footprint == pytest.approx(new)
+    assert db.get(Collection, "c1").name == "Kış"
+
+    assert db.get(RollupTotals, 1).total_carbon == pytest.approx(new)
+    materials = dict(db.execute(select(RollupMaterial.material, RollupMaterial.style_count)).all())
+    assert materials == {"yün": 1, "pamuk": 1}
+    assert db.execute(select(StyleMaterial.material).order_by(StyleMaterial.position)).scalars().all() == ["yün", "pamuk"]
+    assert db.execute(select(func.sum(EmissionMonthly.kg_co2))).scalar() == pytest.approx(new)
+
+    assert [hit.ref_id for hit in search.search(db, "gomlek", kind="style").items] == ["s1"]
+
+    # Nothing left to repair
+    assert text_repair.repair_all(db)["tables"]["styles"]["repaired"] == 0
@@ -0,0 +1,68 @@
+import random
+
+import pytest
+
+from turkish_text import fix_turkish_encoding, mojibake
+
+
+# The repair as it was before turkish_text.py (main.py), kept verbatim as the reference
+def legacy_fix_turkish_encoding(text):
+    """Fix Turkish character encoding issues"""
+    if not text:
+        return text
+    
+    # Common Turkish character fixes - comprehensive mapping
+    replacements = {
+        'Ä°': 'İ',  # Capital I with dot
+        'Ä±': 'ı',  # Lowercase dotless i
+        'Ã¼': 'ü',  # u with umlaut
+        'Ã–': 'Ö',  # Capital O with umlaut
+        'Ã¶': 'ö',  # o with umlaut
+        'Ã‡': 'Ç',  # Capital C with cedilla
+        'Ã§': 'ç',  # c with cedilla
+        'Åž': 'Ş',  # Capital S with cedilla
+        'ÅŸ': 'ş',  # s with cedilla
+        'Å ': 'Ş',  # Alternative Capital S with cedilla
+        'Å¡': 'ş',  # Alternative s with cedilla
+        'Åı': 'Şı', # Specific combination
+        'Åık': 'Şık', # Common word
+        'Äž': 'Ğ',  # Capital G with breve
+        'ÄŸ': 'ğ',  # g with breve
+        'GÃ¶z': 'Göz',  # Common word
+        'alÄ±cÄ±': 'alıcı',  # Common word
+    }
+    
+    fixed_text = text
+    for wrong, correct in replacements.items():
+        fixed_text = fixed_text.replace(wrong, correct)
+    
+    return fixed_text
+
+
+LEGACY_PATTERNS = [
+    'Ä°', 'Ä±', 'Ã¼', 'Ã–', 'Ã¶', 'Ã‡', 'Ã§', 'Åž', 'ÅŸ', 'Å ', 'Å¡', 'Åı', 'Åık', 'Äž', 'ÄŸ', 'GÃ¶z', 'alÄ±cÄ±',
+]
+
+
+@pytest.mark.parametrize("wrong", LEGACY_PATTERNS)
+def test_agrees_with_legacy_on_each_pattern(wrong):
+    for text in (wrong, f"x{wrong}y", f"{wrong} {wrong}", f"Şık {wrong}ık"):
+        assert fix_turkish_encoding(text) == legacy_fix_turkish_encoding(text)
+
+
+def test_agrees_with_legacy_on_fuzzed_pattern_mixes():
+    alphabet = LEGACY_PATTERNS + list("abcıkGzlAŞşİ ") + list("çÇğĞıİöÖşŞüÜâÂîÎûÛ")
+    rng = random.Random(15)
+    for _ in range(20000):
+        text = "".join(rng.choice(alphabet) for _ in range(rng.randint(1, 8)))
+        assert fix_turkish_encoding(text) == legacy_fix_turkish_encoding(text), text
+
+
+def test_clean_text_is_returned_as_is():
+    for text in ("", None, "plain ascii", "Şık gömlek, İstanbul"):
+        assert fix_turkish_encoding(text) is text
+
+
+def test_repairs_every_turkish_letter():
+    letters = "çÇğĞıİöÖşŞüÜâÂîÎûÛ"
+    assert fix_turkish_encoding("".join(mojibake(c) for c in letters)) == letters
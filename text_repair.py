@@ -0,0 +1,156 @@
+"""Bulk mojibake repair for rows that were stored before input was normalized
+
+Walks collections, styles and passports in primary-key order, one chunk per
+transaction, runs every text (and JSON list of text) column through
+turkish_text.fix_turkish_encoding and bulk-updates only the rows that
+changed. Repaired style materials/locations change the carbon factors that
+apply, so those styles get a new footprint and the rollups move with them;
+repaired material names are rewritten in style_materials too, and repaired
+rows get their search documents refreshed. Repaired passports are rehashed
+and queued for anchoring again (anchoring.requeue), their previous proof is
+kept as history.
+
+Runs as the "repair_text" background job (POST /api/repair-text) or from the
+command line:
+
+    python text_repair.py [--chunk-size 1000] [--dry-run]
+"""
+import sys
+from collections import namedtuple
+from typing import List
+
+from sqlalchemy import func, select, update
+from sqlalchemy.orm import Session
+
+import anchoring
+import carbon_engine
+import emissions
+import rollups
+import search
+import style_materials
+from models import Collection, NFTPassport, Style
+from turkish_text import fix_turkish_encoding, needs_repair
+
+CHUNK_SIZE = 1000
+
+# Table -> (model, repaired columns)
+TARGETS = {
+    "collections": (Collection, ("name", "season", "description")),
+    "styles": (Style, ("name", "category", "materials", "production_location", "supplier", "status")),
+    "nft_passports": (NFTPassport, ("name", "collection_name", "materials", "production_location",
+                                    "supplier", "certificates", "additional_info")),
+}
+# Search documents to refresh for repaired rows (collections also refresh their styles)
+REINDEX = {
+    "collections": search.index_collections,
+    "styles": search.index_styles,
+    "nft_passports": search.index_passports,
+}
+# Style columns the carbon footprint is computed from
+CARBON_INPUTS = ("materials", "production_location")
+
+ChunkResult = namedtuple("ChunkResult", ["last_id", "scanned", "repaired"])
+
+
+def repair_value(value):
+    if isinstance(value, str):
+        return fix_turkish_encoding(value)
+    if isinstance(value, list):
+        return [fix_turkish_encoding(item) if isinstance(item, str) else item for item in value]
+    return value
+
+
+def _broken(value) -> bool:
+    if isinstance(value, list):
+        return any(isinstance(item, str) and needs_repair(item) for item in value)
+    return isinstance(value, str) and needs_repair(value)
+
+
+def count_rows(db: Session) -> int:
+    return sum(db.execute(select(func.count()).select_from(model)).scalar() for model, _ in TARGETS.values())
+
+
+def repair_chunk(db: Session, table: str, after_id: str = "", chunk_size: int = CHUNK_SIZE,
+                 dry_run: bool = False) -> ChunkResult:
+    """Repair the next chunk of `table` after primary key `after_id` (caller commits)"""
+    model, columns = TARGETS[table]
+    extra = (Style.carbon_footprint,) if model is Style else ()
+    rows = db.execute(
+        select(model.id, *[getattr(model, c) for c in columns], *extra)
+        .where(model.id > after_id)
+        .order_by(model.id)
+        .limit(chunk_size)
+    ).all()
+    if not rows:
+        return ChunkResult(None, 0, 0)
+
+    values, changes = [], []
+    for row in rows:
+        broken = [c for c in columns if _broken(getattr(row, c))]
+        if not broken:
+            continue
+        fixed = {c: repair_value(getattr(row, c)) for c in broken}
+        if model is Style and any(c in fixed for c in CARBON_INPUTS):
+            materials = fixed.get("materials", row.materials) or []
+            location = fixed.get("production_location", row.production_location)
+            fixed["carbon_footprint"] = carbon_engine.footprint(materials, location)
+            changes.append((
+                rollups.StyleSnapshot(row.id, row.carbon_footprint or 0, list(row.materials or []),
+                                      row.production_location, row.supplier),
+                rollups.StyleSnapshot(row.id, fixed["carbon_footprint"], list(materials),
+                                      location, fixed.get("supplier", row.supplier)),
+            ))
+        values.append({"id": row.id, **fixed})
+
+    if values and not dry_run:
+        db.execute(update(model), values)
+        if model is Style:
+            style_materials.sync(db, {v["id"]: v["materials"] for v in values if "materials" in v})
+        if changes:
+            rollups.apply_style_changes(db, changes)
+            emissions.record_style_changes(db, changes, "repair")
+        if model is Style:
+            # The ranking keeps its own copy of names, materials and locations
+            rollups.refresh_low_carbon_styles(db)
+        if model is NFTPassport:
+            # The anchored blockchain_hash covers these columns
+            anchoring.requeue(db, [v["id"] for v in values])
+        REINDEX[table](db, [v["id"] for v in values])
+    return ChunkResult(rows[-1].id, len(rows), len(values))
+
+
+def repair_all(db: Session, chunk_size: int = CHUNK_SIZE, dry_run: bool = False) -> dict:
+    result = {}
+    for table in TARGETS:
+        scanned = repaired = 0
+        after_id = ""
+        while True:
+            chunk = repair_chunk(db, table, after_id, chunk_size, dry_run)
+            if chunk.last_id is None:
+                break
+            db.commit()
+            after_id = chunk.last_id
+            scanned += chunk.scanned
+            repaired += chunk.repaired
+        print(f"{table}: {scanned} satır tarandı, {repaired} onarıldı")
+        result[table] = {"scanned": scanned, "repaired": repaired}
+    return {"tables": result, "dry_run": dry_run}
+
+
+def _option(args: List[str], name: str, default: int) -> int:
+    if name in args:
+        return int(args[args.index(name) + 1])
+    return default
+
+
+if __name__ == "__main__":
+    from database import SessionLocal, init_db
+
+    args = sys.argv[1:]
+    init_db()
+    db = SessionLocal()
+    try:
+        result = repair_all(db, _option(args, "--chunk-size", CHUNK_SIZE), dry_run="--dry-run" in args)
+        print(f"Repair complete: {result}")
+    finally:
+        db.close()
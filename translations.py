@@ -1,6 +1,8 @@
 """
 Multi-language support for Mango DPP Platform
 """
+from types import MappingProxyType
+from typing import Mapping, Optional
 
 translations = {
     "tr": {
@@ -27,12 +29,6 @@ translations = {
         "create_style_desc": "Stil tasarımı ve numune ekle",
         "create_nft_desc": "Dijital ürün kimliği oluştur",
         "quick_actions": "Hızlı İşlemler",
-        "new_collection": "Yeni Koleksiyon",
-        "new_style": "Yeni Stil",
-        "nft_passport": "NFT Pasaport",
-        "create_collection_desc": "Sezon bazlı koleksiyon oluştur",
-        "create_style_desc": "Stil tasarımı ve numune ekle",
-        "create_nft_desc": "Dijital ürün kimliği oluştur",
         "create": "Oluştur",
         "add": "Ekle",
         "delete_all_data": "Tüm Verileri Sil",
@@ -40,13 +36,11 @@ translations = {
         "delete_all_confirm": "Bu işlem tüm koleksiyonları, stilleri ve NFT'leri kalıcı olarak silecek. Emin misiniz?",
         "delete_success": "Tüm veriler başarıyla silindi. Veritabanı sıfırlandı.",
         "delete_error": "Veri silme hatası",
-        "create": "Oluştur",
-        "add": "Ekle", 
         "edit": "Düzenle",
         "delete": "Sil",
         "save": "Kaydet",
         "cancel": "İptal",
-        "back": "Geri",
+        "back": "Geri Dön",
         "generate": "Oluştur",
         "nft_create": "NFT Oluştur",
         "select_season": "Sezon Seçin",
@@ -64,44 +58,33 @@ translations = {
         "supplier": "Tedarikçi",
         "ai_generate_image": "AI ile ürün görseli oluştur (DALL-E 3)",
         "openai_api_required": "OpenAI API key gereklidir. Görsel oluşturma birkaç saniye sürebilir.",
-        "ai_image": "AI ile oluşturuldu",
+        "ai_image": "AI Görsel",
         
         # Collections
         "collections_title": "Koleksiyonlar",
         "collections_subtitle": "Sezon bazlı koleksiyon yönetimi",
         "collection_name": "Koleksiyon Adı",
-        "season": "Sezon",
-        "year": "Yıl",
         "description": "Açıklama",
-        "select_season": "Sezon Seçin",
         "spring_summer": "İlkbahar/Yaz",
         "autumn_winter": "Sonbahar/Kış",
         "pre_fall": "Pre-Fall",
         "resort": "Resort",
-        "cancel": "İptal",
         "create_new_collection": "Yeni Koleksiyon Oluştur",
-        "no_styles_yet": "Henüz stil yok",
         "create_first_style": "İlk Stili Oluştur",
         
         # Styles
         "styles_title": "Stiller",
         "styles_subtitle": "Stil tasarımları ve NFT dijital pasaport yönetimi",
-        "style_name": "Stil Adı",
-        "category": "Kategori",
         "materials": "Malzemeler",
         "target_price": "Hedef Fiyat",
         "production_location": "Üretim Lokasyonu",
-        "supplier": "Tedarikçi",
         "carbon_footprint": "Karbon",
-        "select_category": "Kategori Seçin",
         "select_location": "Lokasyon Seçin",
         "select_collection": "Koleksiyon Seçin",
         "materials_placeholder": "pamuk, polyester, elastan",
         "comma_separated": "virgülle ayırın",
-        "ai_generate_image": "AI ile ürün görseli oluştur (DALL-E 3)",
         "ai_note": "OpenAI API key gereklidir. Görsel oluşturma birkaç saniye sürebilir.",
         "create_new_style": "Yeni Stil Oluştur",
-        "ai_image": "AI Görsel",
         "view_nft": "NFT Görüntüle", 
         "create_nft": "NFT Oluştur",
         
@@ -181,8 +164,6 @@ translations = {
         "asia_avg": "Asya Ort.",
         "target_2025": "Hedef 2025",
         "carbon_reduction_recommendations": "Karbon Azaltım Önerileri",
-        "short_term_actions": "Kısa Vadeli Aksiyonlar",
-        "long_term_goals": "Uzun Vadeli Hedefler",
         "nearby_location_priority": "Yakın Lokasyon Önceliği",
         "optimize_logistics": "Optimize Lojistik",
         "renewable_energy": "Yenilenebilir Enerji",
@@ -192,20 +173,16 @@ translations = {
         "average_co2": "Ortalama CO₂",
         "energy": "Enerji",
         "people": "kişi",
-        "styles": "stil",
+        "styles_unit": "stil",
         "nearby_location_priority_desc": "Türkiye içi üretimi %25 artırarak taşıma emisyonlarını azaltın.",
         "optimize_logistics_desc": "Konsolidasyon ile çoklu sevkiyatları birleştirin.",
         "renewable_energy_desc": "Üretici partnerlerin güneş enerjisi yatırımını destekleyin.",
         "certification_program_desc": "Tüm üreticilerin ISO 14001 sertifikasyonu almasını sağlayın.",
         "carbon": "Karbon",
-        "target_price": "Hedef Fiyat",
         "collection_info": "Koleksiyon Bilgileri",
-        "collection_name": "Koleksiyon Adı",
         "no_styles_in_collection": "Bu koleksiyonda henüz stil yok",
         "created_date": "Oluşturulma Tarihi",
         "add_new_style": "Yeni Stil Ekle",
-        "create_first_style": "İlk Stili Oluştur",
-        "create_new_style": "Yeni Stil Oluştur",
         
         # Carbon Footprint Follow-up for Apparel Producers
         "carbon_followup_title": "Konfeksiyon Üreticisi Karbon Takibi",
@@ -217,6 +194,9 @@ translations = {
         "current_month": "Bu Ay",
         "target_vs_actual": "Hedef vs Gerçekleşen",
         "emission_trends": "Emisyon Trendleri",
+        "vs_previous_month": "önceki aya göre",
+        "projected_year": "Yıl sonu tahmini",
+        "last_year": "Geçen yıl",
         "production_efficiency": "Üretim Verimliliği",
         "energy_consumption": "Enerji Tüketimi",
         "waste_reduction": "Atık Azaltımı",
@@ -231,7 +211,6 @@ translations = {
         "pending": "Beklemede",
         "carbon_intensity": "Karbon Yoğunluğu",
         "per_unit_produced": "üretilen birim başına",
-        "renewable_energy": "Yenilenebilir Enerji",
         "energy_mix": "Enerji Karışımı",
         "solar_power": "Güneş Enerjisi",
         "grid_electricity": "Şebeke Elektriği",
@@ -277,11 +256,7 @@ translations = {
         "nft_created": "nft_oluşturuldu",
         
         # Common
-        "back": "Geri Dön",
         "view": "Görüntüle",
-        "edit": "Düzenle",
-        "delete": "Sil",
-        "save": "Kaydet",
         "close": "Kapat",
         "loading": "Yükleniyor...",
         "error": "Hata",
@@ -289,6 +264,14 @@ translations = {
         "kg_co2": "kg CO₂",
         "created_at": "Oluşturulma",
         "styles_count": "stil",
+        "status": "Durum",
+        "filter": "Filtrele",
+        "clear_filters": "Filtreleri Temizle",
+        "next_page": "Sonraki Sayfa",
+        "first_page": "İlk Sayfa",
+        "all_collections_option": "Tüm Koleksiyonlar",
+        "all_categories": "Tüm Kategoriler",
+        "all_statuses": "Tüm Durumlar",
     },
     
     "en": {
@@ -315,12 +298,6 @@ translations = {
         "create_style_desc": "Add style design and sample",
         "create_nft_desc": "Create digital product identity",
         "quick_actions": "Quick Actions",
-        "new_collection": "New Collection",
-        "new_style": "New Style",
-        "nft_passport": "NFT Passport",
-        "create_collection_desc": "Create season-based collection",
-        "create_style_desc": "Add style design and sample",
-        "create_nft_desc": "Create digital product identity",
         "create": "Create",
         "add": "Add",
         "delete_all_data": "Delete All Data",
@@ -328,8 +305,6 @@ translations = {
         "delete_all_confirm": "This will permanently delete all collections, styles, and NFTs. Are you sure?",
         "delete_success": "All data deleted successfully. Database reset.",
         "delete_error": "Data deletion error",
-        "create": "Create",
-        "add": "Add",
         "edit": "Edit", 
         "delete": "Delete",
         "save": "Save",
@@ -350,46 +325,35 @@ translations = {
         "select_category": "Select Category",
         "materials_comma_separated": "Materials (comma separated)",
         "supplier": "Supplier",
-        "ai_generate_image": "Create product image with AI (DALL-E 3)",
+        "ai_generate_image": "Generate AI product image (DALL-E 3)",
         "openai_api_required": "OpenAI API key required. Image generation may take a few seconds.",
-        "ai_image": "AI Generated",
+        "ai_image": "AI Image",
         
         # Collections
         "collections_title": "Collections",
         "collections_subtitle": "Season-based collection management",
         "collection_name": "Collection Name",
-        "season": "Season",
-        "year": "Year", 
         "description": "Description",
-        "select_season": "Select Season",
         "spring_summer": "Spring/Summer",
         "autumn_winter": "Autumn/Winter",
         "pre_fall": "Pre-Fall",
         "resort": "Resort",
-        "cancel": "Cancel",
         "create_new_collection": "Create New Collection",
-        "no_styles_yet": "No styles yet",
         "create_first_style": "Create First Style",
         
         # Styles
         "styles_title": "Styles",
         "styles_subtitle": "Style designs and NFT digital passport management",
-        "style_name": "Style Name",
-        "category": "Category", 
         "materials": "Materials",
         "target_price": "Target Price",
         "production_location": "Production Location",
-        "supplier": "Supplier",
         "carbon_footprint": "Carbon",
-        "select_category": "Select Category",
         "select_location": "Select Location",
         "select_collection": "Select Collection",
         "materials_placeholder": "cotton, polyester, elastane",
         "comma_separated": "comma separated",
-        "ai_generate_image": "Generate AI product image (DALL-E 3)",
         "ai_note": "OpenAI API key required. Image generation may take a few seconds.",
         "create_new_style": "Create New Style",
-        "ai_image": "AI Image",
         "view_nft": "View NFT",
         "create_nft": "Create NFT",
         
@@ -469,8 +433,6 @@ translations = {
         "asia_avg": "Asia Avg.",
         "target_2025": "Target 2025",
         "carbon_reduction_recommendations": "Carbon Reduction Recommendations",
-        "short_term_actions": "Short-term Actions",
-        "long_term_goals": "Long-term Goals",
         "nearby_location_priority": "Nearby Location Priority",
         "optimize_logistics": "Optimize Logistics",
         "renewable_energy": "Renewable Energy",
@@ -480,20 +442,16 @@ translations = {
         "average_co2": "Average CO₂",
         "energy": "Energy",
         "people": "people",
-        "styles": "styles",
+        "styles_unit": "styles",
         "nearby_location_priority_desc": "Increase domestic Turkey production by 25% to reduce transportation emissions.",
         "optimize_logistics_desc": "Combine multiple shipments through consolidation.",
         "renewable_energy_desc": "Support producer partners' solar energy investments.",
         "certification_program_desc": "Ensure all producers obtain ISO 14001 certification.",
         "carbon": "Carbon",
-        "target_price": "Target Price",
         "collection_info": "Collection Information",
-        "collection_name": "Collection Name",
         "no_styles_in_collection": "No styles in this collection yet",
         "created_date": "Created Date",
         "add_new_style": "Add New Style",
-        "create_first_style": "Create First Style",
-        "create_new_style": "Create New Style",
         
         # Carbon Footprint Follow-up for Apparel Producers
         "carbon_followup_title": "Apparel Producer Carbon Tracking",
@@ -505,6 +463,9 @@ translations = {
         "current_month": "Current Month",
         "target_vs_actual": "Target vs Actual",
         "emission_trends": "Emission Trends",
+        "vs_previous_month": "vs previous month",
+        "projected_year": "Projected for the year",
+        "last_year": "Last year",
         "production_efficiency": "Production Efficiency",
         "energy_consumption": "Energy Consumption",
         "waste_reduction": "Waste Reduction",
@@ -519,7 +480,6 @@ translations = {
         "pending": "Pending",
         "carbon_intensity": "Carbon Intensity",
         "per_unit_produced": "per unit produced",
-        "renewable_energy": "Renewable Energy",
         "energy_mix": "Energy Mix",
         "solar_power": "Solar Power",
         "grid_electricity": "Grid Electricity",
@@ -565,11 +525,7 @@ translations = {
         "nft_created": "nft_created",
         
         # Common
-        "back": "Back",
         "view": "View",
-        "edit": "Edit",
-        "delete": "Delete",
-        "save": "Save",
         "close": "Close",
         "loading": "Loading...",
         "error": "Error",
@@ -577,13 +533,62 @@ translations = {
         "kg_co2": "kg CO₂",
         "created_at": "Created",
         "styles_count": "styles",
+        "status": "Status",
+        "filter": "Filter",
+        "clear_filters": "Clear Filters",
+        "next_page": "Next Page",
+        "first_page": "First Page",
+        "all_collections_option": "All Collections",
+        "all_categories": "All Categories",
+        "all_statuses": "All Statuses",
     }
 }
 
+DEFAULT_LANGUAGE = "tr"
+
+
+class CatalogError(ValueError):
+    pass
+
+
+def compile_catalogs(source: dict, default: str = DEFAULT_LANGUAGE) -> dict:
+    """Validate the source dicts and freeze them into one read-only catalog per language
+
+    Every language must define exactly the default language's keys with
+    non-empty string values, so a missing or misspelled key fails at startup
+    instead of rendering the raw key name on some page.
+    """
+    reference = set(source[default])
+    problems = []
+    for lang, texts in source.items():
+        missing = sorted(reference - set(texts))
+        extra = sorted(set(texts) - reference)
+        if missing:
+            problems.append(f"{lang}: missing {', '.join(missing)}")
+        if extra:
+            problems.append(f"{lang}: not in {default}: {', '.join(extra)}")
+        problems.extend(
+            f"{lang}.{key}: expected a non-empty string" for key, value in texts.items()
+            if not isinstance(value, str) or not value
+        )
+    if problems:
+        raise CatalogError("Invalid translations:\n  " + "\n  ".join(problems))
+    return {lang: MappingProxyType(dict(texts)) for lang, texts in source.items()}
+
+
+CATALOGS = compile_catalogs(translations)
+SUPPORTED_LANGUAGES = frozenset(CATALOGS)
+
+
+def resolve_language(value: Optional[str]) -> str:
+    """Supported language code for a cookie/form value, else the default"""
+    return value if value in SUPPORTED_LANGUAGES else DEFAULT_LANGUAGE
+
+
 def get_text(key: str, lang: str = "tr") -> str:
     """Get translated text for given key and language"""
-    return translations.get(lang, {}).get(key, key)
+    return CATALOGS.get(lang, CATALOGS[DEFAULT_LANGUAGE]).get(key, key)
 
-def get_all_texts(lang: str = "tr") -> dict:
-    """Get all translations for given language"""
-    return translations.get(lang, translations["tr"])
\ No newline at end of file
+def get_all_texts(lang: str = "tr") -> Mapping[str, str]:
+    """Get all translations for given language (read-only, shared by every request)"""
+    return CATALOGS.get(lang, CATALOGS[DEFAULT_LANGUAGE])
@@ -0,0 +1,68 @@
+"""
+Turkish text normalization (mojibake repair for form and import input)
+
+Mojibake here is UTF-8 text that was decoded as Windows-1252 somewhere along
+the way ("ş" -> "ÅŸ"). All repairs are compiled into one regex alternation,
+longest pattern first, and applied in a single pass; text without any
+mojibake lead character ("Ã", "Ä", "Å") is returned untouched without
+running the alternation.
+"""
+import re
+import unicodedata
+from typing import Dict
+
+# Letters whose UTF-8 bytes come back as two Windows-1252 characters
+TURKISH_LETTERS = "çÇğĞıİöÖşŞüÜâÂîÎûÛ"
+
+# Hand-collected variants seen in real input that the decoding rule doesn't produce
+LEGACY_REPAIRS = {
+    'Å ': 'Ş',  # Alternative Capital S with cedilla
+    'Å¡': 'ş',  # Alternative s with cedilla
+    'Åı': 'Şı',  # "Å\x9e" with the second byte lost, before "ı"
+    'Åık': 'Şık',  # Common word
+}
+
+
+def mojibake(char: str) -> str:
+    """How `char` reads after its UTF-8 bytes were decoded as Windows-1252"""
+    return char.encode("utf-8").decode("cp1252")
+
+
+def build_repairs() -> Dict[str, str]:
+    repairs = {mojibake(letter): letter for letter in TURKISH_LETTERS}
+    for wrong, correct in LEGACY_REPAIRS.items():
+        repairs[wrong] = correct
+        # The legacy patterns were matched after the letters were already fixed;
+        # in one pass they must also match with those letters still broken
+        broken = "".join(mojibake(c) if c in TURKISH_LETTERS else c for c in wrong)
+        repairs.setdefault(broken, correct)
+    return repairs
+
+
+REPAIRS = build_repairs()
+_PATTERN = re.compile("|".join(re.escape(wrong) for wrong in sorted(REPAIRS, key=len, reverse=True)))
+_LEADS = re.compile("[" + re.escape("".join(sorted({wrong[0] for wrong in REPAIRS}))) + "]")
+
+
+# str.lower() maps "I" to "i" and "İ" to "i" + combining dot; Turkish pairs them with "ı" and "i"
+_TURKISH_UPPER = str.maketrans({"I": "ı", "İ": "i"})
+_DOTLESS = str.maketrans({"ı": "i"})
+
+
+def fold_for_search(text) -> str:
+    """Case- and accent-insensitive form for search ("İSTANBUL", "Istanbul", "ıstanbul" -> "istanbul")"""
+    if not text:
+        return ""
+    decomposed = unicodedata.normalize("NFKD", text.translate(_TURKISH_UPPER).lower())
+    return "".join(c for c in decomposed if not unicodedata.combining(c)).translate(_DOTLESS)
+
+
+def needs_repair(text) -> bool:
+    return bool(text) and not text.isascii() and _LEADS.search(text) is not None
+
+
+def fix_turkish_encoding(text):
+    """Fix Turkish character encoding issues"""
+    if not needs_repair(text):
+        return text
+    return _PATTERN.sub(lambda match: REPAIRS[match.group()], text)